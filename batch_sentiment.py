@@ -0,0 +1,130 @@
+# Objective: score the sentiment of many texts at once, with the same results as TextBlob's PatternAnalyzer, but with
+# the pattern lexicon compiled once into flat lookup tables, instead of nested dictionaries queried for every token.
+# Reference: textblob._text.Sentiment.__call__() and Sentiment.assessments()
+
+from functools import lru_cache
+
+import numpy as np
+from textblob._text import EMOTICONS, PUNCTUATION
+from textblob.en import sentiment as pattern_sentiment
+
+
+@lru_cache(maxsize=1)
+def get_compiled_lexicon():
+    # Lexicon: word -> (polarity, subjectivity, intensity, whether the word can modify the next word)
+    lexicon = {}
+    for (word, scores_by_pos) in pattern_sentiment.items():
+        if None not in scores_by_pos:
+            continue
+        (polarity, subjectivity, intensity) = scores_by_pos[None]
+        is_modifier = any(pos in scores_by_pos for pos in pattern_sentiment.modifiers)
+        lexicon[word] = (polarity, subjectivity, intensity, is_modifier)
+
+    # Emoticons: lower-case emoticon -> polarity. The first match in EMOTICONS wins, as in pattern.
+    emoticons = {}
+    for ((_, polarity), emoticon_set) in EMOTICONS.items():
+        for emoticon in emoticon_set:
+            emoticons.setdefault(emoticon.lower(), polarity)
+
+    return lexicon, emoticons
+
+
+def compute_sentiment(text):
+    # Return a (polarity, subjectivity)-tuple, equal to TextBlob(text).sentiment
+    (lexicon, emoticons) = get_compiled_lexicon()
+    negations = pattern_sentiment.negations
+
+    words = " ".join(pattern_sentiment.tokenizer(text)).split()
+
+    # Each assessment is a list: [polarity, subjectivity, intensity, negation]
+    assessments = []
+    modifier = None  # Preceding modifier (i.e., adverb or adjective).
+    negation = None  # Preceding negation (e.g., "not beautiful").
+
+    for word in words:
+        word = word.lower()
+
+        entry = lexicon.get(word)
+
+        if entry is not None:
+            (polarity, subjectivity, intensity, is_modifier) = entry
+
+            if modifier is None:
+                # Known word not preceded by a modifier ("good").
+                assessments.append([polarity, subjectivity, intensity, 1])
+            else:
+                # Known word preceded by a modifier ("really good").
+                assessment = assessments[-1]
+                assessment[0] = max(-1.0, min(polarity * assessment[2], +1.0))
+                assessment[1] = max(-1.0, min(subjectivity * assessment[2], +1.0))
+                assessment[2] = intensity
+
+            if negation is not None:
+                # Known word preceded by a negation ("not really good").
+                assessments[-1][2] = 1.0 / assessments[-1][2]
+                assessments[-1][3] = -1
+
+            modifier = word if is_modifier else None
+            negation = word if word in negations else None
+
+        else:
+            if word in negations:
+                # Unknown word may be a negation ("not good").
+                negation = word
+            elif negation and len(word.strip("'")) > 1:
+                # Unknown word. Retain negation across small words ("not a good").
+                negation = None
+
+            if (
+                negation is not None
+                and modifier is not None
+                and pattern_sentiment.modifier(modifier)
+            ):
+                # Unknown word may be a negation preceded by a modifier ("really not good").
+                assessments[-1][3] = -1
+                negation = None
+            elif modifier and len(word) > 2:
+                # Unknown word. Retain modifier across small words ("really is a good").
+                modifier = None
+
+            if word == "!" and len(assessments) > 0:
+                # Exclamation marks boost previous word.
+                assessments[-1][0] = max(-1.0, min(assessments[-1][0] * 1.25, +1.0))
+
+            if word == "(!)":
+                # Exclamation marks in parentheses indicate sarcasm.
+                assessments.append([0.0, 1.0, 1.0, 1])
+
+            if word.isalpha() is False and len(word) <= 5 and word not in PUNCTUATION:
+                emoticon_polarity = emoticons.get(word)
+                if emoticon_polarity is not None:
+                    assessments.append([emoticon_polarity, 1.0, 1.0, 1])
+
+    polarity_sum = 0
+    subjectivity_sum = 0
+    for (polarity, subjectivity, _, negation_flag) in assessments:
+        # "not good" = slightly bad, "not bad" = slightly good.
+        polarity_sum += polarity * -0.5 if negation_flag < 0 else polarity
+        subjectivity_sum += subjectivity
+
+    num_assessments = float(len(assessments) or 1)
+
+    return polarity_sum / num_assessments, subjectivity_sum / num_assessments
+
+
+def compute_sentiments(texts):
+    # Return two NumPy arrays (polarity and subjectivity), with one entry per text. Duplicate texts, e.g. very short
+    # joke reviews, are only scored once.
+    scores = {}
+
+    polarity = np.zeros(len(texts))
+    subjectivity = np.zeros(len(texts))
+
+    for (text_count, text) in enumerate(texts):
+        try:
+            (polarity[text_count], subjectivity[text_count]) = scores[text]
+        except KeyError:
+            scores[text] = compute_sentiment(text)
+            (polarity[text_count], subjectivity[text_count]) = scores[text]
+
+    return polarity, subjectivity
@@ -0,0 +1,295 @@
+# Objective: cluster the reviews of many appIDs together, e.g. to find archetypes of "meme" reviews across the catalog.
+# Scalers and PCA are fitted on the reviews of every appID (StandardScaler.partial_fit, IncrementalPCA), so that
+# clusters are comparable across games, and reviews are streamed in chunks, so that memory usage is bounded by the
+# chunk size rather than by the number of appIDs. The three passes over the catalog are:
+# 1. fit the preprocessing,
+# 2. fit Mini-Batch K-Means on the preprocessed features,
+# 3. assign every review to a cluster, and keep track of cluster sizes, counts per appID, and exemplar reviews.
+
+import os
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+
+from cluster_reviews import (
+    create_preprocessing,
+    fit_preprocessing,
+    get_exemplar_indices,
+    get_feature_groups,
+    transform_feature_groups,
+)
+from describe_reviews import (
+    aggregate_reviews_to_pandas,
+    extract_reviews_for_top_languages_only,
+    get_data_filename,
+    get_review_content,
+)
+
+# Maximal number of reviews per chunk
+default_chunk_size = 10000
+
+default_num_clusters = 20
+
+
+def load_english_reviews(app_id):
+    df = aggregate_reviews_to_pandas(app_id)
+
+    return extract_reviews_for_top_languages_only(df, ['english'], verbose=False)
+
+
+def concatenate_chunks(chunks):
+    # Each chunk is a tuple: (appIDs, review IDs, dictionary: feature group -> array), with one row per review.
+    app_ids = np.concatenate([chunk[0] for chunk in chunks])
+    review_ids = np.concatenate([chunk[1] for chunk in chunks])
+    feature_groups = {
+        feature_group: np.concatenate([chunk[2][feature_group] for chunk in chunks])
+        for feature_group in chunks[0][2]
+    }
+
+    return app_ids, review_ids, feature_groups
+
+
+def slice_chunk(chunk, start, end=None):
+    (app_ids, review_ids, feature_groups) = chunk
+
+    sliced_feature_groups = {
+        feature_group: values[start:end]
+        for (feature_group, values) in feature_groups.items()
+    }
+
+    return app_ids[start:end], review_ids[start:end], sliced_feature_groups
+
+
+def iterate_feature_chunks(app_id_list, chunk_size=None):
+    # Yield chunks of chunk_size reviews (fewer for the last one), which may contain reviews of several appIDs.
+    # The reviews of a single appID are loaded at a time, so that memory usage does not depend on the catalog size.
+    if chunk_size is None:
+        chunk_size = default_chunk_size
+
+    pending_chunks = []
+    num_pending_reviews = 0
+
+    for app_id in app_id_list:
+        df = load_english_reviews(app_id)
+
+        if len(df) == 0:
+            continue
+
+        pending_chunks.append(
+            (
+                np.full(len(df), app_id),
+                df["recommendationid"].to_numpy(dtype=str),
+                get_feature_groups(df),
+            ),
+        )
+        num_pending_reviews += len(df)
+
+        if num_pending_reviews >= chunk_size:
+            chunk = concatenate_chunks(pending_chunks)
+
+            num_full_chunks = num_pending_reviews // chunk_size
+            for chunk_count in range(num_full_chunks):
+                yield slice_chunk(
+                    chunk,
+                    chunk_count * chunk_size,
+                    (chunk_count + 1) * chunk_size,
+                )
+
+            num_pending_reviews -= num_full_chunks * chunk_size
+            if num_pending_reviews > 0:
+                pending_chunks = [slice_chunk(chunk, num_full_chunks * chunk_size)]
+            else:
+                pending_chunks = []
+
+    if num_pending_reviews > 0:
+        yield concatenate_chunks(pending_chunks)
+
+
+def fit_catalog_preprocessing(app_id_list, chunk_size=None):
+    preprocessing = create_preprocessing(incremental=True)
+
+    for (_, _, feature_groups) in iterate_feature_chunks(app_id_list, chunk_size):
+        fit_preprocessing(preprocessing, feature_groups, incremental=True)
+
+    return preprocessing
+
+
+def fit_catalog_model(
+    app_id_list,
+    preprocessing,
+    num_clusters=None,
+    chunk_size=None,
+    num_epochs=1,
+    random_state=0,
+):
+    if num_clusters is None:
+        num_clusters = default_num_clusters
+
+    # NB: n_init is not set, because partial_fit() initializes the centers only once, with the first chunk.
+    model = MiniBatchKMeans(
+        n_clusters=num_clusters,
+        random_state=random_state,
+    )
+
+    rng = np.random.default_rng(random_state)
+
+    for _ in range(num_epochs):
+        # Chunks follow the order of appIDs: this order is shuffled, so that the last games do not bias the centers.
+        shuffled_app_id_list = [
+            app_id_list[i] for i in rng.permutation(len(app_id_list))
+        ]
+
+        for (_, _, feature_groups) in iterate_feature_chunks(
+            shuffled_app_id_list,
+            chunk_size,
+        ):
+            # noinspection PyPep8Naming
+            X = transform_feature_groups(preprocessing, feature_groups)
+
+            if not hasattr(model, 'cluster_centers_') and len(X) < num_clusters:
+                # The first chunk must contain at least one review per cluster.
+                continue
+
+            model.partial_fit(X)
+
+    return model
+
+
+def assign_catalog_reviews(app_id_list, preprocessing, model, chunk_size=None):
+    # Return a dictionary with the size of every cluster, the number of reviews of every appID in every cluster, and for
+    # every cluster, the (appID, review ID) of the review closest to the cluster center.
+    num_clusters = len(model.cluster_centers_)
+
+    app_index = {app_id: row for (row, app_id) in enumerate(app_id_list)}
+
+    app_cluster_counts = np.zeros((len(app_id_list), num_clusters), dtype=np.int64)
+    exemplar_distances = np.full(num_clusters, np.inf)
+    exemplars = [None] * num_clusters
+
+    for (app_ids, review_ids, feature_groups) in iterate_feature_chunks(
+        app_id_list,
+        chunk_size,
+    ):
+        # noinspection PyPep8Naming
+        X = transform_feature_groups(preprocessing, feature_groups)
+        labels = model.predict(X)
+
+        rows = np.array([app_index[app_id] for app_id in app_ids])
+        np.add.at(app_cluster_counts, (rows, labels), 1)
+
+        # Exemplars of this chunk, which replace the previous ones if they are closer to the cluster centers.
+        exemplar_indices = get_exemplar_indices(X, labels, model.cluster_centers_)
+
+        for (cluster_index, review_index) in enumerate(exemplar_indices):
+            if review_index < 0:
+                continue
+
+            distance = np.sum(
+                (X[review_index] - model.cluster_centers_[cluster_index]) ** 2,
+            )
+            if distance < exemplar_distances[cluster_index]:
+                exemplar_distances[cluster_index] = distance
+                exemplars[cluster_index] = (
+                    str(app_ids[review_index]),
+                    str(review_ids[review_index]),
+                )
+
+    catalog_assignment = {}
+    catalog_assignment['cluster_sizes'] = app_cluster_counts.sum(axis=0)
+    catalog_assignment['app_cluster_counts'] = app_cluster_counts
+    catalog_assignment['exemplars'] = exemplars
+
+    return catalog_assignment
+
+
+def cluster_catalog(
+    app_id_list,
+    num_clusters=None,
+    chunk_size=None,
+    num_epochs=1,
+    random_state=0,
+):
+    preprocessing = fit_catalog_preprocessing(app_id_list, chunk_size)
+
+    model = fit_catalog_model(
+        app_id_list,
+        preprocessing,
+        num_clusters,
+        chunk_size,
+        num_epochs,
+        random_state,
+    )
+
+    catalog_clustering = assign_catalog_reviews(
+        app_id_list,
+        preprocessing,
+        model,
+        chunk_size,
+    )
+    catalog_clustering['app_ids'] = list(app_id_list)
+    catalog_clustering['preprocessing'] = preprocessing
+    catalog_clustering['model'] = model
+
+    return catalog_clustering
+
+
+def print_catalog_clusters(catalog_clustering, num_top_games=3):
+    cluster_sizes = catalog_clustering['cluster_sizes']
+    app_cluster_counts = catalog_clustering['app_cluster_counts']
+
+    for (cluster_count, cluster_index) in enumerate(
+        np.argsort(-cluster_sizes, kind='stable'),
+    ):
+        if cluster_sizes[cluster_index] == 0:
+            continue
+
+        # Games with the highest share of their reviews in this cluster
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shares = app_cluster_counts[:, cluster_index] / app_cluster_counts.sum(
+                axis=1,
+            )
+        top_rows = np.argsort(-np.nan_to_num(shares), kind='stable')[:num_top_games]
+
+        print(
+            "\n ==== Cluster "
+            + str(cluster_count + 1)
+            + " (#reviews = "
+            + str(cluster_sizes[cluster_index])
+            + ") ====",
+        )
+        print(
+            'Top games: '
+            + ', '.join(
+                '{0} ({1:.0%})'.format(catalog_clustering['app_ids'][row], shares[row])
+                for row in top_rows
+            ),
+        )
+
+        (app_id, review_id) = catalog_clustering['exemplars'][cluster_index]
+        review_content = get_review_content(app_id, review_id)
+
+        try:
+            print(review_content)
+        except UnicodeEncodeError:
+            # Reference: https://stackoverflow.com/a/3224300
+            print(review_content.encode('ascii', 'ignore'))
+
+    return
+
+
+def main():
+    with open('idlist.txt') as f:
+        d = f.readlines()
+
+    # Only appIDs with downloaded reviews
+    app_id_list = [x.strip() for x in d if os.path.exists(get_data_filename(x.strip()))]
+
+    catalog_clustering = cluster_catalog(app_id_list)
+
+    print_catalog_clusters(catalog_clustering)
+
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
 from math import log10
 
 import matplotlib
-import steamspypi
 
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 
+from steamspy_cache import get_steamspy_metadata
+
 
 def get_mid_of_interval(interval_as_str):
     interval_as_str_formatted = [
@@ -19,23 +20,21 @@ def get_mid_of_interval(interval_as_str):
 
 
 def get_x_y():
-    steam_spy_dict = steamspypi.load()
+    steamspy_metadata = get_steamspy_metadata()
 
     num_owners_list = []
-    num_reviews_list = []
 
-    for appID in steam_spy_dict:
-        num_owners = steam_spy_dict[appID]['owners']
+    for num_owners in steamspy_metadata.columns['owners'].tolist():
         try:
             num_owners = float(num_owners)
         except ValueError:
             num_owners = get_mid_of_interval(num_owners)
-        num_reviews = sum(
-            steam_spy_dict[appID][keyword] for keyword in ['positive', 'negative']
-        )
 
         num_owners_list.append(num_owners)
-        num_reviews_list.append(num_reviews)
+
+    num_reviews_list = (
+        steamspy_metadata.columns['positive'] + steamspy_metadata.columns['negative']
+    ).tolist()
 
     return num_owners_list, num_reviews_list
 
@@ -0,0 +1,336 @@
+# Objective: evaluate the quality of a clustering of reviews without the quadratic cost of the exact Silhouette
+# Coefficient. The evaluation method is chosen through a single option:
+# - 'sampled_silhouette': Silhouette Coefficient estimated on a sample stratified by cluster, with a confidence band,
+# - 'silhouette': exact Silhouette Coefficient, quadratic in the number of reviews,
+# - 'calinski_harabasz': Calinski-Harabasz index (higher is better), linear in the number of reviews,
+# - 'davies_bouldin': Davies-Bouldin index (lower is better), linear in the number of reviews.
+
+import numpy as np
+from scipy.stats import t as student_t
+from sklearn import metrics
+
+evaluation_methods = [
+    'sampled_silhouette',
+    'silhouette',
+    'calinski_harabasz',
+    'davies_bouldin',
+]
+
+# Default evaluation method
+evaluation_method = 'sampled_silhouette'
+
+# Default number of reviews sampled for the Silhouette Coefficient, and seed of the random number generator
+silhouette_sample_size = 2000
+silhouette_random_state = 0
+
+# Number of groups of the delete-a-group jackknife, used for the confidence interval of the Silhouette Coefficient
+num_jackknife_groups = 10
+
+evaluation_method_names = {
+    'sampled_silhouette': 'Silhouette Coefficient (sampled)',
+    'silhouette': 'Silhouette Coefficient',
+    'calinski_harabasz': 'Calinski-Harabasz Index',
+    'davies_bouldin': 'Davies-Bouldin Index',
+}
+
+
+def draw_stratified_sample(labels, sample_size, random_state=0):
+    # Return the sorted indices of a random sample of at most sample_size reviews, with 2 reviews per cluster (if
+    # possible), so that small clusters are represented, and the rest of the sample allocated to clusters in proportion
+    # to their size. If there are too many clusters for 2 reviews each, clusters are drawn with a probability
+    # proportional to their size, and the other clusters are not represented.
+    labels = np.asarray(labels)
+    num_reviews = len(labels)
+    sample_size = min(sample_size, num_reviews)
+
+    (_, label_indices) = np.unique(labels, return_inverse=True)
+    cluster_sizes = np.bincount(label_indices)
+
+    rng = np.random.default_rng(random_state)
+
+    min_num_sampled_reviews = np.minimum(cluster_sizes, 2)
+
+    if np.sum(min_num_sampled_reviews) > sample_size:
+        sampled_clusters = rng.choice(
+            len(cluster_sizes),
+            size=sample_size // 2,
+            replace=False,
+            p=cluster_sizes / num_reviews,
+        )
+
+        num_sampled_reviews = np.zeros_like(cluster_sizes)
+        num_sampled_reviews[sampled_clusters] = min_num_sampled_reviews[
+            sampled_clusters
+        ]
+    else:
+        # Largest remainder method, so that the sample has exactly sample_size reviews
+        num_remaining_reviews = sample_size - np.sum(min_num_sampled_reviews)
+        quotas = (
+            num_remaining_reviews
+            * (cluster_sizes - min_num_sampled_reviews)
+            / max(num_reviews - np.sum(min_num_sampled_reviews), 1)
+        )
+        num_extra_reviews = np.floor(quotas).astype(int)
+
+        num_leftover_reviews = num_remaining_reviews - np.sum(num_extra_reviews)
+        largest_remainders = np.argsort(
+            num_extra_reviews - quotas,
+            kind='stable',
+        )[:num_leftover_reviews]
+        num_extra_reviews[largest_remainders] += 1
+
+        num_sampled_reviews = np.minimum(
+            min_num_sampled_reviews + num_extra_reviews,
+            cluster_sizes,
+        )
+
+    # Random order of the reviews within each cluster
+    order = rng.permutation(num_reviews)
+    order = order[np.argsort(label_indices[order], kind='stable')]
+
+    # Rank of each review within its cluster, in the random order
+    cluster_starts = np.cumsum(cluster_sizes) - cluster_sizes
+    ranks = np.arange(num_reviews) - cluster_starts[label_indices[order]]
+
+    sample_indices = np.sort(order[ranks < num_sampled_reviews[label_indices[order]]])
+
+    return sample_indices
+
+
+def compute_cluster_distance_sums(distances, label_indices, num_clusters):
+    # Return the sums of the distances from every row to the columns of each cluster, of shape (#rows x #clusters).
+    order = np.argsort(label_indices, kind='stable')
+    sorted_label_indices = label_indices[order]
+
+    distance_sums = np.zeros((distances.shape[0], num_clusters))
+
+    if len(order) > 0:
+        starts = np.flatnonzero(
+            np.diff(sorted_label_indices, prepend=sorted_label_indices[0] - 1),
+        )
+        distance_sums[:, sorted_label_indices[starts]] = np.add.reduceat(
+            distances[:, order],
+            starts,
+            axis=1,
+        )
+
+    return distance_sums
+
+
+def compute_silhouettes(distance_sums, cluster_sizes, label_indices):
+    # Return the silhouette of every row, given the sums of its distances to each cluster, and the size of each cluster.
+    # Same conventions as sklearn.metrics.silhouette_samples(): the silhouette is 0 for reviews alone in their cluster.
+    rows = np.arange(len(label_indices))
+    num_neighbors = cluster_sizes[label_indices] - 1
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        intra_cluster_distances = distance_sums[rows, label_indices] / num_neighbors
+        mean_distances = distance_sums / cluster_sizes
+
+    # Mean distance to the nearest other cluster
+    mean_distances[rows, label_indices] = np.inf
+    mean_distances[:, cluster_sizes == 0] = np.inf
+    nearest_cluster_distances = mean_distances.min(axis=1)
+
+    differences = nearest_cluster_distances - intra_cluster_distances
+    with np.errstate(divide='ignore', invalid='ignore'):
+        silhouettes = differences / np.maximum(
+            intra_cluster_distances,
+            nearest_cluster_distances,
+        )
+    silhouettes[num_neighbors == 0] = 0
+
+    return np.nan_to_num(silhouettes, nan=0.0)
+
+
+def compute_stratified_mean(values, label_indices, cluster_weights):
+    # Mean of the values of each cluster, weighted by the share of the cluster among all the reviews.
+    num_clusters = len(cluster_weights)
+
+    num_values = np.bincount(label_indices, minlength=num_clusters)
+    value_sums = np.bincount(label_indices, weights=values, minlength=num_clusters)
+
+    is_present = num_values > 0
+    stratified_mean = np.sum(
+        cluster_weights[is_present] * value_sums[is_present] / num_values[is_present],
+    ) / np.sum(cluster_weights[is_present])
+
+    return stratified_mean
+
+
+def estimate_silhouette_score(
+    X,
+    labels,
+    metric='euclidean',
+    sample_size=None,
+    random_state=None,
+    confidence=0.95,
+):
+    # Return the estimated Silhouette Coefficient, and the bounds of its confidence interval.
+    # NB: Each cluster is weighted by its share of all the reviews, so that the estimate is not biased towards small
+    # clusters, which are over-sampled due to the minimal number of reviews per cluster. Clusters which are not sampled
+    # at all, if there are too many clusters for the sample size, are ignored.
+    # The confidence interval is obtained with a delete-a-group jackknife: the silhouettes depend on the sampled reviews
+    # used as references, so the variance of the silhouettes of the sample alone would under-estimate the uncertainty.
+    if sample_size is None:
+        sample_size = silhouette_sample_size
+    if random_state is None:
+        random_state = silhouette_random_state
+
+    labels = np.asarray(labels)
+
+    sample_indices = draw_stratified_sample(labels, sample_size, random_state)
+
+    (_, all_label_indices, cluster_sizes) = np.unique(
+        labels,
+        return_inverse=True,
+        return_counts=True,
+    )
+    # Only the clusters found in the sample are considered.
+    (sampled_clusters, label_indices) = np.unique(
+        all_label_indices[sample_indices],
+        return_inverse=True,
+    )
+    num_clusters = len(sampled_clusters)
+
+    if not (2 <= num_clusters <= len(sample_indices) - 1):
+        # The Silhouette Coefficient is undefined.
+        return np.nan, np.nan, np.nan
+
+    cluster_weights = cluster_sizes[sampled_clusters] / len(labels)
+
+    distances = metrics.pairwise_distances(
+        np.asarray(X[sample_indices], dtype=float),
+        metric=metric,
+    )
+
+    distance_sums = compute_cluster_distance_sums(
+        distances,
+        label_indices,
+        num_clusters,
+    )
+    num_sampled_reviews = np.bincount(label_indices, minlength=num_clusters)
+
+    silhouettes = compute_silhouettes(distance_sums, num_sampled_reviews, label_indices)
+    score = compute_stratified_mean(silhouettes, label_indices, cluster_weights)
+
+    # Groups of the jackknife, balanced within each cluster
+    rng = np.random.default_rng(random_state)
+    order = np.lexsort((rng.random(len(label_indices)), label_indices))
+    groups = np.empty(len(label_indices), dtype=int)
+    groups[order] = np.arange(len(label_indices)) % num_jackknife_groups
+
+    replicate_scores = np.empty(num_jackknife_groups)
+
+    for group in range(num_jackknife_groups):
+        is_deleted = groups == group
+        is_kept = ~is_deleted
+
+        # The reviews of the group are removed from the sums of distances and from the cluster sizes.
+        deleted_distance_sums = compute_cluster_distance_sums(
+            distances[np.ix_(is_kept, is_deleted)],
+            label_indices[is_deleted],
+            num_clusters,
+        )
+        replicate_distance_sums = distance_sums[is_kept] - deleted_distance_sums
+        replicate_cluster_sizes = num_sampled_reviews - np.bincount(
+            label_indices[is_deleted],
+            minlength=num_clusters,
+        )
+
+        replicate_silhouettes = compute_silhouettes(
+            replicate_distance_sums,
+            replicate_cluster_sizes,
+            label_indices[is_kept],
+        )
+        replicate_scores[group] = compute_stratified_mean(
+            replicate_silhouettes,
+            label_indices[is_kept],
+            cluster_weights,
+        )
+
+    variance = (
+        (num_jackknife_groups - 1)
+        / num_jackknife_groups
+        * np.sum((replicate_scores - np.mean(replicate_scores)) ** 2)
+    )
+
+    t_quantile = student_t.ppf((1 + confidence) / 2, num_jackknife_groups - 1)
+    half_width = t_quantile * np.sqrt(variance)
+
+    return score, score - half_width, score + half_width
+
+
+def evaluate_clustering(
+    X,
+    labels,
+    method=None,
+    metric='euclidean',
+    sample_size=None,
+    random_state=None,
+    confidence=0.95,
+):
+    # Return a dictionary with the score of the clustering, and for the sampled Silhouette Coefficient, the bounds of
+    # its confidence interval. The metric is only used for the Silhouette Coefficient: the other indices are Euclidean.
+    if method is None:
+        method = evaluation_method
+
+    labels = np.asarray(labels)
+    num_clusters = len(np.unique(labels))
+
+    evaluation = {}
+    evaluation['method'] = method
+    evaluation['lower_bound'] = None
+    evaluation['upper_bound'] = None
+
+    if method == 'sampled_silhouette':
+        (score, lower_bound, upper_bound) = estimate_silhouette_score(
+            X,
+            labels,
+            metric,
+            sample_size,
+            random_state,
+            confidence,
+        )
+        evaluation['lower_bound'] = lower_bound
+        evaluation['upper_bound'] = upper_bound
+        evaluation['confidence'] = confidence
+    elif method not in evaluation_methods:
+        raise ValueError('Unknown evaluation method: ' + str(method))
+    elif not (2 <= num_clusters <= len(labels) - 1):
+        # Every index is undefined with a single cluster, or with one cluster per review.
+        score = np.nan
+    elif method == 'silhouette':
+        score = metrics.silhouette_score(X, labels, metric=metric)
+    elif method == 'calinski_harabasz':
+        score = metrics.calinski_harabasz_score(X, labels)
+    else:
+        score = metrics.davies_bouldin_score(X, labels)
+
+    evaluation['score'] = score
+
+    return evaluation
+
+
+def format_clustering_evaluation(evaluation):
+    # e.g. "Silhouette Coefficient (sampled): 0.215 (95% confidence interval: [0.203, 0.227])"
+    text = (
+        evaluation_method_names[evaluation['method']] + ': %0.3f' % evaluation['score']
+    )
+
+    if evaluation['lower_bound'] is not None:
+        text += ' ({0:.0%} confidence interval: [{1:.3f}, {2:.3f}])'.format(
+            evaluation['confidence'],
+            evaluation['lower_bound'],
+            evaluation['upper_bound'],
+        )
+
+    return text
+
+
+def print_clustering_evaluation(X, labels, method=None, metric='euclidean'):
+    evaluation = evaluate_clustering(X, labels, method, metric)
+
+    print(format_clustering_evaluation(evaluation))
+
+    return evaluation
@@ -0,0 +1,280 @@
+# Objective: save the fitted preprocessing (scalers, PCA) and cluster model of an appID, so that newly downloaded
+# reviews are assigned to the existing clusters, instead of clustering every review from scratch. The model is fitted
+# again only if the new reviews drift away from the clusters, i.e. if the reviews assigned since the last fit are much
+# further from their cluster centers than the reviews used to fit the model.
+
+import os
+import pathlib
+
+import joblib
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics import pairwise_distances_argmin
+
+from cluster_reviews import (
+    create_birch_model,
+    create_preprocessing,
+    fit_affinity_propagation,
+    fit_preprocessing,
+    get_feature_groups,
+    transform_feature_groups,
+)
+
+# Increment this value whenever the format of the saved models changes, so that older models are discarded.
+cluster_model_version = 2
+
+# The model is fitted again if the mean distance of the reviews assigned since the last fit to their cluster centers
+# exceeds the one of the reviews used to fit the model by this factor.
+max_cluster_drift = 1.5
+
+# Below this number of reviews assigned since the last fit, the drift is too noisy to trigger a refit.
+min_num_new_reviews_for_refit = 20
+
+
+def get_cluster_model_filename(app_id):
+    # Model folder
+    model_path = "data/cluster_models/"
+
+    return model_path + "cluster_model_" + app_id + ".joblib"
+
+
+def compute_cluster_centers(X, labels):
+    # Mean of the reviews of each cluster. Clusters without any review have NaN centers.
+    num_clusters = labels.max() + 1
+
+    cluster_sizes = np.bincount(labels, minlength=num_clusters)
+    cluster_sums = np.zeros((num_clusters, X.shape[1]))
+    np.add.at(cluster_sums, labels, X)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cluster_centers = cluster_sums / cluster_sizes[:, np.newaxis]
+
+    return cluster_centers
+
+
+def compute_distances_to_centers(X, labels, cluster_centers):
+    return np.sqrt(np.sum((X - cluster_centers[labels]) ** 2, axis=1))
+
+
+def get_reference_points(model, method):
+    # Every supported model assigns a review to the cluster of the nearest reference point: Birch subcluster centers,
+    # Affinity Propagation exemplars, or K-Means centers. Only these points are saved, rather than the model itself.
+    # NB: Birch models cannot be pickled once their tree is deep, due to the recursion limit.
+    if method == 'birch':
+        reference_points = model.subcluster_centers_
+        reference_labels = model.subcluster_labels_
+    else:
+        reference_points = model.cluster_centers_
+        reference_labels = np.arange(len(reference_points))
+
+    return np.asarray(reference_points), np.asarray(reference_labels)
+
+
+def fit_cluster_model(df, method='birch', num_clusters=3):
+    # Return a dictionary with the fitted preprocessing and cluster model, and the cluster of every review of df.
+    # method: 'birch' (as in cluster_reviews.try_birch), 'affinity_propagation', or 'mini_batch_kmeans'
+    feature_groups = get_feature_groups(df)
+
+    preprocessing = fit_preprocessing(create_preprocessing(), feature_groups)
+
+    # noinspection PyPep8Naming
+    X = transform_feature_groups(preprocessing, feature_groups)
+
+    if method == 'birch':
+        model = create_birch_model(num_clusters).fit(X)
+    elif method == 'affinity_propagation':
+        model = fit_affinity_propagation(X)
+    elif method == 'mini_batch_kmeans':
+        model = MiniBatchKMeans(
+            n_clusters=num_clusters,
+            n_init=3,
+            random_state=0,
+        ).fit(X)
+    else:
+        raise ValueError('Unknown clustering method: ' + str(method))
+
+    labels = np.asarray(model.labels_)
+
+    if labels.min() < 0:
+        # Affinity Propagation labels every review with -1, without any exemplar, if it does not converge. Such a model
+        # cannot assign any review, so it is neither returned nor saved.
+        raise ValueError('Clustering did not converge with method: ' + str(method))
+
+    (reference_points, reference_labels) = get_reference_points(model, method)
+
+    cluster_centers = compute_cluster_centers(X, labels)
+
+    cluster_model = {}
+    cluster_model['version'] = cluster_model_version
+    cluster_model['method'] = method
+    cluster_model['num_clusters'] = num_clusters
+    cluster_model['preprocessing'] = preprocessing
+    cluster_model['reference_points'] = reference_points
+    cluster_model['reference_labels'] = reference_labels
+    cluster_model['cluster_centers'] = cluster_centers
+    # Reference quality of the assignment, to measure the drift of new reviews
+    cluster_model['mean_distance'] = np.mean(
+        compute_distances_to_centers(X, labels, cluster_centers),
+    )
+    # Dictionary: review ID -> cluster
+    cluster_model['labels'] = dict(
+        zip(df["recommendationid"].astype(str), labels.tolist()),
+    )
+    # Sum of the distances to their cluster centers of the reviews assigned since the fit, and their number
+    cluster_model['new_distance_sum'] = 0.0
+    cluster_model['num_new_reviews'] = 0
+
+    return cluster_model
+
+
+def save_cluster_model(app_id, cluster_model):
+    cluster_model_filename = get_cluster_model_filename(app_id)
+    temp_filename = cluster_model_filename + '.tmp'
+
+    pathlib.Path(cluster_model_filename).parent.mkdir(parents=True, exist_ok=True)
+
+    # Write to a temporary file first, so that an interrupted run cannot leave a corrupted model behind.
+    with open(temp_filename, 'wb') as f:
+        joblib.dump(cluster_model, f)
+    os.replace(temp_filename, cluster_model_filename)
+
+    return
+
+
+def load_cluster_model(app_id):
+    # Return the saved model, or None if there is none.
+    try:
+        with open(get_cluster_model_filename(app_id), 'rb') as f:
+            cluster_model = joblib.load(f)
+    except (OSError, EOFError, ValueError):
+        return None
+
+    if cluster_model.get('version') != cluster_model_version:
+        return None
+
+    return cluster_model
+
+
+def predict_clusters(cluster_model, df):
+    # Assign the reviews of df to the clusters of the model, without fitting anything.
+    # Return the clusters, and the distance of each review to its cluster center.
+    feature_groups = get_feature_groups(df)
+
+    # noinspection PyPep8Naming
+    X = transform_feature_groups(cluster_model['preprocessing'], feature_groups)
+
+    # Same result as model.predict(X)
+    labels = cluster_model['reference_labels'][
+        pairwise_distances_argmin(X, cluster_model['reference_points'])
+    ]
+
+    distances = compute_distances_to_centers(
+        X,
+        labels,
+        cluster_model['cluster_centers'],
+    )
+
+    return labels, distances
+
+
+def add_new_distances(cluster_model, distances):
+    # Keep track of the distances of the reviews assigned since the fit, so that the drift is measured over all of them,
+    # even if new reviews arrive in small batches.
+    cluster_model['new_distance_sum'] += float(np.sum(distances))
+    cluster_model['num_new_reviews'] += len(distances)
+
+    return
+
+
+def compute_cluster_drift(cluster_model):
+    # Ratio of the mean distance of the reviews assigned since the fit to their cluster centers, and of the one of the
+    # reviews used to fit the model. A ratio close to 1 means that the new reviews are as well assigned as the ones
+    # used to fit the model.
+    if cluster_model['num_new_reviews'] == 0:
+        return 0.0
+
+    mean_new_distance = (
+        cluster_model['new_distance_sum'] / cluster_model['num_new_reviews']
+    )
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cluster_drift = mean_new_distance / cluster_model['mean_distance']
+
+    return float(np.nan_to_num(cluster_drift, nan=0.0))
+
+
+def get_review_clusters(
+    app_id,
+    df,
+    method='birch',
+    num_clusters=3,
+    max_drift=None,
+    verbose=True,
+):
+    # Return the cluster of every review of df. Reviews already known to the saved model keep their cluster, and new
+    # reviews are assigned to the nearest clusters. The model is fitted again on every review of df if there is no saved
+    # model with the same parameters, or if the new reviews drift away from the existing clusters.
+    if max_drift is None:
+        max_drift = max_cluster_drift
+
+    cluster_model = load_cluster_model(app_id)
+
+    if cluster_model is not None and (
+        cluster_model['method'] != method
+        or cluster_model['num_clusters'] != num_clusters
+    ):
+        cluster_model = None
+
+    if cluster_model is not None:
+        review_ids = df["recommendationid"].astype(str).tolist()
+
+        is_new_review = np.array(
+            [review_id not in cluster_model['labels'] for review_id in review_ids],
+            dtype=bool,
+        )
+
+        if np.any(is_new_review):
+            (new_labels, distances) = predict_clusters(cluster_model, df[is_new_review])
+
+            add_new_distances(cluster_model, distances)
+            cluster_drift = compute_cluster_drift(cluster_model)
+
+            if verbose:
+                sentence = (
+                    'New reviews assigned to existing clusters: {0} '
+                    + '(drift = {1:.2f} for the {2} reviews assigned since the last fit)'
+                )
+                print(
+                    sentence.format(
+                        len(new_labels),
+                        cluster_drift,
+                        cluster_model['num_new_reviews'],
+                    ),
+                )
+
+            if (
+                cluster_drift > max_drift
+                and cluster_model['num_new_reviews'] >= min_num_new_reviews_for_refit
+            ):
+                # The assignment quality has degraded: the model is fitted again.
+                cluster_model = None
+            else:
+                cluster_model['labels'].update(
+                    zip(np.array(review_ids)[is_new_review], new_labels.tolist()),
+                )
+                save_cluster_model(app_id, cluster_model)
+
+    if cluster_model is None:
+        if verbose:
+            print('Fitting a new cluster model for appID = ' + app_id)
+        cluster_model = fit_cluster_model(df, method, num_clusters)
+        save_cluster_model(app_id, cluster_model)
+
+    labels = np.array(
+        [
+            cluster_model['labels'][review_id]
+            for review_id in df["recommendationid"].astype(str)
+        ],
+    )
+
+    return labels
@@ -1,15 +1,56 @@
+import pathlib
 import sys
 
 import numpy as np
 import pandas as pd
-from sklearn import metrics
-from sklearn.cluster import DBSCAN, AffinityPropagation, AgglomerativeClustering, Birch
-from sklearn.decomposition import PCA
-from sklearn.neighbors import kneighbors_graph
+from sklearn.cluster import (
+    DBSCAN,
+    AffinityPropagation,
+    AgglomerativeClustering,
+    Birch,
+    MiniBatchKMeans,
+)
+from sklearn.decomposition import PCA, IncrementalPCA
 from sklearn.preprocessing import StandardScaler
-from textblob import TextBlob
 
+from cluster_evaluation import print_clustering_evaluation
 from describe_reviews import analyze_app_id_in_english, get_review_content
+from feature_matrix import get_feature_matrix
+from neighbor_graph import get_connectivity_graph, get_knn_graph, get_radius_graph
+from sentiment_cache import get_sentiment_cache
+
+# Columns of the dataframe used as features, by group. Features of the same group are transformed together.
+feature_group_columns = {
+    'binary': ['received_for_free', 'steam_purchase', 'voted_up'],
+    'generic': [
+        'num_games_owned',
+        'num_reviews',
+        'playtime_forever',
+        'votes_up',
+        'votes_funny',
+        'comment_count',
+        'weighted_vote_score',
+    ],
+    'length_correlated': [
+        'character_count',
+        'syllable_count',
+        'lexicon_count',
+        'sentence_count',
+    ],
+    'readability_correlated': [
+        'dale_chall_readability_score',
+        'flesch_reading_ease',
+        'difficult_words_count',
+    ],
+    'sentiment': ['polarity', 'subjectivity'],
+}
+
+# Above this number of reviews, methods which require a dense (#reviews x #reviews) matrix are replaced with
+# Mini-Batch K-Means, streamed over chunks of the feature matrix.
+max_num_reviews_for_dense_clustering = 10000
+
+# Number of clusters for Mini-Batch K-Means, when it replaces Affinity Propagation, which finds it automatically.
+num_clusters_for_large_review_sets = 8
 
 
 def test_imported_module():
@@ -31,10 +72,68 @@ def test_imported_module():
 
 
 def convert_from_pandas(data_frame):
-    # Convert from Pandas to NumPy arrays
+    # Convert from Pandas to a NumPy array of floats. The index of the dataframe is not a feature, so it is not included.
     # Reference: https://stackoverflow.com/a/22653050
 
-    return data_frame.reset_index().values
+    return data_frame.to_numpy(dtype=float)
+
+
+def get_feature_groups(df):
+    # Return a dictionary: feature group -> NumPy array of floats, with one row per review, cf. feature_group_columns.
+    feature_groups = {}
+    for (feature_group, columns) in feature_group_columns.items():
+        feature_groups[feature_group] = convert_from_pandas(df.loc[:, columns])
+
+    feature_groups['readability_correlated'] = np.nan_to_num(
+        feature_groups['readability_correlated'],
+    )
+
+    return feature_groups
+
+
+def create_preprocessing(incremental=False):
+    # Return a dictionary: feature group -> transformer. Binary features are not transformed.
+    # If incremental is True, the transformers can be fitted chunk by chunk, with partial_fit().
+    if incremental:
+        pca_class = IncrementalPCA
+    else:
+        pca_class = PCA
+
+    preprocessing = {}
+    preprocessing['generic'] = StandardScaler()
+    preprocessing['length_correlated'] = pca_class(n_components=2)
+    preprocessing['readability_correlated'] = pca_class(n_components=2)
+    preprocessing['sentiment'] = StandardScaler()
+
+    return preprocessing
+
+
+def fit_preprocessing(preprocessing, feature_groups, incremental=False):
+    for (feature_group, transformer) in preprocessing.items():
+        values = feature_groups[feature_group]
+
+        if not incremental:
+            transformer.fit(values)
+        elif len(values) >= getattr(transformer, 'n_components', 1):
+            # IncrementalPCA requires at least as many reviews as components in every chunk.
+            transformer.partial_fit(values)
+
+    return preprocessing
+
+
+def transform_feature_groups(preprocessing, feature_groups):
+    # Return the feature matrix, with the transformed feature groups side by side.
+    transformed_feature_groups = []
+
+    for (feature_group, values) in feature_groups.items():
+        if feature_group in preprocessing:
+            values = preprocessing[feature_group].transform(values)
+        transformed_feature_groups.append(values)
+
+    # noinspection PyPep8Naming
+    X = np.concatenate(transformed_feature_groups, axis=1)
+
+    return X
 
 
 def convert_from_pandas_dataframe_to_numpy_matrix(df, excluded_columns=None):
@@ -47,81 +146,13 @@ def convert_from_pandas_dataframe_to_numpy_matrix(df, excluded_columns=None):
         # noinspection PyPep8Naming
         D = df.loc[:, df.columns.difference(excluded_columns)]
 
-    # noinspection PyPep8Naming
-    D_binary = D.loc[:, ['received_for_free', 'steam_purchase', 'voted_up']]
-    # noinspection PyPep8,PyPep8Naming
-    D_generic = D.loc[
-        :,
-        [
-            'num_games_owned',
-            'num_reviews',
-            'playtime_forever',
-            'votes_up',
-            'votes_funny',
-            'comment_count',
-            'weighted_vote_score',
-        ],
-    ]
-    # noinspection PyPep8Naming
-    D_length_correlated = D.loc[
-        :,
-        ['character_count', 'syllable_count', 'lexicon_count', 'sentence_count'],
-    ]
-    # noinspection PyPep8Naming
-    D_readability_correlated = D.loc[
-        :,
-        [
-            'dale_chall_readability_score',
-            'flesch_reading_ease',
-            'difficult_words_count',
-        ],
-    ]
-    # noinspection PyPep8Naming
-    D_sentiment = D.loc[:, ['polarity', 'subjectivity']]
-
-    # noinspection PyPep8Naming
-    X_binary = convert_from_pandas(D_binary)
-    # noinspection PyPep8Naming
-    X_generic = convert_from_pandas(D_generic)
-    # noinspection PyPep8Naming
-    X_length_correlated = convert_from_pandas(D_length_correlated)
-    # noinspection PyPep8Naming
-    X_readability_correlated = convert_from_pandas(D_readability_correlated)
-    # noinspection PyPep8Naming
-    X_readability_correlated = np.nan_to_num(X_readability_correlated)
-
-    # noinspection PyPep8Naming
-    X_sentiment = convert_from_pandas(D_sentiment)
+    # The scalers and the PCA are fitted on the reviews of this appID only.
+    feature_groups = get_feature_groups(D)
 
-    scaler = StandardScaler()
-    # noinspection PyPep8Naming
-    X_generic_new = scaler.fit_transform(X_generic)
+    preprocessing = fit_preprocessing(create_preprocessing(), feature_groups)
 
-    pca_length = PCA(n_components=2)
     # noinspection PyPep8Naming
-    X_length_correlated_new = pca_length.fit_transform(X_length_correlated)
-
-    pca_readability = PCA(n_components=2)
-    # noinspection PyPep8Naming
-    X_readability_correlated_new = pca_readability.fit_transform(
-        X_readability_correlated,
-    )
-
-    sentiment_scaler = StandardScaler()
-    # noinspection PyPep8Naming
-    X_sentiment_new = sentiment_scaler.fit_transform(X_sentiment)
-
-    # noinspection PyPep8Naming
-    X = np.concatenate(
-        (
-            X_binary,
-            X_generic_new,
-            X_length_correlated_new,
-            X_readability_correlated_new,
-            X_sentiment_new,
-        ),
-        axis=1,
-    )
+    X = transform_feature_groups(preprocessing, feature_groups)
 
     return X
 
@@ -150,6 +181,8 @@ def show_representative_reviews(app_id, df, af, num_top_clusters=None, verbose=F
     # Show representative reviews, i.e. the reviews used as cluster centers for Affinity Propagation
     # df: dataframe
     # af: affinity propagation model
+    # Review texts are resolved with one indexed lookup, and their sentiments are computed in one batch.
+    from review_store import default_review_store
 
     cluster_centers_indices = af.cluster_centers_indices_
     # labels = af.labels_
@@ -166,10 +199,25 @@ def show_representative_reviews(app_id, df, af, num_top_clusters=None, verbose=F
     else:
         top_clusters = list_of_clusters_by_count[0:num_top_clusters]
 
-    for (cluster_count, cluster_iter) in enumerate(top_clusters):
-        ind = cluster_centers_indices[int(cluster_iter)]
-        review_id = list(df["recommendationid"])[ind]
-        review_content = get_review_content(app_id, review_id)
+    exemplar_indices = [
+        cluster_centers_indices[int(cluster_iter)] for cluster_iter in top_clusters
+    ]
+    review_ids = df["recommendationid"].to_numpy()[exemplar_indices]
+    reviews = default_review_store.get_reviews(app_id)
+
+    review_contents = []
+    for review_id in review_ids:
+        review = reviews.get(review_id)
+        if review is None:
+            review_contents.append("-1")
+        else:
+            review_contents.append(review['review'])
+
+    (polarities, subjectivities) = get_sentiment_cache().get_sentiments(
+        review_contents,
+    )
+
+    for (cluster_count, review_content) in enumerate(review_contents):
         # Reference: https://stackoverflow.com/a/18544440
         print(
             "\n ==== Cluster "
@@ -178,7 +226,12 @@ def show_representative_reviews(app_id, df, af, num_top_clusters=None, verbose=F
             + str(summary_labels[cluster_count])
             + ") ====",
         )
-        print_sentiment_analysis(review_content)
+        print(
+            format_sentiment_analysis(
+                polarities[cluster_count],
+                subjectivities[cluster_count],
+            ),
+        )
 
         try:
             print(review_content)
@@ -189,17 +242,21 @@ def show_representative_reviews(app_id, df, af, num_top_clusters=None, verbose=F
     return
 
 
-def print_sentiment_analysis(text):
-    blob = TextBlob(text)
-
-    print(
+def format_sentiment_analysis(polarity, subjectivity):
+    return (
         '=> Sentiment analysis: '
-        + f'polarity({blob.sentiment.polarity:.2f})'
+        + f'polarity({polarity:.2f})'
         + ' ; '
-        + f'subjectivity({blob.sentiment.subjectivity:.2f})'
-        + ')',
+        + f'subjectivity({subjectivity:.2f})'
+        + ')'
     )
 
+
+def print_sentiment_analysis(text):
+    (polarity, subjectivity) = get_sentiment_cache().get_sentiment(text)
+
+    print(format_sentiment_analysis(polarity, subjectivity))
+
     return
 
 
@@ -210,27 +267,28 @@ def show_fixed_number_of_reviews_from_given_cluster(
     cluster_count,
     provided_labels=None,
     max_num_reviews_to_print=None,
+    cluster_grouping=None,
 ):
     # The provided labels can be supplied directly to override the labels found with Affinity Propagation.
     # Typically used to show results obtained with other clustering methods.
 
     # You can display a given number of reviews per cluster by playing with the variable max_num_reviews_to_print.
 
-    if provided_labels is None:
-        provided_labels = []
-    if (provided_labels is None) or len(provided_labels) == 0:
-        labels = af.labels_
+    # The output of group_reviews_by_cluster() can be supplied, so that labels are not grouped again for every cluster.
 
-        (summary_labels, list_of_clusters_by_count) = get_top_clusters_by_count(af)
-    else:
-        labels = provided_labels
+    if cluster_grouping is None:
+        if provided_labels is None:
+            provided_labels = []
+        if (provided_labels is None) or len(provided_labels) == 0:
+            labels = af.labels_
+        else:
+            labels = provided_labels
 
-        (summary_labels, list_of_clusters_by_count) = get_top_clusters_by_count(
-            None,
-            provided_labels,
-        )
+        cluster_grouping = group_reviews_by_cluster(labels)
 
-    cluster_index = int(list_of_clusters_by_count[cluster_count])
+    (cluster_labels, members) = cluster_grouping
+
+    cluster_index = int(cluster_labels[cluster_count])
 
     if af is not None:
         cluster_centers_indices = af.cluster_centers_indices_
@@ -240,12 +298,13 @@ def show_fixed_number_of_reviews_from_given_cluster(
         cluster_centers_indices = None
         cluster_representative_ind = None
 
-    cluster_content_indices = [
-        i for i, x in enumerate(list(labels)) if x == cluster_index
-    ]
+    cluster_content_indices = members[cluster_count][:max_num_reviews_to_print]
+    cluster_size = len(members[cluster_count])
+
+    review_ids = df["recommendationid"].to_numpy()[cluster_content_indices]
 
     for (review_count, ind) in enumerate(cluster_content_indices):
-        review_id = list(df["recommendationid"])[ind]
+        review_id = review_ids[review_count]
         review_content = get_review_content(app_id, review_id)
 
         if (cluster_representative_ind is not None) and (
@@ -255,11 +314,6 @@ def show_fixed_number_of_reviews_from_given_cluster(
         else:
             info_str = ""
 
-        if (max_num_reviews_to_print is not None) and (
-            review_count >= max_num_reviews_to_print
-        ):
-            break
-
         # Reference: https://stackoverflow.com/a/18544440
         print(
             "\n ==== Review "
@@ -268,7 +322,7 @@ def show_fixed_number_of_reviews_from_given_cluster(
             + " in cluster "
             + chr(cluster_count + 65)
             + " (#reviews = "
-            + str(summary_labels[cluster_count])
+            + str(cluster_size)
             + ") ====",
         )
         print_sentiment_analysis(review_content)
@@ -301,6 +355,167 @@ def show_all_reviews_from_given_cluster(
     return
 
 
+def group_reviews_by_cluster(labels):
+    # Return the cluster labels sorted by decreasing number of reviews, and for each cluster, the sorted indices of its
+    # reviews. Labels are grouped once, with a stable sort, instead of scanning every label for every cluster.
+    (unique_labels, label_indices) = np.unique(labels, return_inverse=True)
+
+    cluster_sizes = np.bincount(label_indices, minlength=len(unique_labels))
+    members = np.split(
+        np.argsort(label_indices, kind='stable'),
+        np.cumsum(cluster_sizes)[:-1],
+    )
+
+    # Same order as get_top_clusters_by_count(), including for clusters of the same size, so that clusters are
+    # designated by the same letters.
+    (_, list_of_clusters_by_count) = get_top_clusters_by_count(None, labels)
+    cluster_labels = np.array(
+        [int(cluster_label) for cluster_label in list_of_clusters_by_count],
+        dtype=unique_labels.dtype,
+    )
+    cluster_order = np.searchsorted(unique_labels, cluster_labels)
+
+    return cluster_labels, [members[i] for i in cluster_order]
+
+
+def get_cluster_report_filename(app_id):
+    # Report folder
+    report_path = "data/cluster_reports/"
+
+    pathlib.Path(report_path).mkdir(parents=True, exist_ok=True)
+
+    return report_path + "cluster_report_" + app_id + ".txt"
+
+
+def build_cluster_report(
+    app_id,
+    df,
+    labels,
+    cluster_centers_indices=None,
+    num_reviews_to_show_per_cluster=None,
+):
+    # Return the lines of a report with the reviews of every cluster, with the same content as the output of
+    # show_fixed_number_of_reviews_from_given_cluster() called for every cluster.
+    # Review texts are resolved with one indexed lookup, and their sentiments are computed in one batch.
+    from review_store import default_review_store
+
+    (cluster_labels, members) = group_reviews_by_cluster(labels)
+
+    review_ids = df["recommendationid"].to_numpy()
+    reviews = default_review_store.get_reviews(app_id)
+
+    shown_members = [
+        cluster_members[:num_reviews_to_show_per_cluster] for cluster_members in members
+    ]
+
+    review_contents = []
+    for cluster_members in shown_members:
+        for ind in cluster_members:
+            review = reviews.get(review_ids[ind])
+            if review is None:
+                review_contents.append("-1")
+            else:
+                review_contents.append(review['review'])
+
+    (polarities, subjectivities) = get_sentiment_cache().get_sentiments(
+        review_contents,
+    )
+
+    lines = []
+    review_index = 0
+
+    for (cluster_count, cluster_label) in enumerate(cluster_labels):
+        if cluster_centers_indices is not None and cluster_label >= 0:
+            cluster_representative_ind = cluster_centers_indices[cluster_label]
+        else:
+            cluster_representative_ind = None
+
+        for (review_count, ind) in enumerate(shown_members[cluster_count]):
+            if ind == cluster_representative_ind:
+                info_str = " (representative)"
+            else:
+                info_str = ""
+
+            lines.append('')
+            lines.append(
+                " ==== Review "
+                + str(review_count + 1)
+                + info_str
+                + " in cluster "
+                + chr(cluster_count + 65)
+                + " (#reviews = "
+                + str(len(members[cluster_count]))
+                + ") ====",
+            )
+            lines.append(
+                format_sentiment_analysis(
+                    polarities[review_index],
+                    subjectivities[review_index],
+                ),
+            )
+            lines.append(review_contents[review_index])
+
+            review_index += 1
+
+    return lines
+
+
+def write_cluster_report(
+    app_id,
+    df,
+    labels,
+    cluster_centers_indices=None,
+    num_reviews_to_show_per_cluster=None,
+    filename=None,
+):
+    # Write the whole report to a file in one pass.
+    if filename is None:
+        filename = get_cluster_report_filename(app_id)
+
+    lines = build_cluster_report(
+        app_id,
+        df,
+        labels,
+        cluster_centers_indices,
+        num_reviews_to_show_per_cluster,
+    )
+
+    with open(filename, 'w', encoding='utf8') as f:
+        f.write(''.join(line + '\n' for line in lines))
+
+    return filename
+
+
+def print_cluster_report(
+    app_id,
+    df,
+    labels,
+    cluster_centers_indices=None,
+    num_reviews_to_show_per_cluster=None,
+):
+    # Show the reviews of every cluster, and the number of reviews in each cluster.
+    lines = build_cluster_report(
+        app_id,
+        df,
+        labels,
+        cluster_centers_indices,
+        num_reviews_to_show_per_cluster,
+    )
+
+    for line in lines:
+        try:
+            print(line)
+        except UnicodeEncodeError:
+            # Reference: https://stackoverflow.com/a/3224300
+            print(line.encode('ascii', 'ignore'))
+
+    # Display number of reviews in each cluster
+
+    get_top_clusters_by_count(None, labels, True)
+
+    return
+
+
 def show_data_frame_for_cluster_centers(df, af, num_top_clusters=None, verbose=True):
     cluster_centers_indices = af.cluster_centers_indices_
     # labels = af.labels_
@@ -323,11 +538,113 @@ def show_data_frame_for_cluster_centers(df, af, num_top_clusters=None, verbose=T
     return df_representative
 
 
+# noinspection PyPep8Naming
+def is_large_review_set(X, max_num_reviews=None):
+    if max_num_reviews is None:
+        max_num_reviews = max_num_reviews_for_dense_clustering
+
+    return bool(len(X) > max_num_reviews)
+
+
+# noinspection PyPep8Naming
+def get_exemplar_indices(X, labels, cluster_centers, chunk_size=4096):
+    # Return, for every cluster, the index of the review closest to the cluster center, or -1 if the cluster is empty.
+    # NB: Only the distance of each review to its own cluster center is computed, chunk by chunk.
+    labels = np.asarray(labels)
+
+    distances = np.empty(len(labels))
+    for start in range(0, len(labels), chunk_size):
+        end = start + chunk_size
+        differences = (
+            np.asarray(X[start:end], dtype=float) - cluster_centers[labels[start:end]]
+        )
+        distances[start:end] = np.einsum('ij,ij->i', differences, differences)
+
+    # Reviews sorted by cluster, then by distance to the cluster center
+    order = np.lexsort((distances, labels))
+    sorted_labels = labels[order]
+    is_closest = np.ones(len(order), dtype=bool)
+    is_closest[1:] = sorted_labels[1:] != sorted_labels[:-1]
+
+    exemplar_indices = np.full(len(cluster_centers), -1)
+    exemplar_indices[sorted_labels[is_closest]] = order[is_closest]
+
+    return exemplar_indices
+
+
+# noinspection PyPep8Naming
+def fit_mini_batch_kmeans(
+    X,
+    num_clusters=None,
+    batch_size=1024,
+    num_epochs=3,
+    random_state=0,
+):
+    # Out-of-core alternative to Affinity Propagation: Mini-Batch K-Means is fitted on shuffled chunks of X, so that
+    # memory usage does not depend on the number of reviews. The returned model has the same attributes as Affinity
+    # Propagation, i.e. labels_ and cluster_centers_indices_ (exemplar reviews), so that it can be displayed likewise.
+    if num_clusters is None:
+        num_clusters = num_clusters_for_large_review_sets
+
+    num_reviews = len(X)
+    num_clusters = min(num_clusters, num_reviews)
+    batch_size = max(batch_size, num_clusters)
+
+    # NB: n_init is not set, because partial_fit() initializes the centers only once, with the first chunk.
+    model = MiniBatchKMeans(
+        n_clusters=num_clusters,
+        batch_size=batch_size,
+        random_state=random_state,
+    )
+
+    rng = np.random.default_rng(random_state)
+
+    for _ in range(num_epochs):
+        indices = rng.permutation(num_reviews)
+        for start in range(0, num_reviews, batch_size):
+            # Sorted indices for a faster access to X, e.g. if X is memory-mapped
+            chunk_indices = np.sort(indices[start : start + batch_size])
+            if len(chunk_indices) < num_clusters:
+                continue
+            model.partial_fit(np.asarray(X[chunk_indices], dtype=float))
+
+    labels = np.empty(num_reviews, dtype=np.int32)
+    for start in range(0, num_reviews, batch_size):
+        end = start + batch_size
+        labels[start:end] = model.predict(np.asarray(X[start:end], dtype=float))
+
+    model.labels_ = labels
+    model.cluster_centers_indices_ = get_exemplar_indices(
+        X,
+        labels,
+        model.cluster_centers_,
+    )
+
+    return model
+
+
+# noinspection PyPep8Naming
+def fit_affinity_propagation(X, max_num_reviews=None):
+    # Affinity Propagation requires a dense (#reviews x #reviews) similarity matrix. For large sets of reviews, it is
+    # replaced with Mini-Batch K-Means.
+    if is_large_review_set(X, max_num_reviews):
+        print(
+            'Mini-Batch K-Means used instead of Affinity Propagation for '
+            + str(len(X))
+            + ' reviews.',
+        )
+        af = fit_mini_batch_kmeans(X)
+    else:
+        af = AffinityPropagation().fit(X)
+
+    return af
+
+
 # noinspection PyPep8Naming
 def try_affinity_propagation(app_id, df, X, num_top_clusters=4, verbose=False):
     # #############################################################################
     # Compute Affinity Propagation
-    af = AffinityPropagation().fit(X)
+    af = fit_affinity_propagation(X)
     cluster_centers_indices = af.cluster_centers_indices_
     labels = af.labels_
 
@@ -339,10 +656,7 @@ def try_affinity_propagation(app_id, df, X, num_top_clusters=4, verbose=False):
     n_clusters_ = len(cluster_centers_indices)
 
     print('\nEstimated number of clusters: %d' % n_clusters_)
-    print(
-        "Silhouette Coefficient: %0.3f"
-        % metrics.silhouette_score(X, labels, metric='sqeuclidean'),
-    )
+    print_clustering_evaluation(X, labels, metric='sqeuclidean')
 
     # Show reviews used as cluster centers of the top clusters
     show_representative_reviews(app_id, df, af, num_top_clusters, verbose)
@@ -360,34 +674,33 @@ def try_affinity_propagation(app_id, df, X, num_top_clusters=4, verbose=False):
     return labels
 
 
-# noinspection PyPep8Naming
-def try_birch(app_id, df, X, num_clusters_input=3, num_reviews_to_show_per_cluster=3):
-    # #############################################################################
-    # Compute Agglomerative Clustering with Birch as a first step
-
+def create_birch_model(num_clusters_input=3):
     brc = Birch(
         branching_factor=50,
         n_clusters=num_clusters_input,
         threshold=0.5,
         compute_labels=True,
     )
-    brc_labels = brc.fit_predict(X)
 
-    # Show Birch results
+    return brc
 
-    for cluster_count in range(num_clusters_input):
-        show_fixed_number_of_reviews_from_given_cluster(
-            app_id,
-            df,
-            None,
-            cluster_count,
-            brc_labels,
-            num_reviews_to_show_per_cluster,
-        )
 
-    # Display number of reviews in each cluster
+# noinspection PyPep8Naming
+def try_birch(app_id, df, X, num_clusters_input=3, num_reviews_to_show_per_cluster=3):
+    # #############################################################################
+    # Compute Agglomerative Clustering with Birch as a first step
 
-    get_top_clusters_by_count(None, brc_labels, True)
+    brc = create_birch_model(num_clusters_input)
+    brc_labels = brc.fit_predict(X)
+
+    # Show Birch results
+
+    print_cluster_report(
+        app_id,
+        df,
+        brc_labels,
+        num_reviews_to_show_per_cluster=num_reviews_to_show_per_cluster,
+    )
 
     return brc_labels
 
@@ -407,35 +720,38 @@ def try_agglomerative_clustering(
 
     # NB: linkage can be any of these: 'average', 'complete', 'ward'
 
-    if use_connectivity:
-        knn_graph = kneighbors_graph(X, 30, include_self=False)
-        connectivity = knn_graph  # one of these: None or knn_graph
+    if is_large_review_set(X):
+        # Agglomerative Clustering is quadratic in the number of reviews.
+        print(
+            'Mini-Batch K-Means used instead of Agglomerative Clustering for '
+            + str(len(X))
+            + ' reviews.',
+        )
+        agg_labels = fit_mini_batch_kmeans(X, num_clusters_input).labels_
     else:
-        connectivity = None
+        if use_connectivity:
+            # The k-nearest-neighbor graph is computed once per appID, and then loaded from the disk.
+            knn_graph = get_connectivity_graph(get_knn_graph(app_id, X, 30))
+            connectivity = knn_graph  # one of these: None or knn_graph
+        else:
+            connectivity = None
 
-    model = AgglomerativeClustering(
-        linkage=linkage,
-        connectivity=connectivity,
-        n_clusters=num_clusters_input,
-    )
+        model = AgglomerativeClustering(
+            linkage=linkage,
+            connectivity=connectivity,
+            n_clusters=num_clusters_input,
+        )
 
-    agg_labels = model.fit_predict(X)
+        agg_labels = model.fit_predict(X)
 
     # Show Agglomerative Clustering results
 
-    for cluster_count in range(num_clusters_input):
-        show_fixed_number_of_reviews_from_given_cluster(
-            app_id,
-            df,
-            None,
-            cluster_count,
-            agg_labels,
-            num_reviews_to_show_per_cluster,
-        )
-
-    # Display number of reviews in each cluster
-
-    get_top_clusters_by_count(None, agg_labels, True)
+    print_cluster_report(
+        app_id,
+        df,
+        agg_labels,
+        num_reviews_to_show_per_cluster=num_reviews_to_show_per_cluster,
+    )
 
     return agg_labels
 
@@ -457,7 +773,12 @@ def try_dbscan(
     # db_eps = 40
     # db_min_samples = 4
 
-    db = DBSCAN(eps=db_eps, min_samples=db_min_samples).fit(X)
+    # Neighbors within db_eps are found with the cached k-nearest-neighbor graph.
+    radius_graph = get_radius_graph(get_knn_graph(app_id, X), X, db_eps)
+
+    db = DBSCAN(eps=db_eps, min_samples=db_min_samples, metric='precomputed').fit(
+        radius_graph,
+    )
     core_samples_mask = np.zeros_like(db.labels_, dtype=bool)
     core_samples_mask[db.core_sample_indices_] = True
     dbscan_labels = db.labels_
@@ -470,23 +791,16 @@ def try_dbscan(
     )
 
     print('Estimated number of clusters: %d' % n_clusters_)
-    print("Silhouette Coefficient: %0.3f" % metrics.silhouette_score(X, dbscan_labels))
+    print_clustering_evaluation(X, dbscan_labels)
 
     # Show DBSCAN results
 
-    for cluster_count in range(num_clusters_including_noise_cluster):
-        show_fixed_number_of_reviews_from_given_cluster(
-            app_id,
-            df,
-            None,
-            cluster_count,
-            dbscan_labels,
-            num_reviews_to_show_per_cluster,
-        )
-
-    # Display number of reviews in each cluster
-
-    get_top_clusters_by_count(None, dbscan_labels, True)
+    print_cluster_report(
+        app_id,
+        df,
+        dbscan_labels,
+        num_reviews_to_show_per_cluster=num_reviews_to_show_per_cluster,
+    )
 
     return dbscan_labels
 
@@ -499,15 +813,12 @@ def test_every_clustering_method(app_id):
     # - if the goal were to remove low-quality reviews, a threshold on review lenght should be sufficient,
     # - for some games, the low-quality/"funny meme" reviews are not outliers, they constitute their own sizable cluster
 
-    # Features (columns) to exclude
-    excluded_columns = ["language", "recommendationid"]
-
     # Load Pandas dataframe
     df = analyze_app_id_in_english(app_id)
 
-    # Convert to NumPy matrix format
+    # Load the memory-mapped feature matrix, shared by every clustering method
     # noinspection PyPep8Naming
-    X = convert_from_pandas_dataframe_to_numpy_matrix(df, excluded_columns)
+    X = get_feature_matrix(app_id, df)
 
     # Demo of every clustering method
 
@@ -562,11 +873,11 @@ def apply_affinity_propagation(app_id, num_reviews_to_show_per_cluster=3):
     # Load Pandas dataframe
     df = analyze_app_id_in_english(app_id)
 
-    # Convert to NumPy matrix format
+    # Load the memory-mapped feature matrix
     # noinspection PyPep8Naming
-    X = convert_from_pandas_dataframe_to_numpy_matrix(df)
+    X = get_feature_matrix(app_id, df)
 
-    af = AffinityPropagation().fit(X)
+    af = fit_affinity_propagation(X)
     cluster_centers_indices = af.cluster_centers_indices_
     labels = af.labels_
 
@@ -578,39 +889,50 @@ def apply_affinity_propagation(app_id, num_reviews_to_show_per_cluster=3):
     n_clusters_ = len(cluster_centers_indices)
 
     print('\nEstimated number of clusters: %d' % n_clusters_)
-    print(
-        "Silhouette Coefficient: %0.3f"
-        % metrics.silhouette_score(X, labels, metric='sqeuclidean'),
-    )
+    print_clustering_evaluation(X, labels, metric='sqeuclidean')
 
     # Show Affinity Propagation results
 
-    for cluster_count in range(n_clusters_):
-        show_fixed_number_of_reviews_from_given_cluster(
-            app_id,
-            df,
-            af,
-            cluster_count,
-            labels,
-            num_reviews_to_show_per_cluster,
-        )
-
-    # Display number of reviews in each cluster
-
-    get_top_clusters_by_count(None, labels, True)
+    print_cluster_report(
+        app_id,
+        df,
+        labels,
+        cluster_centers_indices,
+        num_reviews_to_show_per_cluster,
+    )
 
     return df, labels
 
 
-def apply_birch(app_id, num_clusters_input=3, num_reviews_to_show_per_cluster=3):
+def apply_birch(
+    app_id,
+    num_clusters_input=3,
+    num_reviews_to_show_per_cluster=3,
+    use_saved_model=False,
+):
     # Cluster reviews for app_id using selected method (Birch and then Agglomerative Clustering)
 
     # Load Pandas dataframe
     df = analyze_app_id_in_english(app_id)
 
-    # Convert to NumPy matrix format
+    if use_saved_model:
+        # New reviews are assigned to the clusters of the saved model, which is only fitted again if they drift away.
+        from cluster_model import get_review_clusters
+
+        brc_labels = get_review_clusters(app_id, df, 'birch', num_clusters_input)
+
+        print_cluster_report(
+            app_id,
+            df,
+            brc_labels,
+            num_reviews_to_show_per_cluster=num_reviews_to_show_per_cluster,
+        )
+
+        return df, brc_labels
+
+    # Load the memory-mapped feature matrix
     # noinspection PyPep8Naming
-    X = convert_from_pandas_dataframe_to_numpy_matrix(df)
+    X = get_feature_matrix(app_id, df)
 
     brc_labels = try_birch(
         app_id,
@@ -63,6 +63,102 @@ def compute_bayesian_score(game_entry, bayes_prior):
     return bayesian_score
 
 
+def choose_prior_array(scores, num_votes, method='average'):
+    # Vectorized version of choose_prior(), for arrays of scores and numbers of votes, with one column per game.
+    # With 2D arrays, e.g. one row per language, there is one prior per row. Missing values are NaN.
+    # Methods:
+    # - 'average': average score and median number of votes, as in choose_prior(),
+    # - 'median': median score and median number of votes,
+    # - 'beta-binomial': method-of-moments fit of a beta-binomial model to the numbers of positive votes. The score of
+    #   the prior is the mean of the beta distribution, and its number of votes is the sum of the two shape parameters.
+    scores = np.asarray(scores, dtype=float)
+    num_votes = np.asarray(num_votes, dtype=float)
+
+    if method == 'average':
+        prior_score = np.nanmean(scores, axis=-1)
+        prior_num_votes = np.nanmedian(num_votes, axis=-1)
+    elif method == 'median':
+        prior_score = np.nanmedian(scores, axis=-1)
+        prior_num_votes = np.nanmedian(num_votes, axis=-1)
+    elif method == 'beta-binomial':
+        (prior_score, prior_num_votes) = fit_beta_binomial_prior(scores, num_votes)
+    else:
+        raise ValueError('Unknown method to choose the prior: ' + str(method))
+
+    bayes_prior = {}
+    bayes_prior['score'] = prior_score
+    bayes_prior['num_votes'] = prior_num_votes
+
+    return bayes_prior
+
+
+def fit_beta_binomial_prior(scores, num_votes, min_intra_class_correlation=1e-6):
+    # Method of moments based on the analysis of variance, where games are the classes and the intra-class correlation
+    # rho is equal to 1 / (1 + alpha + beta).
+    # Reference: Kleinman, J. C. (1973). Proportions with extraneous variance: single and independent samples.
+    # Journal of the American Statistical Association, 68(341), 46-54.
+    is_valid = np.isfinite(scores) & np.isfinite(num_votes) & (num_votes > 0)
+
+    n = np.where(is_valid, num_votes, 0)
+    num_positive_votes = np.where(is_valid, scores, 0) * n
+
+    num_games = np.sum(is_valid, axis=-1)
+    total_num_votes = np.sum(n, axis=-1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_score = np.sum(num_positive_votes, axis=-1) / total_num_votes
+
+        p = np.where(is_valid, num_positive_votes / n, 0)
+        sum_squares = np.sum(n * (p - mean_score[..., np.newaxis]) ** 2, axis=-1)
+
+        binomial_variance = mean_score * (1 - mean_score)
+        rho = (sum_squares - binomial_variance * (num_games - 1)) / (
+            binomial_variance
+            * (
+                total_num_votes
+                - np.sum(n**2, axis=-1) / total_num_votes
+                - (num_games - 1)
+            )
+        )
+
+    # Without over-dispersion, the prior is as strong as allowed by min_intra_class_correlation.
+    rho = np.clip(np.nan_to_num(rho, nan=1.0), min_intra_class_correlation, 1)
+
+    prior_score = mean_score
+    prior_num_votes = 1 / rho - 1
+
+    return prior_score, prior_num_votes
+
+
+def compute_bayesian_score_array(scores, num_votes, bayes_prior):
+    # Vectorized version of compute_bayesian_score(). The prior can be a dictionary of arrays returned by
+    # choose_prior_array() for 2D arrays, i.e. one prior per row, e.g. per language.
+    scores = np.asarray(scores, dtype=float)
+    num_votes = np.asarray(num_votes, dtype=float)
+
+    prior_score = np.asarray(bayes_prior['score'], dtype=float)[..., np.newaxis]
+    prior_num_votes = np.asarray(bayes_prior['num_votes'], dtype=float)[..., np.newaxis]
+
+    # Games without any vote get the score of the prior.
+    num_votes = np.nan_to_num(num_votes, nan=0.0)
+    scores = np.where(num_votes > 0, scores, 0)
+
+    bayesian_scores = (prior_num_votes * prior_score + num_votes * scores) / (
+        prior_num_votes + num_votes
+    )
+
+    return bayesian_scores
+
+
+def compute_bayesian_rating_array(scores, num_votes, method='average'):
+    # Choose the prior, then compute the Bayesian rating of every game, in one vectorized pass.
+    bayes_prior = choose_prior_array(scores, num_votes, method)
+
+    bayesian_scores = compute_bayesian_score_array(scores, num_votes, bayes_prior)
+
+    return bayesian_scores, bayes_prior
+
+
 def main():
     prior = {}
     prior['score'] = 0.7
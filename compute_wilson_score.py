@@ -1,7 +1,11 @@
 # Objective: compute the Wilson score given the numbers of positive and negative reviews
 
+from functools import lru_cache
 from math import sqrt
 
+import numpy as np
+from scipy.stats import norm
+
 # Quantiles of the normal distribution
 # Reference: https://en.wikipedia.org/wiki/Normal_distribution
 quantile_normal_dist_dict = {
@@ -22,6 +26,25 @@ quantile_normal_dist_dict = {
 }
 
 
+@lru_cache(maxsize=None)
+def compute_normal_quantile(confidence):
+    # Quantile of the normal distribution for a two-sided confidence interval at the given confidence level.
+    return float(norm.ppf((1 + confidence) / 2))
+
+
+def get_normal_quantile(confidence=0.95):
+    # NB: Tabulated values are used whenever possible, so that results do not depend on the numerical precision of SciPy.
+    try:
+        z_quantile = quantile_normal_dist_dict[confidence]
+    except KeyError:
+        z_quantile = compute_normal_quantile(confidence)
+    except TypeError:
+        # An array of confidence levels
+        z_quantile = norm.ppf((1 + np.asarray(confidence)) / 2)
+
+    return z_quantile
+
+
 def compute_wilson_score(num_pos, num_neg, confidence=0.95):
     # Reference: https://en.wikipedia.org/wiki/Binomial_proportion_confidence_interval#Wilson_score_interval
 
@@ -30,18 +53,7 @@ def compute_wilson_score(num_pos, num_neg, confidence=0.95):
     if not (num_neg >= 0):
         raise AssertionError()
 
-    if confidence in quantile_normal_dist_dict:
-        tabulated_confidence = confidence
-    else:
-        tabulated_confidence_list = list(quantile_normal_dist_dict.keys())
-        sorted(tabulated_confidence_list)
-        confidence = min(confidence, tabulated_confidence_list[-1])
-        diff_list = [(c - confidence) for c in tabulated_confidence_list]
-        index = min(i for i in range(len(diff_list)) if diff_list[i] >= 0)
-        tabulated_confidence = tabulated_confidence_list[index]
-        print(tabulated_confidence)
-
-    z_quantile = quantile_normal_dist_dict[tabulated_confidence]
+    z_quantile = get_normal_quantile(confidence)
 
     z2 = pow(z_quantile, 2)
     den = num_pos + num_neg + z2
@@ -62,6 +74,35 @@ def compute_wilson_score(num_pos, num_neg, confidence=0.95):
     return wilson_score_value
 
 
+def compute_wilson_score_array(num_pos, num_neg, confidence=0.95):
+    # Vectorized version of compute_wilson_score(), for arrays of numbers of positive and negative reviews.
+    # The Wilson score is NaN for entries without any review.
+    num_pos = np.asarray(num_pos, dtype=float)
+    num_neg = np.asarray(num_neg, dtype=float)
+
+    if not np.all(num_pos >= 0):
+        raise AssertionError()
+    if not np.all(num_neg >= 0):
+        raise AssertionError()
+
+    z_quantile = get_normal_quantile(confidence)
+
+    z2 = pow(z_quantile, 2)
+    num_votes = num_pos + num_neg
+    den = num_votes + z2
+
+    mean = (num_pos + z2 / 2) / den
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inside_sqrt = num_pos * num_neg / num_votes + z2 / 4
+
+    delta = (z_quantile * np.sqrt(inside_sqrt)) / den
+
+    wilson_score_array = np.where(num_votes > 0, mean - delta, np.nan)
+
+    return wilson_score_array
+
+
 def main():
     # Loop over the number of reviews
     for num_reviews in [pow(10, n) for n in range(5)]:
@@ -10,15 +10,15 @@ import numpy as np
 import pandas as pd
 import seaborn as sns
 from scipy import stats
-from textblob import TextBlob
-from textstat.textstat import textstat
+
+from text_metrics import compute_text_metrics
 
 sns.set(color_codes=True)
 
 np.random.seed(sum(map(ord, "distributions")))
 
 
-def load_data(app_id):
+def get_data_filename(app_id):
     # Data folder
     data_path = "data/"
 
@@ -26,41 +26,180 @@ def load_data(app_id):
 
     data_filename = data_path + json_filename
 
+    return data_filename
+
+
+def load_data(app_id):
+    data_filename = get_data_filename(app_id)
+
     with open(data_filename, encoding="utf8") as in_json_file:
         review_data = json.load(in_json_file)
 
     return review_data
 
 
-def describe_data(review_data):
+def describe_query_summary(query_summary):
     try:
-        query_summary = review_data['query_summary']
-
         sentence = 'Number of reviews: {0} ({1} up ; {2} down)'
         sentence = sentence.format(
             query_summary["total_reviews"],
             query_summary["total_positive"],
             query_summary["total_negative"],
         )
-    except KeyError:
+    except (KeyError, TypeError):
         query_summary = None
 
         sentence = 'Query summary cannot be found in the JSON file.'
 
     print(sentence)
 
-    reviews = list(review_data['reviews'].values())
+    return query_summary
+
 
-    sentence = 'Number of downloaded reviews: ' + str(len(reviews))
+def describe_num_downloaded_reviews(num_reviews):
+    sentence = 'Number of downloaded reviews: ' + str(num_reviews)
     print(sentence)
 
+    return
+
+
+def describe_data(review_data):
+    query_summary = describe_query_summary(review_data.get('query_summary'))
+
+    reviews = list(review_data['reviews'].values())
+
+    describe_num_downloaded_reviews(len(reviews))
+
     return query_summary, reviews
 
 
-def aggregate_reviews(app_id):
-    review_data = load_data(app_id)
+def describe_data_in_streaming_mode(app_id):
+    # Reviews are yielded one at a time from the JSON file, so that they are never all kept in memory.
+    from review_stream import load_query_summary, stream_reviews
+
+    query_summary = describe_query_summary(load_query_summary(app_id))
+
+    reviews = stream_reviews(app_id)
+
+    return query_summary, reviews
+
+
+# Keys of the dictionary returned by compute_review_metadata()
+compute_review_metadata_keys = [
+    'recommendationid',
+    'num_games_owned',
+    'num_reviews',
+    'playtime_forever',
+    'language',
+    'voted_up',
+    'votes_up',
+    'votes_funny',
+    'weighted_vote_score',
+    'comment_count',
+    'steam_purchase',
+    'received_for_free',
+]
+
+
+def compute_review_metadata(review):
+    # Compute the stats of a single review which do not depend on the review text.
+    review_row = {}
+
+    # Review ID
+    review_row['recommendationid'] = review["recommendationid"]
+
+    # Meta-data regarding the reviewers
+    review_row['num_games_owned'] = review['author']['num_games_owned']
+    review_row['num_reviews'] = review['author']['num_reviews']
+    review_row['playtime_forever'] = review['author']['playtime_forever']
+
+    # Meta-data regarding the reviews themselves
+    review_row['language'] = review['language']
+    review_row['voted_up'] = review['voted_up']
+    review_row['votes_up'] = review['votes_up']
+    review_row['votes_funny'] = review['votes_funny']
+    review_row['weighted_vote_score'] = review['weighted_vote_score']
+    review_row['comment_count'] = review['comment_count']
+    review_row['steam_purchase'] = review['steam_purchase']
+    review_row['received_for_free'] = review['received_for_free']
+
+    return review_row
+
+
+def compute_review_text_stats_in_batch(review_contents, executor=None, chunk_size=256):
+    # Compute the stats of reviews which only depend on the review text. These are the costly ones.
+    # Computations can be sent to a pool of processes (executor). Results are returned in the original order of the
+    # reviews, so that the output is identical to the one obtained without parallelism.
+    from sentiment_cache import get_sentiment_cache
+
+    # Sentiment analysis, only performed for texts which are not found in the sentiment cache
+    (polarities, subjectivities) = get_sentiment_cache().get_sentiments(
+        review_contents,
+        executor,
+    )
+
+    # Stats regarding the reviews themselves, computed with a single tokenization of the review text
+    if executor is None:
+        text_stats = [
+            compute_text_metrics(review_content) for review_content in review_contents
+        ]
+    else:
+        text_stats = list(
+            executor.map(compute_text_metrics, review_contents, chunksize=chunk_size),
+        )
+
+    for (review_row, polarity, subjectivity) in zip(
+        text_stats,
+        polarities.tolist(),
+        subjectivities.tolist(),
+    ):
+        review_row['polarity'] = polarity
+        review_row['subjectivity'] = subjectivity
+
+    return text_stats
+
 
-    (_, reviews) = describe_data(review_data)
+def get_known_text_stats(df, review_hashes):
+    # Index the text stats of a previous feature table by (review ID, hash of the review text).
+    text_stats_keys = [
+        key for key in df.columns if key not in compute_review_metadata_keys
+    ]
+
+    text_stats_columns = [df[key].tolist() for key in text_stats_keys]
+
+    known_text_stats = {}
+    for (row_count, review_id) in enumerate(df['recommendationid']):
+        known_text_stats[(review_id, review_hashes[row_count])] = {
+            key: column[row_count]
+            for (key, column) in zip(text_stats_keys, text_stats_columns)
+        }
+
+    return known_text_stats
+
+
+def aggregate_reviews_and_hashes(
+    app_id,
+    streaming=False,
+    workers=None,
+    known_text_stats=None,
+    batch_size=4096,
+):
+    # The text stats of a review are re-used if the review ID and the hash of the review text are in known_text_stats.
+    # Otherwise, i.e. for new or edited reviews, they are computed, in batches of reviews. Deleted reviews are dropped.
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    from feature_cache import compute_review_hash
+
+    if known_text_stats is None:
+        known_text_stats = {}
+
+    if streaming:
+        (_, reviews) = describe_data_in_streaming_mode(app_id)
+    else:
+        review_data = load_data(app_id)
+
+        (_, reviews) = describe_data(review_data)
 
     review_stats = {}
 
@@ -99,55 +238,136 @@ def aggregate_reviews(app_id):
 
     ##
 
-    for review in reviews:
-        review_content = review['review']
+    if (workers is not None) and (workers > 1):
+        # Worker processes are spawned rather than forked, so that they do not inherit the open connection to the
+        # sentiment cache, as in estimate_hype_in_batch.py.
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    else:
+        executor = None
+
+    review_hashes = []
+    pending_review_positions = []
+    pending_review_contents = []
 
-        # Review ID
-        review_stats['recommendationid'].append(review["recommendationid"])
-
-        # Meta-data regarding the reviewers
-        review_stats['num_games_owned'].append(review['author']['num_games_owned'])
-        review_stats['num_reviews'].append(review['author']['num_reviews'])
-        review_stats['playtime_forever'].append(review['author']['playtime_forever'])
-
-        # Meta-data regarding the reviews themselves
-        review_stats['language'].append(review['language'])
-        review_stats['voted_up'].append(review['voted_up'])
-        review_stats['votes_up'].append(review['votes_up'])
-        review_stats['votes_funny'].append(review['votes_funny'])
-        review_stats['weighted_vote_score'].append(review['weighted_vote_score'])
-        review_stats['comment_count'].append(review['comment_count'])
-        review_stats['steam_purchase'].append(review['steam_purchase'])
-        review_stats['received_for_free'].append(review['received_for_free'])
-
-        # Stats regarding the reviews themselves
-        review_stats['character_count'].append(len(review_content))
-        review_stats['syllable_count'].append(textstat.syllable_count(review_content))
-        review_stats['lexicon_count'].append(textstat.lexicon_count(review_content))
-        review_stats['sentence_count'].append(textstat.sentence_count(review_content))
-        review_stats['difficult_words_count'].append(
-            textstat.difficult_words(review_content),
+    def process_pending_reviews():
+        # Fill the placeholders of the pending reviews with their text stats.
+        text_stats = compute_review_text_stats_in_batch(
+            pending_review_contents,
+            executor,
         )
+
+        for (review_position, review_text_stats) in zip(
+            pending_review_positions,
+            text_stats,
+        ):
+            for key in review_text_stats:
+                review_stats[key][review_position] = review_text_stats[key]
+
+        pending_review_positions.clear()
+        pending_review_contents.clear()
+
+        return
+
+    for (review_position, review) in enumerate(reviews):
+        review_content = review['review']
+        review_hash = compute_review_hash(review_content)
+
+        review_row = compute_review_metadata(review)
+
         try:
-            review_stats['flesch_reading_ease'].append(
-                textstat.flesch_reading_ease(review_content),
+            review_row.update(
+                known_text_stats[(review_row['recommendationid'], review_hash)],
             )
-        except TypeError:
-            review_stats['flesch_reading_ease'].append(None)
-        review_stats['dale_chall_readability_score'].append(
-            textstat.dale_chall_readability_score(review_content),
+        except KeyError:
+            # Placeholders, which are filled once a batch of pending reviews has been processed.
+            pending_review_positions.append(review_position)
+            pending_review_contents.append(review_content)
+
+        for key in review_stats:
+            review_stats[key].append(review_row.get(key))
+        review_hashes.append(review_hash)
+
+        if len(pending_review_contents) >= batch_size:
+            process_pending_reviews()
+
+    if len(pending_review_contents) > 0:
+        process_pending_reviews()
+
+    if executor is not None:
+        executor.shutdown()
+
+    if streaming:
+        describe_num_downloaded_reviews(len(review_stats['recommendationid']))
+
+    if len(known_text_stats) > 0:
+        num_reviews = len(review_hashes)
+        num_known_reviews = sum(
+            (review_id, review_hash) in known_text_stats
+            for (review_id, review_hash) in zip(
+                review_stats['recommendationid'],
+                review_hashes,
+            )
+        )
+        print(
+            'Text stats re-used for {0} reviews ; computed for {1} reviews'.format(
+                num_known_reviews,
+                num_reviews - num_known_reviews,
+            ),
         )
 
-        # Sentiment analysis
-        blob = TextBlob(review_content)
-        review_stats['polarity'].append(blob.sentiment.polarity)
-        review_stats['subjectivity'].append(blob.sentiment.subjectivity)
+    return review_stats, review_hashes
+
+
+def aggregate_reviews(app_id, streaming=False, workers=None):
+    (review_stats, _) = aggregate_reviews_and_hashes(app_id, streaming, workers)
 
     return review_stats
 
 
-def aggregate_reviews_to_pandas(app_id):
-    review_stats = aggregate_reviews(app_id)
+def aggregate_reviews_to_pandas(
+    app_id,
+    streaming=False,
+    use_cache=True,
+    workers=None,
+    incremental=False,
+):
+    # The dataframe is cached on disk, and re-used as long as the review file is unchanged.
+    # In incremental mode, the text stats of the previous feature table are re-used for unchanged reviews, so that only
+    # new or edited reviews are processed after the review file has been downloaded again.
+    from feature_cache import (
+        compute_file_hash,
+        load_feature_cache,
+        load_feature_table,
+        save_feature_cache,
+    )
+
+    if use_cache or incremental:
+        source_hash = compute_file_hash(get_data_filename(app_id))
+
+    if use_cache:
+        df = load_feature_cache(app_id, source_hash)
+
+        if df is not None:
+            print('Review stats loaded from cache for appID = ' + app_id)
+            return df
+
+    known_text_stats = None
+
+    if incremental:
+        (previous_df, previous_review_hashes) = load_feature_table(app_id)
+
+        if previous_df is not None:
+            known_text_stats = get_known_text_stats(previous_df, previous_review_hashes)
+
+    (review_stats, review_hashes) = aggregate_reviews_and_hashes(
+        app_id,
+        streaming,
+        workers,
+        known_text_stats,
+    )
 
     df = pd.DataFrame(data=review_stats)
 
@@ -158,6 +378,9 @@ def aggregate_reviews_to_pandas(app_id):
     if "weighted_vote_score" in df.columns:
         df["weighted_vote_score"] = df["weighted_vote_score"].astype('float')
 
+    if use_cache or incremental:
+        save_feature_cache(app_id, df, source_hash, review_hashes)
+
     return df
 
 
@@ -239,16 +462,10 @@ def analyze_app_id_in_english(app_id):
 
 
 def get_review_content(app_id, review_id):
-    data = load_data(app_id)
-
-    reviews = list(data['reviews'].values())
-
-    review_content = "-1"
+    # Reviews are fetched through an in-memory store, so that the JSON file is not re-loaded for every review.
+    from review_store import default_review_store
 
-    for review in reviews:
-        if review['recommendationid'] == review_id:
-            review_content = review['review']
-            break
+    review_content = default_review_store.get_review_content(app_id, review_id)
 
     return review_content
 
@@ -1,6 +1,6 @@
 # Objective: rank games according to their hype (percentage of joke reviews among all reviews written in English).
 
-import steamspypi
+from steamspy_cache import get_steamspy_metadata
 
 
 def get_num_reviews(review_dict):
@@ -41,7 +41,7 @@ def get_wilson_score_deviation(review_dict, acceptable_reviews_dict):
     return wilson_score_deviation
 
 
-def compute_hype_and_wilson_score_deviation(app_id):
+def compute_hype_and_wilson_score_deviation(app_id, workers=None):
     from identify_joke_reviews import classify_reviews, get_review_sentiment_dictionary
 
     # Only reviews written in English are considered, for sentiment analysis to work.
@@ -58,6 +58,7 @@ def compute_hype_and_wilson_score_deviation(app_id):
         accepted_languages,
         perform_language_detection_with_google_tool,
         verbose_reviews_wrongly_tagged_as_written_in_english,
+        workers=workers,
     )
 
     prct_english_tags = review_dict['language_tag']['prct_English_tags']
@@ -104,8 +105,8 @@ def compute_hype_and_wilson_score_deviation(app_id):
 
 
 def print_ranking_according_to_keyword(hype_dict, keyword='hype'):
-    # Download latest SteamSpy data to have access to the matching between appID and game name
-    steam_spy_data = steamspypi.load()
+    # SteamSpy metadata, to have access to the matching between appID and game name
+    steamspy_metadata = get_steamspy_metadata()
 
     hype_ranking = sorted(
         hype_dict.keys(),
@@ -117,10 +118,7 @@ def print_ranking_according_to_keyword(hype_dict, keyword='hype'):
 
     print('\n' + formatted_keyword + ' output_ranking:')
     for (rank, appID) in enumerate(hype_ranking):
-        try:
-            app_name = steam_spy_data[appID]['name']
-        except KeyError:
-            app_name = 'unknown'
+        app_name = steamspy_metadata.get_name(appID)
         sentence = (
             '{0:3}. AppID: '
             + appID
@@ -0,0 +1,175 @@
+# Objective: run estimate_hype for many games in a pool of processes, and save the result of each game as soon as it is
+# available, so that an interrupted run can be resumed without processing again the games which are already done.
+
+import json
+import multiprocessing
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from describe_reviews import get_data_filename
+from estimate_hype import (
+    compute_hype_and_wilson_score_deviation,
+    print_ranking_according_to_keyword,
+)
+
+# Keys of the results, as in estimate_hype.main()
+hype_result_keys = [
+    'hype',
+    'wilson_score_deviation',
+    'proportion_English-tags',
+    'proportion_confirmed-English-tags',
+]
+
+
+def get_hype_result_path():
+    # Result folder
+    result_path = "data/hype/"
+
+    pathlib.Path(result_path).mkdir(parents=True, exist_ok=True)
+
+    return result_path
+
+
+def get_hype_result_filename(app_id):
+    return get_hype_result_path() + "hype_" + app_id + ".json"
+
+
+def get_review_file_signature(app_id):
+    # Size and modification time of the review file, used to detect games whose reviews have been downloaded again.
+    file_stats = os.stat(get_data_filename(app_id))
+
+    return [file_stats.st_size, file_stats.st_mtime_ns]
+
+
+def save_hype_result(app_id, hype_result):
+    result_filename = get_hype_result_filename(app_id)
+    temp_filename = result_filename + '.tmp'
+
+    # Write to a temporary file first, so that an interrupted run cannot leave a corrupted result behind.
+    with open(temp_filename, 'w', encoding='utf8') as f:
+        json.dump(hype_result, f)
+    os.replace(temp_filename, result_filename)
+
+    return
+
+
+def load_hype_result(app_id):
+    # Return the saved result of app_id, or None if there is none.
+    try:
+        with open(get_hype_result_filename(app_id), encoding='utf8') as f:
+            hype_result = json.load(f)
+    except (OSError, ValueError):
+        hype_result = None
+
+    return hype_result
+
+
+def is_hype_result_up_to_date(app_id, hype_result):
+    # Failed games are processed again, as well as games whose review file has changed since the result was saved.
+    if (hype_result is None) or (hype_result.get('status') != 'done'):
+        return False
+
+    try:
+        is_up_to_date = bool(
+            hype_result['signature'] == get_review_file_signature(app_id),
+        )
+    except OSError:
+        # The review file is gone. The saved result is the best that we can get.
+        is_up_to_date = True
+
+    return is_up_to_date
+
+
+def compute_hype_result(app_id):
+    # Run in a worker process.
+    signature = get_review_file_signature(app_id)
+
+    hype_values = compute_hype_and_wilson_score_deviation(app_id)
+
+    hype_result = {}
+    hype_result['status'] = 'done'
+    hype_result['signature'] = signature
+    for (key, value) in zip(hype_result_keys, hype_values):
+        hype_result[key] = float(value)
+
+    return hype_result
+
+
+def estimate_hype_in_batch(app_id_list, workers=None):
+    # Return a dictionary: appID -> results, for every game which has been successfully processed, now or previously.
+    # NB: If workers is None, there are as many worker processes as processors on the machine.
+
+    hype_results = {}
+    remaining_app_ids = []
+
+    for app_id in app_id_list:
+        hype_result = load_hype_result(app_id)
+
+        if is_hype_result_up_to_date(app_id, hype_result):
+            hype_results[app_id] = hype_result
+        else:
+            remaining_app_ids.append(app_id)
+
+    print(
+        'Number of games: {0} ({1} already processed ; {2} to process)'.format(
+            len(app_id_list),
+            len(hype_results),
+            len(remaining_app_ids),
+        ),
+    )
+
+    if len(remaining_app_ids) > 0:
+        # Worker processes are spawned rather than forked, so that each of them opens its own connection to the sentiment
+        # cache, instead of inheriting the connection of this process, which must not be shared across processes.
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+        ) as executor:
+            futures = {
+                executor.submit(compute_hype_result, app_id): app_id
+                for app_id in remaining_app_ids
+            }
+
+            for future in as_completed(futures):
+                app_id = futures[future]
+
+                try:
+                    hype_result = future.result()
+                except Exception as exception:
+                    # The failure is saved, so that the game is processed again when the batch is resumed.
+                    hype_result = {}
+                    hype_result['status'] = 'failed'
+                    hype_result['error'] = repr(exception)
+
+                    print('Failure for appID = ' + app_id + ': ' + repr(exception))
+                else:
+                    hype_results[app_id] = hype_result
+
+                save_hype_result(app_id, hype_result)
+
+    hype_dict = {
+        app_id: {key: hype_results[app_id][key] for key in hype_result_keys}
+        for app_id in app_id_list
+        if app_id in hype_results
+    }
+
+    return hype_dict
+
+
+def main(workers=None):
+    with open('idlist.txt') as f:
+        d = f.readlines()
+
+    app_id_list = [x.strip() for x in d]
+
+    result_dict = estimate_hype_in_batch(app_id_list, workers)
+
+    for keyword in hype_result_keys:
+        print_ranking_according_to_keyword(result_dict, keyword)
+
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Objective: cache the review statistics computed by aggregate_reviews_to_pandas() on disk, in a columnar format
+# (NumPy .npz), so that readability and sentiment features are not computed again while the review file is unchanged.
+
+import hashlib
+import os
+import pathlib
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+# Increment this value whenever the features or their format change, so that older caches are discarded.
+feature_cache_version = 2
+
+
+def get_feature_cache_path():
+    # Feature folder
+    feature_path = "data/features/"
+
+    return feature_path
+
+
+def get_feature_cache_filename(app_id):
+    return get_feature_cache_path() + "review_stats_" + app_id + ".npz"
+
+
+def compute_file_hash(filename, block_size=pow(2, 20)):
+    sha1 = hashlib.sha1()
+
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha1.update(block)
+
+    return sha1.hexdigest()
+
+
+def compute_review_hash(review_content):
+    # Hash of a review text, used to detect edited reviews.
+    review_hash = hashlib.blake2b(
+        review_content.encode('utf8'),
+        digest_size=8,
+    ).hexdigest()
+
+    return review_hash
+
+
+def save_feature_cache(app_id, df, source_hash, review_hashes):
+    # The hash of the review file is used to invalidate the whole cache, while the hashes of the review texts allow to
+    # re-use the features of unchanged reviews, cf. load_feature_table().
+    columns = list(df.columns)
+
+    arrays = {}
+    arrays['__columns__'] = np.array(columns, dtype=str)
+    arrays['__source_hash__'] = np.array(source_hash, dtype=str)
+    arrays['__version__'] = np.array(feature_cache_version)
+    arrays['__review_hashes__'] = np.array(review_hashes, dtype=str)
+
+    for (column_count, column) in enumerate(columns):
+        values = df[column].to_numpy()
+        if values.dtype == object:
+            # Strings, e.g. review IDs or languages, are stored as fixed-width unicode to avoid pickling.
+            values = values.astype(str)
+        arrays['column_' + str(column_count)] = values
+
+    pathlib.Path(get_feature_cache_path()).mkdir(parents=True, exist_ok=True)
+
+    cache_filename = get_feature_cache_filename(app_id)
+    temp_filename = cache_filename + '.tmp'
+
+    # Write to a temporary file first, so that an interrupted run cannot leave a corrupted cache behind.
+    with open(temp_filename, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(temp_filename, cache_filename)
+
+    return
+
+
+def load_feature_table(app_id, source_hash=None):
+    # Return the cached dataframe and the hashes of the review texts, or (None, None) if there is no cache.
+    # If source_hash is provided, the cache is also discarded if it does not match the current review file.
+
+    cache_filename = get_feature_cache_filename(app_id)
+
+    try:
+        with np.load(cache_filename, allow_pickle=False) as cache:
+            if int(cache['__version__']) != feature_cache_version:
+                return None, None
+            if (source_hash is not None) and (
+                str(cache['__source_hash__']) != source_hash
+            ):
+                return None, None
+
+            columns = [str(column) for column in cache['__columns__']]
+
+            data = {}
+            for (column_count, column) in enumerate(columns):
+                values = cache['column_' + str(column_count)]
+                if values.dtype.kind == 'U':
+                    values = values.astype(object)
+                data[column] = values
+
+            review_hashes = [
+                str(review_hash) for review_hash in cache['__review_hashes__']
+            ]
+    except (KeyError, ValueError, OSError, zipfile.BadZipFile):
+        return None, None
+
+    df = pd.DataFrame(data=data, columns=columns)
+
+    return df, review_hashes
+
+
+def load_feature_cache(app_id, source_hash):
+    # Return the cached dataframe, or None if there is no cache, or if it does not match the current review file.
+    (df, _) = load_feature_table(app_id, source_hash)
+
+    return df
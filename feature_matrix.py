@@ -0,0 +1,120 @@
+# Objective: build the feature matrix used for clustering once per appID, as one contiguous float32 array, and store it
+# as a .npy file, which is memory-mapped by every clustering method. Worker processes should open the file themselves
+# with load_feature_matrix(), instead of receiving the array, so that the matrix is shared through the page cache.
+
+import os
+import pathlib
+
+import numpy as np
+
+from describe_reviews import analyze_app_id_in_english, get_data_filename
+
+feature_matrix_dtype = np.float32
+
+
+def get_feature_matrix_path():
+    # Feature matrix folder
+    feature_matrix_path = "data/feature_matrix/"
+
+    pathlib.Path(feature_matrix_path).mkdir(parents=True, exist_ok=True)
+
+    return feature_matrix_path
+
+
+def get_feature_matrix_filenames(app_id):
+    feature_matrix_path = get_feature_matrix_path()
+
+    feature_matrix_filenames = {}
+    feature_matrix_filenames['features'] = (
+        feature_matrix_path + "features_" + app_id + ".npy"
+    )
+    feature_matrix_filenames['review_ids'] = (
+        feature_matrix_path + "review_ids_" + app_id + ".npy"
+    )
+
+    return feature_matrix_filenames
+
+
+def build_feature_matrix(df):
+    # Return the feature matrix of the reviews in df as a C-contiguous float32 array, one row per review.
+    from cluster_reviews import convert_from_pandas_dataframe_to_numpy_matrix
+
+    X = convert_from_pandas_dataframe_to_numpy_matrix(df)
+
+    return np.ascontiguousarray(X, dtype=feature_matrix_dtype)
+
+
+def save_feature_matrix(app_id, X, review_ids):
+    feature_matrix_filenames = get_feature_matrix_filenames(app_id)
+
+    for (key, values) in [
+        ('review_ids', np.array(review_ids, dtype=str)),
+        ('features', X),
+    ]:
+        temp_filename = feature_matrix_filenames[key] + '.tmp'
+
+        # Write to a temporary file first, so that an interrupted run cannot leave a corrupted file behind.
+        with open(temp_filename, 'wb') as f:
+            np.save(f, values)
+        os.replace(temp_filename, feature_matrix_filenames[key])
+
+    return
+
+
+def load_feature_matrix(app_id, mmap_mode='r'):
+    # Return the memory-mapped feature matrix and the review IDs of its rows, or (None, None) if there are none.
+    feature_matrix_filenames = get_feature_matrix_filenames(app_id)
+
+    try:
+        review_ids = np.load(feature_matrix_filenames['review_ids'])
+        X = np.load(feature_matrix_filenames['features'], mmap_mode=mmap_mode)
+    except (OSError, ValueError):
+        return None, None
+
+    if len(X) != len(review_ids):
+        return None, None
+
+    return X, review_ids
+
+
+def is_feature_matrix_up_to_date(app_id):
+    # The feature matrix is up-to-date if it is more recent than the review file.
+    feature_matrix_filenames = get_feature_matrix_filenames(app_id)
+
+    try:
+        is_up_to_date = all(
+            os.path.getmtime(feature_matrix_filename)
+            >= os.path.getmtime(get_data_filename(app_id))
+            for feature_matrix_filename in feature_matrix_filenames.values()
+        )
+    except OSError:
+        is_up_to_date = False
+
+    return is_up_to_date
+
+
+def get_feature_matrix(app_id, df=None, mmap_mode='r'):
+    # Return the memory-mapped feature matrix of the reviews in English, cf. analyze_app_id_in_english().
+    # If df is provided, its rows must be the ones of the matrix, otherwise the matrix is built again from df.
+    if is_feature_matrix_up_to_date(app_id):
+        (X, review_ids) = load_feature_matrix(app_id, mmap_mode)
+    else:
+        (X, review_ids) = (None, None)
+
+    if X is not None and df is not None:
+        if review_ids.tolist() != df["recommendationid"].astype(str).tolist():
+            X = None
+
+    if X is None:
+        if df is None:
+            df = analyze_app_id_in_english(app_id)
+
+        save_feature_matrix(
+            app_id,
+            build_feature_matrix(df),
+            df["recommendationid"].astype(str),
+        )
+
+        (X, _) = load_feature_matrix(app_id, mmap_mode)
+
+    return X
@@ -0,0 +1,205 @@
+# Objective: generate every regional ranking of hidden gems in one run. Vote counts per (app, language) are loaded once,
+# scores are computed for every (app, language) cell as one matrix operation, and only the top games are sorted.
+# NB: Rankings are written to data/regional_rankings/ by default, so that the archived results of the 'hidden-gems'
+# project, i.e. regional_rankings/ and hidden_gems.md, are left untouched.
+
+import pathlib
+
+import iso639
+import numpy as np
+
+from compute_bayesian_rating import choose_prior_array, compute_bayesian_score_array
+from compute_wilson_score import compute_wilson_score_array
+from review_language_counts import count_keys, get_review_language_counts
+from steamspy_cache import get_steamspy_metadata
+
+
+def get_language_name(language):
+    # Reference: ISO 639-1, e.g. 'zh-cn' -> 'Chinese'
+    try:
+        language_name = iso639.to_name(language.split('-')[0])
+    except iso639.NonExistentLanguageError:
+        language_name = language
+
+    return language_name
+
+
+def compute_score_matrix(
+    counts, score_type='wilson', confidence=0.95, method='average'
+):
+    # Return a matrix of scores of shape (apps x languages), with NaN for cells without any vote.
+    num_pos = np.asarray(counts[..., count_keys.index('voted_up')], dtype=float)
+    num_neg = np.asarray(counts[..., count_keys.index('voted_down')], dtype=float)
+    num_votes = num_pos + num_neg
+
+    if score_type == 'wilson':
+        scores = compute_wilson_score_array(num_pos, num_neg, confidence)
+    elif score_type == 'bayesian':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            observed_scores = np.where(num_votes > 0, num_pos / num_votes, np.nan)
+
+        # One prior per language, fitted on the games with at least one vote in this language.
+        bayes_prior = choose_prior_array(
+            observed_scores.T,
+            np.where(num_votes > 0, num_votes, np.nan).T,
+            method,
+        )
+        scores = compute_bayesian_score_array(
+            observed_scores.T,
+            num_votes.T,
+            bayes_prior,
+        ).T
+        scores[num_votes == 0] = np.nan
+    else:
+        raise ValueError('Unknown score type: ' + str(score_type))
+
+    return scores
+
+
+def get_top_indices(scores, num_top_games):
+    # Return the indices of the top games, sorted by decreasing score, for every column of the score matrix, and a mask
+    # which is False for the padding at the end of columns with fewer scored games than num_top_games.
+    # NB: Only the top games are sorted, after a partial selection with np.partition().
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+
+    num_games = scores.shape[0]
+    num_top_games = min(num_top_games, num_games)
+
+    if num_top_games < num_games:
+        # Score of the last top game in every column
+        kth_scores = -np.partition(-scores, num_top_games - 1, axis=0)[
+            num_top_games - 1
+        ]
+
+        # Games above this score are selected. Among games with this score, the ones with the lowest indices are
+        # selected, so that the selection does not depend on the partition algorithm.
+        is_above = scores > kth_scores
+        is_tied = scores == kth_scores
+        num_remaining_games = num_top_games - np.sum(is_above, axis=0)
+        is_selected = is_above | (
+            is_tied & (np.cumsum(is_tied, axis=0) <= num_remaining_games)
+        )
+
+        # Exactly num_top_games games are selected in every column.
+        (_, top_indices) = np.nonzero(is_selected.T)
+        top_indices = top_indices.reshape(scores.shape[1], num_top_games).T
+    else:
+        top_indices = np.broadcast_to(
+            np.arange(num_games)[:, np.newaxis],
+            scores.shape,
+        )
+
+    top_scores = np.take_along_axis(scores, top_indices, axis=0)
+
+    # Decreasing scores, then increasing indices for ties
+    order = np.lexsort((top_indices, -top_scores), axis=0)
+
+    top_indices = np.take_along_axis(top_indices, order, axis=0)
+    is_scored = np.isfinite(np.take_along_axis(top_scores, order, axis=0))
+
+    return top_indices, is_scored
+
+
+def format_ranking(app_ids, ranked_indices, steamspy_metadata):
+    # Return the lines of a markdown ranking, e.g. "00001.	[DUSK](http://store.steampowered.com/app/519860)".
+    lines = []
+
+    for (rank, index) in enumerate(ranked_indices):
+        app_id = str(app_ids[index])
+        app_name = steamspy_metadata.get_name(app_id)
+
+        lines.append(
+            '{0:05}.\t[{1}](http://store.steampowered.com/app/{2:6})'.format(
+                rank + 1,
+                app_name,
+                app_id,
+            ),
+        )
+
+    return lines
+
+
+def get_regional_rankings_path():
+    return "data/regional_rankings/"
+
+
+def write_lines(filename, lines):
+    with open(filename, 'w', encoding='utf8') as f:
+        f.write(''.join(line + '\n' for line in lines))
+
+    return
+
+
+def generate_regional_rankings(
+    score_type='wilson',
+    num_top_games_per_language=250,
+    num_top_games_in_summary=20,
+    num_top_games=1000,
+    output_path=None,
+    hidden_gems_filename=None,
+    counts_data=None,
+):
+    # counts_data: (appIDs, languages, count matrix), by default loaded from dict_review_languages.txt
+    if output_path is None:
+        output_path = get_regional_rankings_path()
+    if hidden_gems_filename is None:
+        hidden_gems_filename = output_path + 'hidden_gems.md'
+
+    if counts_data is None:
+        counts_data = get_review_language_counts()
+
+    (app_ids, languages, counts) = counts_data
+    languages = [str(language) for language in languages]
+
+    steamspy_metadata = get_steamspy_metadata()
+
+    pathlib.Path(output_path).mkdir(parents=True, exist_ok=True)
+
+    # Regional rankings: one column per language, all computed at once
+    scores = compute_score_matrix(counts, score_type)
+
+    (top_indices, is_scored) = get_top_indices(scores, num_top_games_per_language)
+
+    summary_lines = ['## Language ISO 639-1']
+    for language in languages:
+        summary_lines.append(
+            '* ' + language + '\t   --->\t' + get_language_name(language),
+        )
+
+    for (column, language) in enumerate(languages):
+        ranked_indices = top_indices[is_scored[:, column], column]
+
+        ranking_lines = format_ranking(app_ids, ranked_indices, steamspy_metadata)
+
+        write_lines(output_path + 'hidden_gems_' + language + '.md', ranking_lines)
+
+        summary_lines.append('')
+        summary_lines.append(
+            '### Top {0} hidden gems for {1} speakers'.format(
+                num_top_games_in_summary,
+                get_language_name(language),
+            ),
+        )
+        summary_lines += ranking_lines[:num_top_games_in_summary]
+
+    write_lines(output_path + 'README.md', summary_lines)
+
+    # Global ranking, with the votes of every language
+    global_scores = compute_score_matrix(counts.sum(axis=1, keepdims=True), score_type)
+
+    (top_indices, is_scored) = get_top_indices(global_scores, num_top_games)
+
+    write_lines(
+        hidden_gems_filename,
+        format_ranking(app_ids, top_indices[is_scored[:, 0], 0], steamspy_metadata),
+    )
+
+    return True
+
+
+def main():
+    return generate_regional_rankings()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,20 @@
 import sys
 
-from langdetect import DetectorFactory, detect, lang_detect_exception
+import numpy as np
+from langdetect import lang_detect_exception
 from textblob import TextBlob, exceptions
 
 from cluster_reviews import print_sentiment_analysis
 from compute_wilson_score import compute_wilson_score
-from describe_reviews import describe_data, get_review_content, load_data
+from describe_reviews import (
+    describe_data,
+    describe_data_in_streaming_mode,
+    describe_num_downloaded_reviews,
+    get_review_content,
+    load_data,
+)
+from language_detection import detect_languages
+from sentiment_cache import get_sentiment_cache
 
 
 def detect_language(review_content, blob=None, call_google_translate=False):
@@ -21,8 +30,8 @@ def detect_language(review_content, blob=None, call_google_translate=False):
         else:
             # It is up to the user to decide (trade-off accuracy vs. slower running time + Internet requirement).
 
-            DetectorFactory.seed = 0
-            detected_language = detect(review_content)
+            # Languages are identified by a cheap pre-filter if possible, otherwise by 'langdetect', and cached.
+            (detected_language,) = detect_languages([review_content])
 
     except exceptions.TranslatorError:
         # This exception can be raised by 'textblob'.
@@ -42,60 +51,70 @@ def get_review_sentiment_dictionary(
     accepted_languages=None,
     perform_language_detection_with_google_tool=False,
     verbose_reviews_wrongly_tagged_as_written_in_english=False,
+    streaming=False,
+    workers=None,
+    batch_size=4096,
 ):
     # A light version of aggregate_reviews() from describe_reviews.py
     # NB: Only reviews marked on Steam as being written in English are accepted for sentiment analysis to work properly.
 
     if accepted_languages is None:
         accepted_languages = ['english']
-    review_data = load_data(app_id)
 
     print('\nAppID: ' + app_id)
 
-    (_, reviews) = describe_data(review_data)
+    if streaming:
+        (_, reviews) = describe_data_in_streaming_mode(app_id)
+    else:
+        review_data = load_data(app_id)
+
+        (_, reviews) = describe_data(review_data)
 
     wrongly_tagged_review_id = []
-    count_reviews_wrongly_tagged_as_written_in_english = 0
     count_reviews_tagged_as_written_in_english = 0
+    num_reviews = 0
 
     review_dict = {}
-    review_dict['positive'] = {}
-    review_dict['negative'] = {}
-
-    for review in reviews:
-        if review['language'] in accepted_languages:
-            # Review ID
-            review_id = review["recommendationid"]
-
-            # Whether the review is marked on Steam as positive
-            is_positive_review = bool(review['voted_up'])
 
-            # Review text
-            review_content = review['review']
-
-            count_reviews_tagged_as_written_in_english += 1
-
-            # Sentiment analysis
-            blob = TextBlob(review_content)
+    # Reviews kept for sentiment analysis
+    sentiment_review_votes = []
+    sentiment_review_ids = []
+    sentiment_polarities = []
+    sentiment_subjectivities = []
+
+    # Reviews tagged as written in English, whose language and sentiment are checked in batches of batch_size reviews,
+    # so that review texts are not all kept in memory in streaming mode.
+    tagged_review_ids = []
+    tagged_review_votes = []
+    tagged_review_contents = []
+
+    def process_tagged_reviews():
+        # Check language with a tool to detect reviews WRONGLY tagged as English
+        if perform_language_detection_with_google_tool:
+            detected_languages = detect_languages(tagged_review_contents, workers)
+        else:
+            detected_languages = ['en'] * len(tagged_review_contents)
 
-            # Check language with a tool by Google to detect reviews WRONGLY tagged as English
-            if perform_language_detection_with_google_tool:
-                detected_language = detect_language(review_content, blob)
-            else:
-                detected_language = 'en'
+        # Reviews of this batch kept for sentiment analysis
+        sentiment_review_contents = []
 
+        for (review_id, is_positive_review, review_content, detected_language) in zip(
+            tagged_review_ids,
+            tagged_review_votes,
+            tagged_review_contents,
+            detected_languages,
+        ):
             # Hard-coded check for English language
             accepted_languages_iso = ['en']
             # TODO For generality, one would need to match accepted_languages to accepted_languages_iso (ISO 639-1)
             # cf. https://en.wikipedia.org/wiki/ISO_639-1
             # cf. https://gist.github.com/carlopires/1262033
             if detected_language not in accepted_languages_iso:
-                count_reviews_wrongly_tagged_as_written_in_english += 1
                 wrongly_tagged_review_id.append(review_id)
                 if verbose_reviews_wrongly_tagged_as_written_in_english:
                     print(
                         '\nReview #'
-                        + str(count_reviews_wrongly_tagged_as_written_in_english)
+                        + str(len(wrongly_tagged_review_id))
                         + ' detected as being written in '
                         + detected_language
                         + ' instead of English:',
@@ -103,16 +122,52 @@ def get_review_sentiment_dictionary(
                     print(review_content + '\n')
                 continue
 
-            if is_positive_review:
-                keyword = 'positive'
-            else:
-                keyword = 'negative'
+            sentiment_review_votes.append(is_positive_review)
+            sentiment_review_ids.append(review_id)
+            sentiment_review_contents.append(review_content)
+
+        # Sentiment analysis, only performed for texts which are not found in the sentiment cache
+        (polarities, subjectivities) = get_sentiment_cache().get_sentiments(
+            sentiment_review_contents,
+        )
+        sentiment_polarities.extend(polarities.tolist())
+        sentiment_subjectivities.extend(subjectivities.tolist())
+
+        tagged_review_ids.clear()
+        tagged_review_votes.clear()
+        tagged_review_contents.clear()
+
+        return
+
+    for review in reviews:
+        num_reviews += 1
+
+        if review['language'] in accepted_languages:
+            count_reviews_tagged_as_written_in_english += 1
+
+            # Review ID
+            tagged_review_ids.append(review["recommendationid"])
+
+            # Whether the review is marked on Steam as positive
+            tagged_review_votes.append(bool(review['voted_up']))
+
+            # Review text
+            tagged_review_contents.append(review['review'])
+
+            if len(tagged_review_contents) >= batch_size:
+                process_tagged_reviews()
 
-            review_dict[keyword][review_id] = {}
-            review_dict[keyword][review_id]['polarity'] = blob.sentiment.polarity
-            review_dict[keyword][review_id][
-                'subjectivity'
-            ] = blob.sentiment.subjectivity
+    if len(tagged_review_contents) > 0:
+        process_tagged_reviews()
+
+    count_reviews_wrongly_tagged_as_written_in_english = len(wrongly_tagged_review_id)
+
+    review_dict['reviews'] = build_review_table(
+        sentiment_review_ids,
+        sentiment_review_votes,
+        sentiment_polarities,
+        sentiment_subjectivities,
+    )
 
     review_dict['language_tag'] = {}
     review_dict['language_tag'][
@@ -124,7 +179,10 @@ def get_review_sentiment_dictionary(
     review_dict['language_tag'][
         'num_reviews_tagged_English'
     ] = count_reviews_tagged_as_written_in_english
-    review_dict['language_tag']['num_reviews'] = len(reviews)
+    review_dict['language_tag']['num_reviews'] = num_reviews
+
+    if streaming:
+        describe_num_downloaded_reviews(num_reviews)
 
     # Mostly display
 
@@ -206,6 +264,62 @@ def get_review_sentiment_dictionary(
     return review_dict
 
 
+def build_review_table(review_ids, review_votes, polarities, subjectivities):
+    # Struct of arrays, with one row per review, instead of nested dictionaries with one dictionary per review.
+    review_table = {}
+    review_table['recommendationid'] = np.array(review_ids, dtype=str)
+    review_table['voted_up'] = np.array(review_votes, dtype=bool)
+    review_table['polarity'] = np.asarray(polarities, dtype=float)
+    review_table['subjectivity'] = np.asarray(subjectivities, dtype=float)
+
+    return review_table
+
+
+def get_review_table(review_dict):
+    # Return the struct of arrays which describes the reviews of review_dict.
+    # NB: review_dict can also be in the legacy format, i.e. review_dict[keyword][review_id]['polarity'] with keyword in
+    #     ['positive', 'negative'], in which case it is converted on the fly.
+    if 'reviews' in review_dict:
+        return review_dict['reviews']
+
+    review_ids = []
+    review_votes = []
+    polarities = []
+    subjectivities = []
+
+    for keyword in ['positive', 'negative']:
+        for (review_id, review_sentiment) in review_dict[keyword].items():
+            review_ids.append(review_id)
+            review_votes.append(bool(keyword == 'positive'))
+            polarities.append(review_sentiment['polarity'])
+            subjectivities.append(review_sentiment['subjectivity'])
+
+    review_table = build_review_table(
+        review_ids,
+        review_votes,
+        polarities,
+        subjectivities,
+    )
+
+    return review_table
+
+
+def get_joke_review_mask(polarities, subjectivities, sentiment_threshold):
+    # Joke reviews necessarily have a polarity INSIDE the polarity interval, AND a subjectivity OUTSIDE the subjectivity
+    # interval. A review is acceptable if it is acceptable with respect to either polarity or subjectivity.
+    is_acceptable_wrt_polarity = (polarities < sentiment_threshold['polarity'][0]) | (
+        polarities > sentiment_threshold['polarity'][1]
+    )
+
+    is_acceptable_wrt_subjectivity = (
+        subjectivities >= sentiment_threshold['subjectivity'][0]
+    ) & (subjectivities <= sentiment_threshold['subjectivity'][1])
+
+    is_joke = ~(is_acceptable_wrt_polarity | is_acceptable_wrt_subjectivity)
+
+    return is_joke
+
+
 def classify_reviews(review_dict, sentiment_threshold=None, verbose=False):
     # The variable sentiment_threshold is a Python dictionary, which describes the criterion to distinguish between
     # acceptable and joke reviews, based on Sentiment Analysis.
@@ -217,43 +331,27 @@ def classify_reviews(review_dict, sentiment_threshold=None, verbose=False):
     # - polarity threshold:     [-1, 1] to avoid any polarity-based criterion (therefore solely rely on subjectivity)
     # - subjectivity threshold: [ 0, 1] to avoid any subjectivity-based criterion (therefore solely rely on polarity)
 
+    review_table = get_review_table(review_dict)
+
+    is_joke = get_joke_review_mask(
+        review_table['polarity'],
+        review_table['subjectivity'],
+        sentiment_threshold,
+    )
+
+    review_ids = review_table['recommendationid']
+
     acceptable_reviews_dict = {}
     joke_reviews_dict = {}
 
-    for keyword in ['positive', 'negative']:
-        current_review_ids = review_dict[keyword].keys()
-
-        # Polarity set used with OR: joke reviews necessarily have a polarity INSIDE the interval!
-        # noinspection PyPep8
-        acceptable_review_ids_wrt_polarity = [
-            reviewID
-            for reviewID in current_review_ids
-            if bool(
-                review_dict[keyword][reviewID]['polarity']
-                < sentiment_threshold['polarity'][0]
-                or review_dict[keyword][reviewID]['polarity']
-                > sentiment_threshold['polarity'][1],
-            )
-        ]
-
-        # Subjectivity interval used with AND: joke reviews necessarily have a subjectivity OUTSIDE the interval!
-        # noinspection PyPep8,PyPep8
-        acceptable_review_ids_wrt_subjectivity = [
-            reviewID
-            for reviewID in current_review_ids
-            if bool(
-                sentiment_threshold['subjectivity'][0]
-                <= review_dict[keyword][reviewID]['subjectivity']
-                <= sentiment_threshold['subjectivity'][1],
-            )
-        ]
-
-        acceptable_review_ids = set(acceptable_review_ids_wrt_polarity).union(
-            set(acceptable_review_ids_wrt_subjectivity),
+    for (keyword, is_keyword) in [
+        ('positive', review_table['voted_up']),
+        ('negative', ~review_table['voted_up']),
+    ]:
+        acceptable_reviews_dict[keyword] = set(
+            review_ids[is_keyword & ~is_joke].tolist(),
         )
-
-        acceptable_reviews_dict[keyword] = acceptable_review_ids
-        joke_reviews_dict[keyword] = current_review_ids - acceptable_review_ids
+        joke_reviews_dict[keyword] = set(review_ids[is_keyword & is_joke].tolist())
 
     if verbose:
         print(
@@ -276,8 +374,12 @@ def classify_reviews(review_dict, sentiment_threshold=None, verbose=False):
 
 
 def get_dictionary_wilson_score(review_dict, verbose=False):
-    num_pos = len(review_dict['positive'])
-    num_neg = len(review_dict['negative'])
+    if 'reviews' in review_dict:
+        num_pos = int(np.sum(review_dict['reviews']['voted_up']))
+        num_neg = len(review_dict['reviews']['voted_up']) - num_pos
+    else:
+        num_pos = len(review_dict['positive'])
+        num_neg = len(review_dict['negative'])
     wilson_score = compute_wilson_score(num_pos, num_neg)
 
     if verbose:
@@ -0,0 +1,142 @@
+# Objective: identify the language of many review texts at once. Obvious cases are settled by a cheap pre-filter based
+# on Unicode scripts and English stopwords, and only ambiguous texts are sent to 'langdetect', possibly in a pool of
+# processes. Results are cached on disk, one entry per text, cf. sentiment_cache.py.
+
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from langdetect import DetectorFactory, detect, lang_detect_exception
+
+from sentiment_cache import get_sentiment_cache
+
+# Language assigned to texts which cannot be identified, e.g. "10/10". Since such a review is very short, it is likely a
+# joke review, so we won't dismiss it from our study.
+default_language = 'en'
+
+# Minimal share of letters written in a given script for the script to settle the language of a text
+min_script_ratio = 0.9
+
+# Unicode scripts which settle the language of a text, with ISO 639-1 codes as returned by 'langdetect'.
+# NB: Japanese texts mix Kana and Han characters, and Korean texts can include Han characters, so that East Asian scripts
+# are counted together. Han characters alone are attributed to Simplified Chinese, and the Cyrillic script to Russian,
+# which is enough to flag reviews wrongly tagged as English.
+kana_pattern = re.compile(r'[\u3040-\u30ff]')
+hangul_pattern = re.compile(r'[\u1100-\u11ff\uac00-\ud7af]')
+han_pattern = re.compile(r'[\u4e00-\u9fff]')
+cyrillic_pattern = re.compile(r'[\u0400-\u04ff]')
+
+letter_pattern = re.compile(r'[^\W\d_]')
+ascii_letter_pattern = re.compile(r'[a-zA-Z]')
+word_pattern = re.compile(r"[a-z']+")
+
+# Frequent English words, which are rare in other languages written with the Latin script.
+# NB: Short words which are also frequent in other languages, e.g. 'a', 'in', 'is', 'me', 'no', 'so', 'was' or 'we' in
+# Spanish, Portuguese, Dutch or German, are excluded, so that such reviews are passed on to 'langdetect'.
+english_stopwords = set(
+    '''
+    about after and are because been can't could didn't doesn't don't every from game's good had has have
+    how i'm isn't it it's its just like much not one only other out really some than that the their them
+    then there there's they this very were what when which who with won't would you you're your
+    '''.split(),
+)
+
+# Minimal number and share of English stopwords for a text written with ASCII letters to be considered as English
+min_num_english_stopwords = 2
+min_english_stopword_ratio = 0.35
+
+
+def pre_filter_language(text):
+    # Return the language of the text if it is obvious, or None if the text is ambiguous.
+    letters = letter_pattern.findall(text)
+
+    if len(letters) == 0:
+        # Nothing to identify, e.g. "10/10" or an empty review.
+        return default_language
+
+    num_kana = len(kana_pattern.findall(text))
+    num_hangul = len(hangul_pattern.findall(text))
+    num_han = len(han_pattern.findall(text))
+
+    if num_kana + num_hangul + num_han >= min_script_ratio * len(letters):
+        if num_kana > 0:
+            return 'ja'
+        if num_hangul > 0:
+            return 'ko'
+        return 'zh-cn'
+
+    if len(cyrillic_pattern.findall(text)) >= min_script_ratio * len(letters):
+        return 'ru'
+
+    if len(ascii_letter_pattern.findall(text)) == len(letters):
+        words = word_pattern.findall(text.lower())
+        num_english_stopwords = sum(word in english_stopwords for word in words)
+
+        if (num_english_stopwords >= min_num_english_stopwords) and (
+            num_english_stopwords >= min_english_stopword_ratio * len(words)
+        ):
+            return 'en'
+
+    return None
+
+
+def detect_language_with_langdetect(text):
+    # The seed is set before every call, so that the result does not depend on the order in which texts are processed.
+    DetectorFactory.seed = 0
+
+    try:
+        detected_language = detect(text)
+    except lang_detect_exception.LangDetectException:
+        # This exception can be raised by 'langdetect'.
+        detected_language = default_language
+
+    return detected_language
+
+
+def detect_languages(texts, workers=None, chunk_size=64):
+    # Return a list with the language (ISO 639-1) of each text.
+    sentiment_cache = get_sentiment_cache()
+
+    languages = sentiment_cache.get_languages(texts)
+
+    # Texts which are not found in the cache, without duplicates
+    new_languages = {}
+    ambiguous_texts = []
+    for (text, language) in zip(texts, languages):
+        if language is None and text not in new_languages:
+            new_languages[text] = pre_filter_language(text)
+            if new_languages[text] is None:
+                ambiguous_texts.append(text)
+
+    if (workers is not None) and (workers > 1) and (len(ambiguous_texts) > 1):
+        # Worker processes are spawned rather than forked, because this process holds a connection to the sentiment
+        # cache, as in estimate_hype_in_batch.py.
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+        ) as executor:
+            detected_languages = list(
+                executor.map(
+                    detect_language_with_langdetect,
+                    ambiguous_texts,
+                    chunksize=chunk_size,
+                ),
+            )
+    else:
+        detected_languages = [
+            detect_language_with_langdetect(text) for text in ambiguous_texts
+        ]
+
+    new_languages.update(zip(ambiguous_texts, detected_languages))
+
+    sentiment_cache.set_languages(
+        list(new_languages.keys()),
+        list(new_languages.values()),
+    )
+
+    languages = [
+        new_languages[text] if language is None else language
+        for (text, language) in zip(texts, languages)
+    ]
+
+    return languages
@@ -0,0 +1,196 @@
+# Objective: build the sparse k-nearest-neighbor graph of the reviews of an appID once, and cache it on disk alongside
+# the feature matrix, so that Agglomerative Clustering (connectivity graph) and DBSCAN (precomputed radius graph) can
+# re-use it for every parameter setting, instead of searching for neighbors again.
+
+import os
+
+import numpy as np
+from scipy import sparse
+from sklearn.neighbors import NearestNeighbors
+
+from feature_matrix import (
+    get_feature_matrix,
+    get_feature_matrix_filenames,
+    get_feature_matrix_path,
+)
+
+# Default number of neighbors, as in cluster_reviews.try_agglomerative_clustering()
+default_num_neighbors = 30
+
+
+def get_knn_graph_filename(app_id, num_neighbors=None, approximate=False):
+    if num_neighbors is None:
+        num_neighbors = default_num_neighbors
+
+    knn_graph_filename = (
+        get_feature_matrix_path() + "knn_graph_" + app_id + "_" + str(num_neighbors)
+    )
+    if approximate:
+        knn_graph_filename += "_approximate"
+
+    return knn_graph_filename + ".npz"
+
+
+def compute_exact_knn_graph(X, num_neighbors):
+    # NB: Neighbors are searched with a tree, rather than by brute force, whenever the number of features allows it.
+    model = NearestNeighbors(n_neighbors=num_neighbors).fit(X)
+
+    # Without X, each review is excluded from its own neighbors.
+    return model.kneighbors_graph(mode='distance')
+
+
+def compute_approximate_knn_graph(X, num_neighbors, random_state=0):
+    # Approximate nearest neighbors with NN-Descent, if the optional package pynndescent is installed.
+    try:
+        import pynndescent
+    except ImportError:
+        print('pynndescent is not installed: exact nearest neighbors are used instead.')
+        return compute_exact_knn_graph(X, num_neighbors)
+
+    index = pynndescent.NNDescent(
+        X,
+        n_neighbors=num_neighbors + 1,
+        random_state=random_state,
+    )
+    (neighbor_indices, neighbor_distances) = index.neighbor_graph
+
+    # Each review is its own nearest neighbor: it is removed from the graph, as with compute_exact_knn_graph().
+    num_reviews = len(X)
+    is_other_review = neighbor_indices != np.arange(num_reviews)[:, np.newaxis]
+    # Keep exactly num_neighbors neighbors per review, even if a review is not found among its own neighbors.
+    is_other_review &= np.cumsum(is_other_review, axis=1) <= num_neighbors
+
+    rows = np.repeat(np.arange(num_reviews), is_other_review.sum(axis=1))
+
+    knn_graph = sparse.csr_matrix(
+        (
+            neighbor_distances[is_other_review],
+            (rows, neighbor_indices[is_other_review]),
+        ),
+        shape=(num_reviews, num_reviews),
+    )
+
+    return knn_graph
+
+
+def compute_knn_graph(X, num_neighbors=None, approximate=False):
+    # Return a sparse matrix of shape (#reviews x #reviews), with the distances to the nearest neighbors of each review.
+    if num_neighbors is None:
+        num_neighbors = default_num_neighbors
+
+    num_neighbors = min(num_neighbors, len(X) - 1)
+
+    if approximate:
+        knn_graph = compute_approximate_knn_graph(X, num_neighbors)
+    else:
+        knn_graph = compute_exact_knn_graph(X, num_neighbors)
+
+    return knn_graph.tocsr()
+
+
+def save_knn_graph(knn_graph_filename, knn_graph):
+    temp_filename = knn_graph_filename + '.tmp'
+
+    # Write to a temporary file first, so that an interrupted run cannot leave a corrupted graph behind.
+    with open(temp_filename, 'wb') as f:
+        sparse.save_npz(f, knn_graph, compressed=False)
+    os.replace(temp_filename, knn_graph_filename)
+
+    return
+
+
+def load_knn_graph(knn_graph_filename):
+    try:
+        knn_graph = sparse.load_npz(knn_graph_filename)
+    except (OSError, ValueError):
+        knn_graph = None
+
+    return knn_graph
+
+
+def get_knn_graph(app_id, X=None, num_neighbors=None, approximate=False):
+    # Return the k-nearest-neighbor graph of the feature matrix of app_id, computed once and then loaded from the disk.
+    # The cached graph is discarded if it is older than the feature matrix.
+    if X is None:
+        X = get_feature_matrix(app_id)
+
+    knn_graph_filename = get_knn_graph_filename(app_id, num_neighbors, approximate)
+
+    try:
+        is_up_to_date = os.path.getmtime(knn_graph_filename) >= os.path.getmtime(
+            get_feature_matrix_filenames(app_id)['features'],
+        )
+    except OSError:
+        is_up_to_date = False
+
+    if is_up_to_date:
+        knn_graph = load_knn_graph(knn_graph_filename)
+    else:
+        knn_graph = None
+
+    if knn_graph is None or knn_graph.shape[0] != len(X):
+        knn_graph = compute_knn_graph(X, num_neighbors, approximate)
+        save_knn_graph(knn_graph_filename, knn_graph)
+
+    return knn_graph
+
+
+def get_connectivity_graph(knn_graph):
+    # Connectivity graph for Agglomerative Clustering, i.e. the k-nearest-neighbor graph with ones instead of distances.
+    connectivity = knn_graph.copy()
+    connectivity.data = np.ones_like(connectivity.data)
+
+    return connectivity
+
+
+def get_radius_graph(knn_graph, X, radius):
+    # Return the sparse graph of the distances between reviews closer than radius, for DBSCAN with a precomputed metric.
+    # Neighbors are taken from the k-nearest-neighbor graph, which contains every neighbor within the radius, unless the
+    # k-th nearest neighbor is itself within the radius. Neighbors of these few reviews are searched again, so that the
+    # radius graph is exact (if the k-nearest-neighbor graph is exact).
+    num_reviews = knn_graph.shape[0]
+
+    knn_graph = knn_graph.tocoo()
+    is_within_radius = knn_graph.data <= radius
+
+    rows = knn_graph.row[is_within_radius]
+    columns = knn_graph.col[is_within_radius]
+    distances = knn_graph.data[is_within_radius]
+
+    # Reviews for which every nearest neighbor is within the radius
+    num_neighbors_within_radius = np.bincount(rows, minlength=num_reviews)
+    num_neighbors = np.bincount(knn_graph.row, minlength=num_reviews)
+    saturated_reviews = np.flatnonzero(
+        (num_neighbors_within_radius == num_neighbors) & (num_neighbors > 0),
+    )
+
+    if len(saturated_reviews) > 0:
+        model = NearestNeighbors(radius=radius).fit(X)
+        saturated_graph = model.radius_neighbors_graph(
+            X[saturated_reviews],
+            mode='distance',
+        ).tocoo()
+
+        rows = np.concatenate([rows, saturated_reviews[saturated_graph.row]])
+        columns = np.concatenate([columns, saturated_graph.col])
+        distances = np.concatenate([distances, saturated_graph.data])
+
+    # Symmetric graph, without any review in its own neighborhood, and without duplicate edges
+    is_other_review = rows != columns
+    (rows, columns) = (
+        np.concatenate([rows[is_other_review], columns[is_other_review]]),
+        np.concatenate([columns[is_other_review], rows[is_other_review]]),
+    )
+    distances = np.tile(distances[is_other_review], 2)
+
+    (_, unique_edges) = np.unique(
+        rows.astype(np.int64) * num_reviews + columns,
+        return_index=True,
+    )
+
+    radius_graph = sparse.csr_matrix(
+        (distances[unique_edges], (rows[unique_edges], columns[unique_edges])),
+        shape=(num_reviews, num_reviews),
+    )
+
+    return radius_graph
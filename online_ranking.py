@@ -0,0 +1,214 @@
+# Objective: maintain a ranking of games while new reviews arrive, instead of computing it again from every review file.
+# Each game has counters (positive, negative, joke and English reviews), so that ingesting a review updates its score in O(1).
+# The best games are kept in a heap with lazy deletion, and the state can be saved to disk and restored after a restart.
+
+import heapq
+import json
+import os
+import pathlib
+
+import numpy as np
+
+from compute_wilson_score import compute_wilson_score
+
+# Keys of the counters of each game
+counter_keys = ['num_pos', 'num_neg', 'num_joke', 'num_english']
+
+
+def get_online_ranking_filename():
+    # Data folder
+    data_path = "data/"
+
+    pathlib.Path(data_path).mkdir(parents=True, exist_ok=True)
+
+    return data_path + "online_ranking.json"
+
+
+def is_joke_review(review_content, sentiment_threshold=None):
+    # Same criterion as identify_joke_reviews.classify_reviews(), for a single review.
+    from identify_joke_reviews import get_joke_review_mask
+    from sentiment_cache import get_sentiment_cache
+
+    if (sentiment_threshold is None) or bool(len(sentiment_threshold) == 0):
+        sentiment_threshold = {'polarity': [-0.2, 0.2], 'subjectivity': [0.36, 1]}
+
+    (polarity, subjectivity) = get_sentiment_cache().get_sentiment(review_content)
+
+    is_joke = get_joke_review_mask(
+        np.array([polarity]),
+        np.array([subjectivity]),
+        sentiment_threshold,
+    )
+
+    return bool(is_joke[0])
+
+
+class OnlineRanking:
+    def __init__(self, keyword='wilson_score', bayes_prior=None, confidence=0.95):
+        # keyword: 'wilson_score', 'bayesian_rating' or 'hype'
+        # bayes_prior: dictionary with keys 'score' and 'num_votes', required for 'bayesian_rating'
+        if keyword not in ['wilson_score', 'bayesian_rating', 'hype']:
+            raise ValueError('Unknown keyword: ' + str(keyword))
+        if keyword == 'bayesian_rating' and bayes_prior is None:
+            raise ValueError('A prior is required for the Bayesian rating.')
+
+        self.keyword = keyword
+        self.bayes_prior = bayes_prior
+        self.confidence = confidence
+
+        # Counters: appID -> [num_pos, num_neg, num_joke, num_english], cf. counter_keys
+        self.counters = {}
+
+        # Current score of each game
+        self.scores = {}
+
+        # Heap of (-score, appID) entries. An entry is stale if the score of the game has changed since it was pushed.
+        self.heap = []
+
+    def compute_score(self, app_id):
+        (num_pos, num_neg, num_joke, num_english) = self.counters[app_id]
+        num_reviews = num_pos + num_neg
+
+        if num_reviews == 0:
+            return None
+
+        if self.keyword == 'hype' and num_english == 0:
+            # Jokes are only detected in English reviews, as in estimate_hype.get_hype().
+            return None
+
+        if self.keyword == 'wilson_score':
+            score = compute_wilson_score(num_pos, num_neg, self.confidence)
+        elif self.keyword == 'bayesian_rating':
+            score = (
+                self.bayes_prior['num_votes'] * self.bayes_prior['score'] + num_pos
+            ) / (self.bayes_prior['num_votes'] + num_reviews)
+        else:
+            score = num_joke / num_english
+
+        return score
+
+    def update_score(self, app_id):
+        score = self.compute_score(app_id)
+
+        if score is None:
+            self.scores.pop(app_id, None)
+        else:
+            self.scores[app_id] = score
+            heapq.heappush(self.heap, (-score, app_id))
+
+        # Remove stale entries once they outnumber the games, so that the heap size stays linear in the number of games.
+        if len(self.heap) > 2 * len(self.scores) + 64:
+            self.rebuild_heap()
+
+        return
+
+    def rebuild_heap(self):
+        self.heap = [(-score, app_id) for (app_id, score) in self.scores.items()]
+        heapq.heapify(self.heap)
+
+        return
+
+    def add_review(self, app_id, voted_up, is_joke=False, is_english=True):
+        # Update the counters and the score of app_id in O(1), and its position in the heap in O(log(#games)).
+        # is_english: whether the review was checked for jokes, i.e. whether it counts towards the hype.
+        app_id = str(app_id)
+
+        counters = self.counters.setdefault(app_id, [0, 0, 0, 0])
+        if voted_up:
+            counters[0] += 1
+        else:
+            counters[1] += 1
+        if is_joke:
+            counters[2] += 1
+        if is_english:
+            counters[3] += 1
+
+        self.update_score(app_id)
+
+        return
+
+    def add_steam_review(self, app_id, review, sentiment_threshold=None):
+        # Ingest a review as downloaded from Steam. Only reviews in English are checked for jokes, as in
+        # identify_joke_reviews.get_review_sentiment_dictionary().
+        is_english = bool(review['language'] == 'english')
+
+        if is_english:
+            is_joke = is_joke_review(review['review'], sentiment_threshold)
+        else:
+            is_joke = False
+
+        self.add_review(app_id, bool(review['voted_up']), is_joke, is_english)
+
+        return
+
+    def get_top(self, num_top_games=10):
+        # Return a list of (appID, score) for the best games, by decreasing score.
+        top_games = []
+        popped_entries = []
+        seen_app_ids = set()
+
+        while len(top_games) < num_top_games and len(self.heap) > 0:
+            (negative_score, app_id) = heapq.heappop(self.heap)
+
+            if self.scores.get(app_id) != -negative_score:
+                # Stale entry
+                continue
+
+            if app_id in seen_app_ids:
+                # Duplicate entry, if the score of the game went back to a previous value
+                continue
+            seen_app_ids.add(app_id)
+
+            top_games.append((app_id, -negative_score))
+            popped_entries.append((negative_score, app_id))
+
+        for entry in popped_entries:
+            heapq.heappush(self.heap, entry)
+
+        return top_games
+
+    def save(self, filename=None):
+        if filename is None:
+            filename = get_online_ranking_filename()
+
+        snapshot = {}
+        snapshot['keyword'] = self.keyword
+        snapshot['bayes_prior'] = self.bayes_prior
+        snapshot['confidence'] = self.confidence
+        snapshot['counters'] = self.counters
+
+        temp_filename = filename + '.tmp'
+
+        # Write to a temporary file first, so that an interrupted run cannot leave a corrupted snapshot behind.
+        with open(temp_filename, 'w', encoding='utf8') as f:
+            json.dump(snapshot, f)
+        os.replace(temp_filename, filename)
+
+        return
+
+
+def load_online_ranking(filename=None):
+    # Restore a ranking saved with OnlineRanking.save(), or return None if there is no snapshot.
+    if filename is None:
+        filename = get_online_ranking_filename()
+
+    try:
+        with open(filename, encoding='utf8') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    online_ranking = OnlineRanking(
+        snapshot['keyword'],
+        snapshot['bayes_prior'],
+        snapshot['confidence'],
+    )
+    online_ranking.counters = snapshot['counters']
+
+    for app_id in online_ranking.counters:
+        score = online_ranking.compute_score(app_id)
+        if score is not None:
+            online_ranking.scores[app_id] = score
+    online_ranking.rebuild_heap()
+
+    return online_ranking
@@ -0,0 +1,158 @@
+# Objective: convert dict_review_languages.txt, i.e. a Python dictionary appID -> language -> {voted, voted_up,
+# voted_down} written as text, to a compact columnar format (NumPy .npy files), which can be memory-mapped, so that
+# regional rankings do not have to parse the text file again.
+
+import ast
+import os
+import pathlib
+
+import numpy as np
+
+# Order of the counts along the last axis of the count matrix
+count_keys = ['voted', 'voted_up', 'voted_down']
+
+
+def get_review_language_dictionary_filename():
+    return "dict_review_languages.txt"
+
+
+def get_review_language_counts_path():
+    # Output folder
+    counts_path = "data/review_languages/"
+
+    pathlib.Path(counts_path).mkdir(parents=True, exist_ok=True)
+
+    return counts_path
+
+
+def get_review_language_counts_filenames(counts_path=None):
+    if counts_path is None:
+        counts_path = get_review_language_counts_path()
+
+    counts_filenames = {}
+    counts_filenames['app_ids'] = counts_path + "app_ids.npy"
+    counts_filenames['languages'] = counts_path + "languages.npy"
+    counts_filenames['counts'] = counts_path + "counts.npy"
+
+    return counts_filenames
+
+
+def load_review_language_dictionary(filename=None):
+    # Slow: the whole text file is parsed as a Python literal.
+    if filename is None:
+        filename = get_review_language_dictionary_filename()
+
+    with open(filename, encoding='utf8') as f:
+        review_language_dict = ast.literal_eval(f.read())
+
+    return review_language_dict
+
+
+def convert_review_language_dictionary(review_language_dict, languages=None):
+    # Return the appIDs, the languages (ISO 639-1), and an int32 matrix of counts of shape (apps x languages x 3),
+    # cf. count_keys. Languages missing for an app have zero counts.
+    app_ids = np.array(list(review_language_dict.keys()), dtype=str)
+
+    if languages is None:
+        languages = sorted(
+            {
+                language
+                for app_dict in review_language_dict.values()
+                for language in app_dict
+            },
+        )
+    languages = np.array(languages, dtype=str)
+
+    language_index = {language: column for (column, language) in enumerate(languages)}
+
+    counts = np.zeros((len(app_ids), len(languages), len(count_keys)), dtype=np.int32)
+
+    for (row, app_dict) in enumerate(review_language_dict.values()):
+        for (language, language_counts) in app_dict.items():
+            try:
+                column = language_index[language]
+            except KeyError:
+                continue
+            counts[row, column] = [language_counts[key] for key in count_keys]
+
+    return app_ids, languages, counts
+
+
+def save_review_language_counts(app_ids, languages, counts, counts_path=None):
+    counts_filenames = get_review_language_counts_filenames(counts_path)
+
+    for (key, values) in [
+        ('app_ids', app_ids),
+        ('languages', languages),
+        ('counts', counts),
+    ]:
+        temp_filename = counts_filenames[key] + '.tmp'
+
+        # Write to a temporary file first, so that an interrupted run cannot leave a corrupted file behind.
+        with open(temp_filename, 'wb') as f:
+            np.save(f, values)
+        os.replace(temp_filename, counts_filenames[key])
+
+    return
+
+
+def convert_review_language_file(filename=None, counts_path=None):
+    review_language_dict = load_review_language_dictionary(filename)
+
+    (app_ids, languages, counts) = convert_review_language_dictionary(
+        review_language_dict,
+    )
+
+    save_review_language_counts(app_ids, languages, counts, counts_path)
+
+    return app_ids, languages, counts
+
+
+def load_review_language_counts(mmap_mode='r', counts_path=None):
+    # Return the appIDs, the languages and the count matrix. By default, the count matrix is memory-mapped, i.e. it is
+    # not read from the disk until it is accessed.
+    counts_filenames = get_review_language_counts_filenames(counts_path)
+
+    app_ids = np.load(counts_filenames['app_ids'])
+    languages = np.load(counts_filenames['languages'])
+    counts = np.load(counts_filenames['counts'], mmap_mode=mmap_mode)
+
+    return app_ids, languages, counts
+
+
+def get_review_language_counts(filename=None, mmap_mode='r', counts_path=None):
+    # Load the converted counts, after converting the text file if it is missing or more recent than the conversion.
+    if filename is None:
+        filename = get_review_language_dictionary_filename()
+
+    counts_filenames = get_review_language_counts_filenames(counts_path)
+
+    try:
+        is_up_to_date = all(
+            os.path.getmtime(counts_filename) >= os.path.getmtime(filename)
+            for counts_filename in counts_filenames.values()
+        )
+    except OSError:
+        is_up_to_date = False
+
+    if not is_up_to_date:
+        convert_review_language_file(filename, counts_path)
+
+    return load_review_language_counts(mmap_mode, counts_path)
+
+
+def main():
+    (app_ids, languages, counts) = convert_review_language_file()
+
+    print(
+        'Review counts converted for {0} apps and {1} languages.'.format(
+            len(app_ids),
+            len(languages),
+        ),
+    )
+
+    return True
+
+
+if __name__ == "__main__":
+    main()
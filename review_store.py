@@ -0,0 +1,68 @@
+# Objective: keep the reviews of recently accessed appIDs in memory, indexed by review ID, so that displaying reviews
+# does not require to re-load and scan the whole JSON file for every single review.
+
+import os
+from collections import OrderedDict
+
+from describe_reviews import get_data_filename, load_data
+
+
+class ReviewStore:
+    def __init__(self, max_num_app_ids=8):
+        # Maximal number of appIDs kept in memory. The least recently used appID is evicted first.
+        self.max_num_app_ids = max_num_app_ids
+
+        # Ordered dictionary: appID -> (file modification time, dictionary: recommendationid -> review)
+        # The most recently used appID is at the end.
+        self.review_index = OrderedDict()
+
+    def get_reviews(self, app_id):
+        # The modification time is checked so that a file which has been downloaded again is re-loaded.
+        modification_time = os.path.getmtime(get_data_filename(app_id))
+
+        try:
+            (cached_modification_time, reviews) = self.review_index[app_id]
+        except KeyError:
+            cached_modification_time = None
+            reviews = None
+
+        if cached_modification_time == modification_time:
+            self.review_index.move_to_end(app_id)
+        else:
+            review_data = load_data(app_id)
+
+            reviews = {
+                review['recommendationid']: review
+                for review in review_data['reviews'].values()
+            }
+
+            self.review_index[app_id] = (modification_time, reviews)
+            self.review_index.move_to_end(app_id)
+
+            while len(self.review_index) > self.max_num_app_ids:
+                self.review_index.popitem(last=False)
+
+        return reviews
+
+    def get_review(self, app_id, review_id):
+        reviews = self.get_reviews(app_id)
+
+        return reviews.get(review_id)
+
+    def get_review_content(self, app_id, review_id):
+        review = self.get_review(app_id, review_id)
+
+        if review is None:
+            review_content = "-1"
+        else:
+            review_content = review['review']
+
+        return review_content
+
+    def clear(self):
+        self.review_index.clear()
+
+        return
+
+
+default_review_store = ReviewStore()
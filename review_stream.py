@@ -0,0 +1,189 @@
+# Objective: read a review file incrementally, one review at a time, so that peak memory does not depend on the
+# number of reviews stored in the JSON file.
+
+import json
+import os
+import re
+
+from describe_reviews import get_data_filename
+
+# Number of characters read from the file at once
+chunk_size = pow(2, 16)
+
+# Number of bytes read at the end of the file, where 'steamreviews' writes the query summary
+tail_size = pow(2, 16)
+
+# NB: Quotes inside JSON strings are escaped, so that this pattern can only match a key, not the text of a review.
+query_summary_key_pattern = re.compile(r'"query_summary"\s*:')
+
+whitespace_characters = ' \t\n\r'
+
+
+class JsonStreamReader:
+    # A minimal incremental reader for the review files written by 'steamreviews', i.e. a JSON object such as:
+    # {"reviews": {"<recommendationid>": {...}, ...}, "query_summary": {...}, "cursors": {...}}
+
+    def __init__(self, in_file):
+        self.in_file = in_file
+        self.buffer = ''
+        self.position = 0
+        self.is_end_of_file = False
+        self.decoder = json.JSONDecoder()
+
+    def read_more(self):
+        # Drop the characters which have already been consumed, then append a new chunk.
+        chunk = self.in_file.read(chunk_size)
+
+        if len(chunk) == 0:
+            self.is_end_of_file = True
+
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+
+        return
+
+    def peek(self):
+        # Return the next non-whitespace character, without consuming it.
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position] in whitespace_characters
+            ):
+                self.position += 1
+
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+
+            if self.is_end_of_file:
+                raise ValueError('Unexpected end of the JSON file.')
+
+            self.read_more()
+
+    def consume(self, expected_character):
+        character = self.peek()
+
+        if character != expected_character:
+            raise ValueError(
+                f'Expected {expected_character!r} in the JSON file, found {character!r}.',
+            )
+
+        self.position += 1
+
+        return
+
+    def read_value(self):
+        # Decode the next JSON value. If the buffer ends in the middle of the value, more data is read.
+        self.peek()
+
+        while True:
+            try:
+                (value, end) = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.is_end_of_file:
+                    raise
+                self.read_more()
+                continue
+
+            # A number could have been truncated at the end of the buffer, e.g. "12" instead of "123".
+            if end == len(self.buffer) and not self.is_end_of_file:
+                self.read_more()
+                continue
+
+            self.position = end
+
+            return value
+
+    def iterate_keys(self):
+        # Yield the keys of the JSON object starting at the current position, one at a time.
+        # NB: After each key, the caller has to consume the associated value, e.g. with read_value().
+        self.consume('{')
+
+        if self.peek() == '}':
+            self.position += 1
+            return
+
+        while True:
+            key = self.read_value()
+            self.consume(':')
+
+            yield key
+
+            if self.peek() == '}':
+                self.position += 1
+                return
+
+            self.consume(',')
+
+
+def stream_reviews(app_id):
+    # Yield the reviews of app_id one at a time, in the order in which they appear in the JSON file.
+
+    with open(get_data_filename(app_id), encoding="utf8") as in_json_file:
+        reader = JsonStreamReader(in_json_file)
+
+        for key in reader.iterate_keys():
+            if key == 'reviews':
+                for _ in reader.iterate_keys():
+                    yield reader.read_value()
+            else:
+                reader.read_value()
+
+    return
+
+
+def read_query_summary_from_tail(app_id):
+    # Read the query summary of app_id from the end of the file, without decoding the reviews.
+    # Return None if the query summary cannot be found there.
+    with open(get_data_filename(app_id), 'rb') as in_json_file:
+        in_json_file.seek(0, os.SEEK_END)
+        file_size = in_json_file.tell()
+
+        in_json_file.seek(max(0, file_size - tail_size))
+        # NB: The first bytes could be part of a multi-byte character, which has been cut.
+        tail = in_json_file.read().decode('utf8', errors='ignore')
+
+    matches = list(query_summary_key_pattern.finditer(tail))
+
+    if len(matches) == 0:
+        return None
+
+    position = matches[-1].end()
+    while position < len(tail) and tail[position] in whitespace_characters:
+        position += 1
+
+    try:
+        (query_summary, _) = json.JSONDecoder().raw_decode(tail, position)
+    except json.JSONDecodeError:
+        return None
+
+    if not isinstance(query_summary, dict):
+        return None
+
+    return query_summary
+
+
+def load_query_summary(app_id):
+    # Read the query summary of app_id, without keeping the reviews in memory.
+    # NB: 'steamreviews' writes the reviews before the query summary, so that it is first looked for at the end of the
+    # file. Otherwise, the whole file is read, but the reviews are decoded one at a time, and immediately discarded.
+
+    query_summary = read_query_summary_from_tail(app_id)
+
+    if query_summary is not None:
+        return query_summary
+
+    with open(get_data_filename(app_id), encoding="utf8") as in_json_file:
+        reader = JsonStreamReader(in_json_file)
+
+        for key in reader.iterate_keys():
+            if key == 'query_summary':
+                query_summary = reader.read_value()
+                break
+
+            if key == 'reviews':
+                for _ in reader.iterate_keys():
+                    reader.read_value()
+            else:
+                reader.read_value()
+
+    return query_summary
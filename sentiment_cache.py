@@ -0,0 +1,270 @@
+# Objective: cache the sentiment (polarity, subjectivity) and the detected language of review texts on disk, so that
+# the same text, e.g. a short joke review such as "10/10", is analyzed only once, across modules, games and runs.
+
+import hashlib
+import pathlib
+import sqlite3
+import time
+
+import numpy as np
+
+from batch_sentiment import compute_sentiment, compute_sentiments
+
+# Maximal number of parameters in a single SQL query
+sql_batch_size = 500
+
+# Access times are only used to evict the least recently used entries: an entry read less than this number of seconds
+# after its last recorded access is not updated, so that reading recent entries does not write to the disk.
+last_access_resolution = 3600
+
+# Access times to update are buffered, and written in a single transaction once there are this many of them.
+max_num_pending_accesses = 1000
+
+
+def get_sentiment_cache_filename():
+    # Cache folder
+    cache_path = "data/"
+
+    return cache_path + "sentiment_cache.sqlite"
+
+
+def normalize_text(text):
+    # NB: Only leading and trailing whitespaces are removed, because they do not change the sentiment or the language.
+    return text.strip()
+
+
+def compute_text_hash(text):
+    text_hash = hashlib.blake2b(
+        normalize_text(text).encode('utf8'),
+        digest_size=16,
+    ).hexdigest()
+
+    return text_hash
+
+
+def iterate_batches(values, batch_size=sql_batch_size):
+    for start in range(0, len(values), batch_size):
+        yield values[start : start + batch_size]
+
+
+class SentimentCache:
+    def __init__(self, filename=None, max_num_entries=pow(10, 6)):
+        if filename is None:
+            filename = get_sentiment_cache_filename()
+
+        # When the cache is full, the least recently used entries are evicted.
+        self.max_num_entries = max_num_entries
+
+        # The cache folder is only created once the cache is opened, since the file is written to.
+        pathlib.Path(filename).parent.mkdir(parents=True, exist_ok=True)
+
+        # NB: The timeout lets concurrent processes, e.g. estimate_hype_in_batch, wait for each other's writes.
+        self.connection = sqlite3.connect(filename, timeout=60)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS text_cache ('
+            'text_hash TEXT PRIMARY KEY, '
+            'polarity REAL, '
+            'subjectivity REAL, '
+            'language TEXT, '
+            'last_access REAL)',
+        )
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS last_access_index ON text_cache (last_access)',
+        )
+        self.connection.commit()
+
+        # Number of entries, counted once, and then incremented with every insertion, so that the table is not counted at
+        # every insertion. NB: Updates of existing entries are counted too. The table is only counted again by evict().
+        (self.num_entries,) = self.connection.execute(
+            'SELECT COUNT(*) FROM text_cache',
+        ).fetchone()
+
+        # Dictionary: text hash -> access time, to be written to the disk
+        self.pending_access_times = {}
+
+    def lookup(self, text_hashes, column_names):
+        # Return a dictionary: text hash -> tuple of values, for the hashes found in the cache.
+        entries = {}
+
+        now = time.time()
+
+        for batch in iterate_batches(sorted(set(text_hashes))):
+            query = 'SELECT text_hash, {0}, last_access FROM text_cache WHERE text_hash IN ({1})'
+            query = query.format(
+                ', '.join(column_names),
+                ', '.join('?' for _ in batch),
+            )
+            for row in self.connection.execute(query, batch):
+                values = row[1:-1]
+                last_access = row[-1]
+
+                if all(value is not None for value in values):
+                    entries[row[0]] = values
+
+                    if (last_access is None) or (
+                        now - last_access >= last_access_resolution
+                    ):
+                        self.pending_access_times[row[0]] = now
+
+        if len(self.pending_access_times) >= max_num_pending_accesses:
+            self.write_access_times()
+            self.connection.commit()
+
+        return entries
+
+    def write_access_times(self):
+        # NB: The transaction is committed by the caller.
+        if len(self.pending_access_times) > 0:
+            self.connection.executemany(
+                'UPDATE text_cache SET last_access = ? WHERE text_hash = ?',
+                [
+                    (access_time, text_hash)
+                    for (text_hash, access_time) in self.pending_access_times.items()
+                ],
+            )
+            self.pending_access_times.clear()
+
+        return
+
+    def store(self, entries, column_names):
+        # Insert or update entries, given as a dictionary: text hash -> tuple of values.
+        if len(entries) == 0:
+            return
+
+        now = time.time()
+
+        query = (
+            'INSERT INTO text_cache (text_hash, {0}, last_access) VALUES (?, {1}, ?) '
+            'ON CONFLICT(text_hash) DO UPDATE SET {2}, last_access = excluded.last_access'
+        )
+        query = query.format(
+            ', '.join(column_names),
+            ', '.join('?' for _ in column_names),
+            ', '.join(name + ' = excluded.' + name for name in column_names),
+        )
+
+        self.connection.executemany(
+            query,
+            [
+                (text_hash,) + tuple(values) + (now,)
+                for (text_hash, values) in entries.items()
+            ],
+        )
+        # Buffered access times are written in the same transaction.
+        self.write_access_times()
+        self.connection.commit()
+
+        self.num_entries += len(entries)
+
+        if self.num_entries > self.max_num_entries:
+            self.evict()
+
+        return
+
+    def evict(self):
+        # The entries are counted exactly, e.g. to take into account the insertions of other processes.
+        (num_entries,) = self.connection.execute(
+            'SELECT COUNT(*) FROM text_cache',
+        ).fetchone()
+
+        if num_entries > self.max_num_entries:
+            # Remove a bit more than necessary, so that eviction does not happen at every insertion.
+            num_entries_to_remove = num_entries - int(0.9 * self.max_num_entries)
+
+            self.connection.execute(
+                'DELETE FROM text_cache WHERE text_hash IN '
+                '(SELECT text_hash FROM text_cache ORDER BY last_access LIMIT ?)',
+                (num_entries_to_remove,),
+            )
+            self.connection.commit()
+
+            num_entries -= num_entries_to_remove
+
+        self.num_entries = num_entries
+
+        return
+
+    def get_sentiments(self, texts, executor=None, chunk_size=256):
+        # Return two NumPy arrays (polarity and subjectivity), with one entry per text.
+        # Only texts which are not found in the cache are analyzed, optionally with a pool of processes (executor).
+        column_names = ['polarity', 'subjectivity']
+
+        text_hashes = [compute_text_hash(text) for text in texts]
+
+        entries = self.lookup(text_hashes, column_names)
+
+        missing_texts = {}
+        for (text_hash, text) in zip(text_hashes, texts):
+            if text_hash not in entries:
+                missing_texts[text_hash] = normalize_text(text)
+
+        if executor is None:
+            (polarity, subjectivity) = compute_sentiments(list(missing_texts.values()))
+            scores = zip(polarity.tolist(), subjectivity.tolist())
+        else:
+            scores = executor.map(
+                compute_sentiment,
+                missing_texts.values(),
+                chunksize=chunk_size,
+            )
+
+        new_entries = dict(zip(missing_texts.keys(), scores))
+        self.store(new_entries, column_names)
+
+        entries.update(new_entries)
+
+        polarity = np.array([entries[text_hash][0] for text_hash in text_hashes])
+        subjectivity = np.array([entries[text_hash][1] for text_hash in text_hashes])
+
+        return polarity, subjectivity
+
+    def get_sentiment(self, text):
+        # Return a (polarity, subjectivity)-tuple for a single text.
+        (polarity, subjectivity) = self.get_sentiments([text])
+
+        return float(polarity[0]), float(subjectivity[0])
+
+    def get_languages(self, texts):
+        # Return a list with the cached language of each text, or None if the language is unknown.
+        text_hashes = [compute_text_hash(text) for text in texts]
+
+        entries = self.lookup(text_hashes, ['language'])
+
+        languages = [
+            entries[text_hash][0] if text_hash in entries else None
+            for text_hash in text_hashes
+        ]
+
+        return languages
+
+    def set_languages(self, texts, languages):
+        entries = {
+            compute_text_hash(text): (language,)
+            for (text, language) in zip(texts, languages)
+        }
+        self.store(entries, ['language'])
+
+        return
+
+    def close(self):
+        self.write_access_times()
+        self.connection.commit()
+
+        self.connection.close()
+
+        return
+
+
+default_sentiment_cache = None
+
+
+def get_sentiment_cache():
+    # The default cache is opened once per process, when it is first needed.
+    global default_sentiment_cache
+
+    if default_sentiment_cache is None:
+        default_sentiment_cache = SentimentCache()
+
+    return default_sentiment_cache
@@ -0,0 +1,160 @@
+# Objective: keep a compact local copy of the SteamSpy metadata (appID -> name, owners, positive, negative), so that
+# SteamSpy data is downloaded and parsed at most once per time-to-live, and loaded at most once per process.
+
+import os
+import pathlib
+import time
+
+import numpy as np
+import steamspypi
+
+# Time-to-live of the local copy, in seconds
+steamspy_cache_ttl = 24 * 3600
+
+# In offline mode, SteamSpy is never queried: the local copy is used whatever its age.
+is_steamspy_cache_offline = False
+
+steamspy_metadata_columns = ['appid', 'name', 'owners', 'positive', 'negative']
+
+
+def get_steamspy_cache_filename():
+    # Cache folder
+    cache_path = "data/steamspy/"
+
+    pathlib.Path(cache_path).mkdir(parents=True, exist_ok=True)
+
+    return cache_path + "steamspy_metadata.npz"
+
+
+class SteamSpyMetadata:
+    def __init__(self, columns, timestamp=None):
+        # Columns: a dictionary of NumPy arrays, with one row per app, cf. steamspy_metadata_columns.
+        self.columns = columns
+        self.timestamp = timestamp
+
+        # Index: appID -> row
+        self.row_index = {
+            app_id: row for (row, app_id) in enumerate(self.columns['appid'].tolist())
+        }
+
+    def __len__(self):
+        return len(self.row_index)
+
+    def __contains__(self, app_id):
+        return bool(str(app_id) in self.row_index)
+
+    def get_value(self, app_id, column_name, default_value=None):
+        try:
+            row = self.row_index[str(app_id)]
+        except KeyError:
+            return default_value
+
+        return self.columns[column_name][row].item()
+
+    def get_name(self, app_id, default_name='unknown'):
+        return self.get_value(app_id, 'name', default_name)
+
+
+def convert_steamspy_data(steam_spy_data):
+    # Convert the dictionary returned by steamspypi.load() to a SteamSpyMetadata object.
+    columns = {column_name: [] for column_name in steamspy_metadata_columns}
+
+    for (app_id, app_data) in steam_spy_data.items():
+        columns['appid'].append(str(app_id))
+        columns['name'].append(str(app_data.get('name', '')))
+        columns['owners'].append(str(app_data.get('owners', '0')))
+        columns['positive'].append(int(app_data.get('positive', 0)))
+        columns['negative'].append(int(app_data.get('negative', 0)))
+
+    metadata_columns = {}
+    for column_name in ['appid', 'name', 'owners']:
+        metadata_columns[column_name] = np.array(columns[column_name], dtype=str)
+    for column_name in ['positive', 'negative']:
+        metadata_columns[column_name] = np.array(columns[column_name], dtype=np.int64)
+
+    return SteamSpyMetadata(metadata_columns, timestamp=time.time())
+
+
+def save_steamspy_metadata(steamspy_metadata, cache_filename=None):
+    if cache_filename is None:
+        cache_filename = get_steamspy_cache_filename()
+
+    arrays = dict(steamspy_metadata.columns)
+    arrays['__timestamp__'] = np.array(steamspy_metadata.timestamp)
+
+    temp_filename = cache_filename + '.tmp'
+
+    # Write to a temporary file first, so that an interrupted run cannot leave a corrupted cache behind.
+    with open(temp_filename, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(temp_filename, cache_filename)
+
+    return
+
+
+def load_steamspy_metadata_from_disk(cache_filename=None):
+    # Return the local copy, or None if there is none.
+    if cache_filename is None:
+        cache_filename = get_steamspy_cache_filename()
+
+    try:
+        with np.load(cache_filename, allow_pickle=False) as cache:
+            columns = {
+                column_name: cache[column_name]
+                for column_name in steamspy_metadata_columns
+            }
+            timestamp = float(cache['__timestamp__'])
+    except (KeyError, ValueError, OSError):
+        return None
+
+    return SteamSpyMetadata(columns, timestamp)
+
+
+def load_steamspy_metadata(ttl=None, offline=None, cache_filename=None):
+    # Return the local copy if it is recent enough, otherwise refresh it with SteamSpy data.
+    if ttl is None:
+        ttl = steamspy_cache_ttl
+    if offline is None:
+        offline = is_steamspy_cache_offline
+
+    steamspy_metadata = load_steamspy_metadata_from_disk(cache_filename)
+
+    is_up_to_date = bool(
+        (steamspy_metadata is not None)
+        and (time.time() - steamspy_metadata.timestamp < ttl),
+    )
+
+    if offline or is_up_to_date:
+        if steamspy_metadata is None:
+            print('SteamSpy metadata cannot be found locally in offline mode.')
+            steamspy_metadata = convert_steamspy_data({})
+        return steamspy_metadata
+
+    # Download latest SteamSpy data to have access to the matching between appID and game name
+    try:
+        steam_spy_data = steamspypi.load()
+    except (OSError, ValueError) as exception:
+        # Typically a network error. An outdated local copy is better than nothing.
+        print('SteamSpy metadata cannot be refreshed: ' + repr(exception))
+        steam_spy_data = {}
+
+    if len(steam_spy_data) > 0:
+        steamspy_metadata = convert_steamspy_data(steam_spy_data)
+        save_steamspy_metadata(steamspy_metadata, cache_filename)
+    elif steamspy_metadata is None:
+        steamspy_metadata = convert_steamspy_data({})
+
+    return steamspy_metadata
+
+
+default_steamspy_metadata = None
+
+
+def get_steamspy_metadata():
+    # The metadata is loaded once per process, when it is first needed.
+    global default_steamspy_metadata
+
+    if default_steamspy_metadata is None:
+        default_steamspy_metadata = load_steamspy_metadata()
+
+    return default_steamspy_metadata
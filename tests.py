@@ -1,14 +1,122 @@
+import json
+import os
+import pathlib
 import unittest
 
+import pandas
+
 import appids
+import batch_sentiment
+import catalog_clustering
 import check_correlation
+import cluster_evaluation
+import cluster_model
 import cluster_reviews
 import compute_bayesian_rating
 import compute_wilson_score
 import describe_reviews
 import download_reviews
 import estimate_hype
+import estimate_hype_in_batch
+import feature_cache
+import feature_matrix
+import generate_regional_rankings
 import identify_joke_reviews
+import language_detection
+import neighbor_graph
+import online_ranking
+import review_language_counts
+import review_store
+import review_stream
+import sentiment_cache
+import steamspy_cache
+import text_metrics
+import threshold_sweep
+
+
+def write_dummy_review_file(test_case, app_id, review_texts):
+    # Write a small review file to the data folder, and remove it at the end of the test.
+    pathlib.Path('data').mkdir(parents=True, exist_ok=True)
+
+    reviews = {}
+    for (review_count, review_text) in enumerate(review_texts):
+        review_id = str(review_count + 1)
+        reviews[review_id] = {
+            'recommendationid': review_id,
+            'author': {
+                'steamid': '7656119800000000' + str(review_count % 10),
+                'num_games_owned': 10 * review_count,
+                'num_reviews': review_count + 1,
+                'playtime_forever': 60 * review_count,
+            },
+            'language': 'english',
+            'review': review_text,
+            'timestamp_created': 1500000000 + review_count,
+            'timestamp_updated': 1500000000 + review_count,
+            'voted_up': bool(review_count % 3),
+            'votes_up': review_count % 5,
+            'votes_funny': review_count % 2,
+            'weighted_vote_score': 0,
+            'comment_count': 0,
+            'steam_purchase': True,
+            'received_for_free': False,
+        }
+
+    review_data = {
+        'reviews': reviews,
+        'query_summary': {
+            'total_reviews': len(reviews),
+            'total_positive': sum(review['voted_up'] for review in reviews.values()),
+            'total_negative': sum(
+                not review['voted_up'] for review in reviews.values()
+            ),
+        },
+        'cursors': {},
+    }
+
+    data_filename = describe_reviews.get_data_filename(app_id)
+    with open(data_filename, 'w', encoding='utf8') as f:
+        f.write(json.dumps(review_data) + '\n')
+    test_case.addCleanup(pathlib.Path(data_filename).unlink, missing_ok=True)
+
+    return review_data
+
+
+def use_temporary_sentiment_cache(test_case):
+    # Replace the default sentiment cache with a temporary one, so that tests do not write to the cache in the data
+    # folder, and restore the default cache at the end of the test.
+    import tempfile
+
+    temp_dir = tempfile.TemporaryDirectory()
+    test_case.addCleanup(temp_dir.cleanup)
+
+    cache = sentiment_cache.SentimentCache(
+        filename=temp_dir.name + '/sentiment_cache.sqlite',
+    )
+    test_case.addCleanup(cache.close)
+
+    previous_cache = sentiment_cache.default_sentiment_cache
+    sentiment_cache.default_sentiment_cache = cache
+    test_case.addCleanup(
+        setattr,
+        sentiment_cache,
+        'default_sentiment_cache',
+        previous_cache,
+    )
+
+    return cache
+
+
+dummy_review_texts = [
+    '10/10',
+    'yes',
+    'This game is absolutely wonderful, I loved every minute of it.',
+    'Terrible controls. The camera is awful and the story makes no sense at all!',
+    'A decent puzzle game. Some levels are frustrating, but it is fun and relaxing.',
+    'not bad',
+    'Would pet the dog again',
+    'Buy it.',
+]
 
 
 class TestDownloadReviewsMethods(unittest.TestCase):
@@ -18,6 +126,57 @@ class TestDownloadReviewsMethods(unittest.TestCase):
         )
 
 
+class TestCatalogClusteringMethods(unittest.TestCase):
+    def test_cluster_catalog(self):
+        import numpy as np
+
+        use_temporary_sentiment_cache(self)
+
+        app_id_list = ['dummy_catalog_1', 'dummy_catalog_2', 'dummy_catalog_3']
+        for (app_count, app_id) in enumerate(app_id_list):
+            write_dummy_review_file(
+                self,
+                app_id,
+                dummy_review_texts[app_count:] + dummy_review_texts[:app_count],
+            )
+            self.addCleanup(
+                pathlib.Path(feature_cache.get_feature_cache_filename(app_id)).unlink,
+                missing_ok=True,
+            )
+
+        # Chunks of 5 reviews, with reviews of several appIDs
+        chunks = list(catalog_clustering.iterate_feature_chunks(app_id_list, 5))
+        self.assertListEqual([len(chunk[0]) for chunk in chunks], [5, 5, 5, 5, 4])
+        self.assertListEqual(
+            sorted(set(chunks[1][0])),
+            ['dummy_catalog_1', 'dummy_catalog_2'],
+        )
+
+        catalog = catalog_clustering.cluster_catalog(
+            app_id_list,
+            num_clusters=3,
+            chunk_size=5,
+        )
+
+        # The scalers are fitted on the reviews of every appID.
+        all_features = catalog_clustering.concatenate_chunks(chunks)[2]
+        np.testing.assert_allclose(
+            catalog['preprocessing']['generic'].mean_,
+            all_features['generic'].mean(axis=0),
+        )
+
+        self.assertEqual(catalog['cluster_sizes'].sum(), 3 * len(dummy_review_texts))
+        self.assertListEqual(
+            catalog['app_cluster_counts'].sum(axis=1).tolist(),
+            [len(dummy_review_texts)] * 3,
+        )
+        for (cluster_size, exemplar) in zip(
+            catalog['cluster_sizes'],
+            catalog['exemplars'],
+        ):
+            self.assertEqual(exemplar is None, cluster_size == 0)
+
+
 class TestCheckCorrelationMethods(unittest.TestCase):
     def test_main(self):
         self.assertTrue(check_correlation.main())
@@ -34,16 +193,499 @@ class TestClusterReviewsMethods(unittest.TestCase):
 
         self.assertTrue(cluster_reviews.main(['723090']))
 
+    def test_fit_mini_batch_kmeans(self):
+        import numpy as np
+
+        rng = np.random.default_rng(0)
+        centers = np.array([[0.0, 0.0], [10.0, 0.0], [0.0, 10.0]])
+        true_labels = rng.integers(0, len(centers), 3000)
+        X = centers[true_labels] + rng.normal(size=(len(true_labels), 2))
+
+        # Mini-Batch K-Means replaces Affinity Propagation for large sets of reviews.
+        af = cluster_reviews.fit_affinity_propagation(X, max_num_reviews=1000)
+        self.assertFalse(hasattr(af, 'affinity_matrix_'))
+        self.assertEqual(len(af.labels_), len(X))
+
+        model = cluster_reviews.fit_mini_batch_kmeans(X, num_clusters=3, batch_size=256)
+        # Same partition as the ground truth, up to a permutation of the labels
+        self.assertEqual(len(set(zip(model.labels_, true_labels))), 3)
+
+        # Exemplars are the reviews closest to the cluster centers.
+        for (cluster_index, exemplar_index) in enumerate(
+            model.cluster_centers_indices_,
+        ):
+            members = np.flatnonzero(model.labels_ == cluster_index)
+            distances = np.sum(
+                (X[members] - model.cluster_centers_[cluster_index]) ** 2, axis=1
+            )
+            self.assertEqual(exemplar_index, members[np.argmin(distances)])
+
+        # Empty clusters do not have any exemplar.
+        exemplar_indices = cluster_reviews.get_exemplar_indices(
+            X[:2],
+            [0, 0],
+            np.zeros((2, 2)),
+        )
+        self.assertListEqual(
+            exemplar_indices.tolist(), [int(np.argmin(np.sum(X[:2] ** 2, axis=1))), -1]
+        )
+
+    def test_write_cluster_report(self):
+        import numpy as np
+
+        use_temporary_sentiment_cache(self)
+
+        app_id = 'dummy_cluster_report'
+        write_dummy_review_file(self, app_id, dummy_review_texts)
+
+        df = pandas.DataFrame(
+            {'recommendationid': [str(i + 1) for i in range(len(dummy_review_texts))]},
+        )
+        labels = np.array([2, 0, 2, 1, 2, 0, 2, 2])
+
+        (cluster_labels, members) = cluster_reviews.group_reviews_by_cluster(labels)
+        self.assertListEqual(cluster_labels.tolist(), [2, 0, 1])
+        self.assertListEqual(
+            [m.tolist() for m in members], [[0, 2, 4, 6, 7], [1, 5], [3]]
+        )
+
+        filename = 'data/test_cluster_report.txt'
+        self.addCleanup(pathlib.Path(filename).unlink, missing_ok=True)
+
+        cluster_reviews.write_cluster_report(
+            app_id,
+            df,
+            labels,
+            cluster_centers_indices=[5, 3, 4],
+            num_reviews_to_show_per_cluster=3,
+            filename=filename,
+        )
+
+        with open(filename, encoding='utf8') as f:
+            lines = f.read().splitlines()
+
+        # 3 reviews for the first cluster, 2 for the second one, 1 for the third one
+        self.assertEqual(len(lines), 4 * 6)
+        self.assertEqual(lines[1], ' ==== Review 1 in cluster A (#reviews = 5) ====')
+        self.assertEqual(lines[3], dummy_review_texts[0])
+        self.assertEqual(
+            lines[17],
+            ' ==== Review 2 (representative) in cluster B (#reviews = 2) ====',
+        )
+        self.assertEqual(lines[19], dummy_review_texts[5])
+
+    def test_group_reviews_by_cluster_with_ties(self):
+        import numpy as np
+
+        rng = np.random.default_rng(0)
+
+        for _ in range(50):
+            labels = rng.integers(-1, 6, size=30)
+
+            (cluster_labels, members) = cluster_reviews.group_reviews_by_cluster(labels)
+
+            # Clusters are designated by the same letters as with get_top_clusters_by_count().
+            (_, list_of_clusters_by_count) = cluster_reviews.get_top_clusters_by_count(
+                None,
+                labels,
+            )
+            self.assertListEqual(
+                cluster_labels.tolist(),
+                [int(cluster_label) for cluster_label in list_of_clusters_by_count],
+            )
+            for (cluster_label, cluster_members) in zip(cluster_labels, members):
+                self.assertListEqual(
+                    cluster_members.tolist(),
+                    np.flatnonzero(labels == cluster_label).tolist(),
+                )
+
+    def test_print_cluster_report(self):
+        import contextlib
+        import io
+
+        import numpy as np
+
+        use_temporary_sentiment_cache(self)
+
+        app_id = 'dummy_print_cluster_report'
+        write_dummy_review_file(self, app_id, dummy_review_texts)
+
+        df = pandas.DataFrame(
+            {'recommendationid': [str(i + 1) for i in range(len(dummy_review_texts))]},
+        )
+        # Two clusters of the same size
+        labels = np.array([1, 0, 1, 2, 0, 1, 0, 2])
+
+        expected_output = io.StringIO()
+        with contextlib.redirect_stdout(expected_output):
+            cluster_grouping = cluster_reviews.group_reviews_by_cluster(labels)
+            for cluster_count in range(len(cluster_grouping[0])):
+                cluster_reviews.show_fixed_number_of_reviews_from_given_cluster(
+                    app_id,
+                    df,
+                    None,
+                    cluster_count,
+                    labels,
+                    2,
+                    cluster_grouping,
+                )
+            cluster_reviews.get_top_clusters_by_count(None, labels, True)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            cluster_reviews.print_cluster_report(
+                app_id,
+                df,
+                labels,
+                num_reviews_to_show_per_cluster=2,
+            )
+
+        self.assertEqual(output.getvalue(), expected_output.getvalue())
+        self.assertIn(
+            ' ==== Review 2 in cluster C (#reviews = 2) ====', output.getvalue()
+        )
+
+    def test_show_representative_reviews(self):
+        import contextlib
+        import io
+        import types
+
+        import numpy as np
+
+        use_temporary_sentiment_cache(self)
+
+        app_id = 'dummy_representative_reviews'
+        write_dummy_review_file(self, app_id, dummy_review_texts)
+
+        df = pandas.DataFrame(
+            {'recommendationid': [str(i + 1) for i in range(len(dummy_review_texts))]},
+        )
+        af = types.SimpleNamespace(
+            labels_=np.array([1, 0, 1, 2, 0, 1, 0, 1]),
+            cluster_centers_indices_=np.array([4, 7, 3]),
+        )
+
+        expected_output = io.StringIO()
+        with contextlib.redirect_stdout(expected_output):
+            for (cluster_letter, review_index, cluster_size) in [
+                ('A', 7, 4),
+                ('B', 4, 3),
+            ]:
+                print(
+                    '\n ==== Cluster '
+                    + cluster_letter
+                    + ' (#reviews = '
+                    + str(cluster_size)
+                    + ') ====',
+                )
+                cluster_reviews.print_sentiment_analysis(
+                    dummy_review_texts[review_index],
+                )
+                print(dummy_review_texts[review_index])
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            cluster_reviews.show_representative_reviews(
+                app_id,
+                df,
+                af,
+                num_top_clusters=2,
+            )
+
+        self.assertEqual(output.getvalue(), expected_output.getvalue())
+
+
+class TestClusterEvaluationMethods(unittest.TestCase):
+    def test_draw_stratified_sample(self):
+        import numpy as np
+
+        labels = np.array([0] * 900 + [1] * 95 + [2] * 5)
+
+        sample_indices = cluster_evaluation.draw_stratified_sample(labels, 100)
+        self.assertListEqual(np.bincount(labels[sample_indices]).tolist(), [87, 11, 2])
+
+        # The sample is reproducible.
+        np.testing.assert_array_equal(
+            sample_indices,
+            cluster_evaluation.draw_stratified_sample(labels, 100),
+        )
+
+        # The sample size is not exceeded, even with more clusters than reviews in the sample.
+        rng = np.random.default_rng(0)
+        for num_clusters in [10, 60, 300]:
+            labels = rng.integers(0, num_clusters, 1000)
+            for sample_size in [50, 100, 1000, 2000]:
+                sample_indices = cluster_evaluation.draw_stratified_sample(
+                    labels,
+                    sample_size,
+                )
+                self.assertLessEqual(len(sample_indices), sample_size)
+                self.assertEqual(len(np.unique(sample_indices)), len(sample_indices))
+
+    def test_evaluate_clustering(self):
+        import numpy as np
+        from sklearn import metrics
+
+        rng = np.random.default_rng(0)
+        centers = np.array([[0.0, 0.0], [4.0, 0.0], [0.0, 4.0]])
+        labels = rng.integers(0, len(centers), 500)
+        X = centers[labels] + rng.normal(size=(len(labels), 2))
+        # A cluster with a single review
+        labels[0] = 3
+
+        # The estimate is exact if every review is sampled.
+        for metric in ['euclidean', 'sqeuclidean']:
+            evaluation = cluster_evaluation.evaluate_clustering(
+                X,
+                labels,
+                'sampled_silhouette',
+                metric,
+                sample_size=len(labels),
+            )
+            self.assertAlmostEqual(
+                evaluation['score'],
+                metrics.silhouette_score(X, labels, metric=metric),
+            )
+
+        evaluation = cluster_evaluation.evaluate_clustering(X, labels, sample_size=100)
+        self.assertLess(evaluation['lower_bound'], evaluation['score'])
+        self.assertLess(evaluation['score'], evaluation['upper_bound'])
+        self.assertIn(
+            'confidence interval',
+            cluster_evaluation.format_clustering_evaluation(evaluation),
+        )
+
+        self.assertAlmostEqual(
+            cluster_evaluation.evaluate_clustering(X, labels, 'davies_bouldin')[
+                'score'
+            ],
+            metrics.davies_bouldin_score(X, labels),
+        )
+        self.assertTrue(
+            np.isnan(
+                cluster_evaluation.evaluate_clustering(
+                    X, np.zeros(len(X)), 'calinski_harabasz'
+                )['score'],
+            ),
+        )
+
+        with self.assertRaises(ValueError):
+            cluster_evaluation.evaluate_clustering(X, labels, 'unknown')
+
+
+class TestClusterModelMethods(unittest.TestCase):
+    def test_get_review_clusters(self):
+        import numpy as np
+
+        use_temporary_sentiment_cache(self)
+
+        app_id = 'dummy_cluster_model'
+        write_dummy_review_file(self, app_id, dummy_review_texts)
+        self.addCleanup(
+            pathlib.Path(cluster_model.get_cluster_model_filename(app_id)).unlink,
+            missing_ok=True,
+        )
+
+        df = describe_reviews.aggregate_reviews_to_pandas(app_id, use_cache=False)
+
+        labels = cluster_model.get_review_clusters(app_id, df.iloc[:6], verbose=False)
+        self.assertEqual(len(labels), 6)
+
+        saved_model = cluster_model.load_cluster_model(app_id)
+        self.assertEqual(saved_model['method'], 'birch')
+        self.assertEqual(len(saved_model['labels']), 6)
+
+        # New reviews are assigned to the saved clusters, and known reviews keep their cluster.
+        (predicted_labels, _) = cluster_model.predict_clusters(saved_model, df)
+        all_labels = cluster_model.get_review_clusters(app_id, df, verbose=False)
+        np.testing.assert_array_equal(all_labels[:6], labels)
+        np.testing.assert_array_equal(all_labels[6:], predicted_labels[6:])
+
+        updated_model = cluster_model.load_cluster_model(app_id)
+        self.assertEqual(len(updated_model['labels']), len(dummy_review_texts))
+        np.testing.assert_array_equal(
+            updated_model['reference_points'],
+            saved_model['reference_points'],
+        )
+
+        self.assertEqual(updated_model['num_new_reviews'], 2)
+
+        # New reviews far from the clusters, which arrive in batches too small to trigger a refit on their own
+        drifted_df = pandas.concat([df] * 3, ignore_index=True)
+        drifted_df["recommendationid"] = [
+            'drifted_' + str(i) for i in range(len(drifted_df))
+        ]
+        drifted_df["playtime_forever"] = drifted_df["playtime_forever"] * 1000 + 1e6
+
+        for batch_count in range(3):
+            cluster_model.get_review_clusters(
+                app_id,
+                pandas.concat(
+                    [df, drifted_df.iloc[: (batch_count + 1) * 8]],
+                    ignore_index=True,
+                ),
+                verbose=False,
+            )
+
+            drifted_model = cluster_model.load_cluster_model(app_id)
+
+            if batch_count < 2:
+                # The drift is measured over every review assigned since the last fit.
+                self.assertEqual(
+                    drifted_model['num_new_reviews'],
+                    2 + (batch_count + 1) * 8,
+                )
+                self.assertGreater(
+                    cluster_model.compute_cluster_drift(drifted_model),
+                    cluster_model.max_cluster_drift,
+                )
+                np.testing.assert_array_equal(
+                    drifted_model['reference_points'],
+                    updated_model['reference_points'],
+                )
+
+        # Enough reviews have been assigned since the last fit: the model is fitted again.
+        self.assertEqual(drifted_model['num_new_reviews'], 0)
+        self.assertEqual(
+            len(drifted_model['labels']),
+            len(dummy_review_texts) + len(drifted_df),
+        )
+        self.assertFalse(
+            np.array_equal(
+                drifted_model['reference_points'],
+                updated_model['reference_points'],
+            ),
+        )
+
+    def test_affinity_propagation_without_convergence(self):
+        import types
+        from unittest import mock
+
+        import numpy as np
+
+        use_temporary_sentiment_cache(self)
+
+        app_id = 'dummy_cluster_model_without_convergence'
+        write_dummy_review_file(self, app_id, dummy_review_texts)
+        self.addCleanup(
+            pathlib.Path(cluster_model.get_cluster_model_filename(app_id)).unlink,
+            missing_ok=True,
+        )
+
+        df = describe_reviews.aggregate_reviews_to_pandas(app_id, use_cache=False)
+
+        # Output of Affinity Propagation when it does not converge
+        af = types.SimpleNamespace(
+            labels_=np.full(len(df), -1),
+            cluster_centers_=np.empty((0, 2)),
+        )
+
+        with mock.patch.object(
+            cluster_model, 'fit_affinity_propagation', return_value=af
+        ):
+            with self.assertRaisesRegex(ValueError, 'did not converge'):
+                cluster_model.get_review_clusters(
+                    app_id,
+                    df,
+                    method='affinity_propagation',
+                    verbose=False,
+                )
+
+        self.assertIsNone(cluster_model.load_cluster_model(app_id))
+
 
 class TestComputeBayesianRatingMethods(unittest.TestCase):
     def test_main(self):
         self.assertTrue(compute_bayesian_rating.main())
 
+    def test_compute_bayesian_rating_array(self):
+        import numpy as np
+
+        rng = np.random.default_rng(0)
+        num_games = 2000
+
+        num_votes = rng.integers(20, 500, num_games)
+        scores = rng.binomial(num_votes, rng.beta(7, 3, num_games)) / num_votes
+
+        # Same results as with dictionaries
+        observations = {
+            str(game_count): {
+                'score': scores[game_count],
+                'num_votes': num_votes[game_count],
+            }
+            for game_count in range(num_games)
+        }
+        bayes_prior = compute_bayesian_rating.choose_prior(observations)
+
+        (
+            bayesian_scores,
+            bayes_prior_array,
+        ) = compute_bayesian_rating.compute_bayesian_rating_array(scores, num_votes)
+
+        self.assertAlmostEqual(bayes_prior_array['score'], bayes_prior['score'])
+        self.assertAlmostEqual(bayes_prior_array['num_votes'], bayes_prior['num_votes'])
+        self.assertAlmostEqual(
+            bayesian_scores[0],
+            compute_bayesian_rating.compute_bayesian_score(
+                observations['0'],
+                bayes_prior,
+            ),
+        )
+
+        # Beta-binomial prior, with one prior per row
+        (
+            bayesian_scores,
+            bayes_prior_array,
+        ) = compute_bayesian_rating.compute_bayesian_rating_array(
+            np.vstack([scores, scores]),
+            np.vstack([num_votes, num_votes]),
+            method='beta-binomial',
+        )
+
+        self.assertEqual(bayesian_scores.shape, (2, num_games))
+        for row in range(2):
+            self.assertAlmostEqual(bayes_prior_array['score'][row], 0.7, places=1)
+            self.assertAlmostEqual(
+                bayes_prior_array['num_votes'][row] / 10,
+                1,
+                places=0,
+            )
+
 
 class TestComputeWilsonScoreMethods(unittest.TestCase):
     def test_main(self):
         self.assertTrue(compute_wilson_score.main())
 
+    def test_compute_wilson_score_array(self):
+        import numpy as np
+
+        num_pos = np.array([0, 0, 3, 10, 500])
+        num_neg = np.array([0, 2, 1, 0, 20])
+
+        for confidence in [0.95, 0.97]:
+            wilson_score_array = compute_wilson_score.compute_wilson_score_array(
+                num_pos,
+                num_neg,
+                confidence,
+            )
+
+            self.assertTrue(np.isnan(wilson_score_array[0]))
+            for index in range(1, len(num_pos)):
+                self.assertAlmostEqual(
+                    wilson_score_array[index],
+                    compute_wilson_score.compute_wilson_score(
+                        int(num_pos[index]),
+                        int(num_neg[index]),
+                        confidence,
+                    ),
+                )
+
+        # Exact quantile for confidence levels which are not tabulated
+        self.assertAlmostEqual(
+            compute_wilson_score.get_normal_quantile(0.975),
+            2.241402727604947,
+        )
+
 
 class TestDescribeReviewsMethods(unittest.TestCase):
     def test_main(self):
@@ -63,6 +705,869 @@ class TestIdentifyJokeReviewsMethods(unittest.TestCase):
 
         self.assertTrue(identify_joke_reviews.main(['723090']))
 
+    def test_classify_reviews(self):
+        review_dict = {}
+        review_dict['positive'] = {
+            '1': {'polarity': 0.0, 'subjectivity': 0.0},
+            '2': {'polarity': 0.5, 'subjectivity': 0.0},
+            '3': {'polarity': 0.0, 'subjectivity': 0.5},
+        }
+        review_dict['negative'] = {
+            '4': {'polarity': -0.2, 'subjectivity': 0.1},
+            '5': {'polarity': -0.5, 'subjectivity': 0.9},
+        }
+
+        # Legacy format (nested dictionaries) and struct of arrays
+        for current_review_dict in [
+            review_dict,
+            {'reviews': identify_joke_reviews.get_review_table(review_dict)},
+        ]:
+            (
+                acceptable_reviews_dict,
+                joke_reviews_dict,
+            ) = identify_joke_reviews.classify_reviews(current_review_dict)
+
+            self.assertEqual(acceptable_reviews_dict['positive'], {'2', '3'})
+            self.assertEqual(acceptable_reviews_dict['negative'], {'5'})
+            self.assertEqual(joke_reviews_dict['positive'], {'1'})
+            self.assertEqual(joke_reviews_dict['negative'], {'4'})
+
+
+class TestReviewStoreMethods(unittest.TestCase):
+    def test_get_review_content(self):
+        app_id = 'dummy_review_store'
+        write_dummy_review_file(self, app_id, dummy_review_texts)
+
+        store = review_store.ReviewStore(max_num_app_ids=1)
+        self.assertEqual(store.get_review_content(app_id, '3'), dummy_review_texts[2])
+        self.assertEqual(store.get_review_content(app_id, 'unknown'), '-1')
+        self.assertEqual(len(store.review_index), 1)
+
+        self.assertEqual(
+            describe_reviews.get_review_content(app_id, '1'),
+            dummy_review_texts[0],
+        )
+
+
+class TestReviewStreamMethods(unittest.TestCase):
+    def test_stream_reviews(self):
+        app_id = 'dummy_review_stream'
+        review_data = write_dummy_review_file(self, app_id, dummy_review_texts)
+
+        # Tiny chunks, so that values are split across several reads.
+        default_chunk_size = review_stream.chunk_size
+        review_stream.chunk_size = 7
+        self.addCleanup(setattr, review_stream, 'chunk_size', default_chunk_size)
+
+        self.assertEqual(
+            list(review_stream.stream_reviews(app_id)),
+            list(review_data['reviews'].values()),
+        )
+        self.assertEqual(
+            review_stream.load_query_summary(app_id),
+            review_data['query_summary'],
+        )
+
+    def test_load_query_summary(self):
+        app_id = 'dummy_query_summary'
+        review_data = write_dummy_review_file(self, app_id, dummy_review_texts)
+
+        # The query summary is found at the end of the file.
+        self.assertEqual(
+            review_stream.read_query_summary_from_tail(app_id),
+            review_data['query_summary'],
+        )
+
+        # Otherwise, the whole file is read.
+        default_tail_size = review_stream.tail_size
+        review_stream.tail_size = 10
+        self.addCleanup(setattr, review_stream, 'tail_size', default_tail_size)
+
+        self.assertIsNone(review_stream.read_query_summary_from_tail(app_id))
+        self.assertEqual(
+            review_stream.load_query_summary(app_id),
+            review_data['query_summary'],
+        )
+
+
+class TestFeatureCacheMethods(unittest.TestCase):
+    def test_aggregate_reviews_to_pandas(self):
+        use_temporary_sentiment_cache(self)
+
+        app_id = 'dummy_feature_cache'
+        write_dummy_review_file(self, app_id, dummy_review_texts)
+        self.addCleanup(os.remove, feature_cache.get_feature_cache_filename(app_id))
+
+        df = describe_reviews.aggregate_reviews_to_pandas(app_id, use_cache=False)
+        df_computed = describe_reviews.aggregate_reviews_to_pandas(app_id)
+        df_cached = describe_reviews.aggregate_reviews_to_pandas(app_id)
+
+        pandas.testing.assert_frame_equal(df_computed, df)
+        pandas.testing.assert_frame_equal(df_cached, df)
+
+        # The cache is invalidated as soon as the review file changes.
+        write_dummy_review_file(self, app_id, dummy_review_texts[:3])
+        df_updated = describe_reviews.aggregate_reviews_to_pandas(app_id)
+        self.assertEqual(len(df_updated), 3)
+
+    def test_aggregate_reviews_incrementally(self):
+        use_temporary_sentiment_cache(self)
+
+        app_id = 'dummy_feature_incremental'
+        write_dummy_review_file(self, app_id, dummy_review_texts)
+        self.addCleanup(os.remove, feature_cache.get_feature_cache_filename(app_id))
+
+        describe_reviews.aggregate_reviews_to_pandas(app_id, incremental=True)
+
+        # One review is deleted, one is edited, and one is added.
+        updated_review_texts = dummy_review_texts[:-1] + ['A new review.']
+        updated_review_texts[2] = 'An edited review.'
+        write_dummy_review_file(self, app_id, updated_review_texts)
+
+        df = describe_reviews.aggregate_reviews_to_pandas(app_id, use_cache=False)
+        df_incremental = describe_reviews.aggregate_reviews_to_pandas(
+            app_id,
+            incremental=True,
+        )
+
+        pandas.testing.assert_frame_equal(df_incremental, df)
+
+    def test_aggregate_reviews_with_workers(self):
+        use_temporary_sentiment_cache(self)
+
+        app_id = 'dummy_feature_workers'
+        write_dummy_review_file(self, app_id, dummy_review_texts)
+
+        self.assertEqual(
+            describe_reviews.aggregate_reviews(app_id, workers=2),
+            describe_reviews.aggregate_reviews(app_id),
+        )
+
+    def test_cache_folders_are_created_on_save(self):
+        import tempfile
+
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(temp_dir.name)
+
+        app_id = 'dummy_cache_folders'
+
+        # Looking up a cache does not create any folder.
+        feature_cache.get_feature_cache_filename(app_id)
+        cluster_model.get_cluster_model_filename(app_id)
+        sentiment_cache.get_sentiment_cache_filename()
+        self.assertTupleEqual(feature_cache.load_feature_table(app_id), (None, None))
+        self.assertIsNone(cluster_model.load_cluster_model(app_id))
+        self.assertListEqual(os.listdir(temp_dir.name), [])
+
+        feature_cache.save_feature_cache(
+            app_id,
+            pandas.DataFrame({'recommendationid': ['1']}),
+            'source_hash',
+            ['review_hash'],
+        )
+        cluster_model.save_cluster_model(app_id, {'method': 'birch'})
+        cache = sentiment_cache.SentimentCache()
+        cache.close()
+
+        self.assertTrue(
+            os.path.exists(feature_cache.get_feature_cache_filename(app_id)),
+        )
+        self.assertTrue(
+            os.path.exists(cluster_model.get_cluster_model_filename(app_id)),
+        )
+        self.assertTrue(
+            os.path.exists(sentiment_cache.get_sentiment_cache_filename()),
+        )
+
+
+class TestFeatureMatrixMethods(unittest.TestCase):
+    def test_get_feature_matrix(self):
+        import numpy as np
+
+        use_temporary_sentiment_cache(self)
+
+        app_id = 'dummy_feature_matrix'
+        write_dummy_review_file(self, app_id, dummy_review_texts)
+
+        df = describe_reviews.aggregate_reviews_to_pandas(app_id, use_cache=False)
+
+        for filename in feature_matrix.get_feature_matrix_filenames(app_id).values():
+            self.addCleanup(pathlib.Path(filename).unlink, missing_ok=True)
+
+        X = feature_matrix.get_feature_matrix(app_id, df)
+        self.assertIsInstance(X, np.memmap)
+        self.assertEqual(X.dtype, np.float32)
+        self.assertTrue(X.flags['C_CONTIGUOUS'])
+
+        # One row per review, without the index of the dataframe
+        self.assertEqual(X.shape, (len(dummy_review_texts), 16))
+        np.testing.assert_allclose(
+            X,
+            cluster_reviews.convert_from_pandas_dataframe_to_numpy_matrix(df),
+            rtol=1e-6,
+            atol=1e-6,
+        )
+
+        # The matrix is built again if the reviews do not match.
+        X_subset = feature_matrix.get_feature_matrix(app_id, df.iloc[:3])
+        self.assertEqual(len(X_subset), 3)
+
+
+class TestTextMetricsMethods(unittest.TestCase):
+    def test_compute_text_metrics(self):
+        from textstat.textstat import textstat
+
+        for review_text in dummy_review_texts + ['', 'Hello.\n\nWorld!!! Really?']:
+            metrics = text_metrics.compute_text_metrics(review_text)
+
+            self.assertEqual(metrics['character_count'], len(review_text))
+            self.assertEqual(
+                metrics['syllable_count'],
+                textstat.syllable_count(review_text),
+            )
+            self.assertEqual(
+                metrics['lexicon_count'],
+                textstat.lexicon_count(review_text),
+            )
+            self.assertEqual(
+                metrics['sentence_count'],
+                textstat.sentence_count(review_text),
+            )
+            self.assertEqual(
+                metrics['difficult_words_count'],
+                textstat.difficult_words(review_text),
+            )
+            self.assertAlmostEqual(
+                metrics['flesch_reading_ease'],
+                textstat.flesch_reading_ease(review_text),
+            )
+            self.assertAlmostEqual(
+                metrics['dale_chall_readability_score'],
+                textstat.dale_chall_readability_score(review_text),
+            )
+
+
+class TestBatchSentimentMethods(unittest.TestCase):
+    def test_compute_sentiments(self):
+        from textblob import TextBlob
+
+        texts = dummy_review_texts + ['not really good', 'very very good :)', '']
+
+        (polarity, subjectivity) = batch_sentiment.compute_sentiments(texts)
+
+        for (text_count, text) in enumerate(texts):
+            sentiment = TextBlob(text).sentiment
+            self.assertAlmostEqual(polarity[text_count], sentiment.polarity)
+            self.assertAlmostEqual(subjectivity[text_count], sentiment.subjectivity)
+
+
+class TestSentimentCacheMethods(unittest.TestCase):
+    def test_get_sentiments(self):
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as temp_path:
+            cache = sentiment_cache.SentimentCache(
+                filename=temp_path + '/sentiment_cache.sqlite',
+                max_num_entries=3,
+            )
+            self.addCleanup(cache.close)
+
+            texts = dummy_review_texts + ['10/10', '  10/10  ']
+
+            (polarity, subjectivity) = batch_sentiment.compute_sentiments(texts)
+
+            for _ in range(2):
+                (cached_polarity, cached_subjectivity) = cache.get_sentiments(texts)
+                self.assertListEqual(cached_polarity.tolist(), polarity.tolist())
+                self.assertListEqual(
+                    cached_subjectivity.tolist(),
+                    subjectivity.tolist(),
+                )
+
+            # Size cap
+            (num_entries,) = cache.connection.execute(
+                'SELECT COUNT(*) FROM text_cache',
+            ).fetchone()
+            self.assertLessEqual(num_entries, 3)
+
+    def test_last_access(self):
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as temp_path:
+            cache = sentiment_cache.SentimentCache(
+                filename=temp_path + '/sentiment_cache.sqlite',
+            )
+            self.addCleanup(cache.close)
+
+            cache.get_sentiments(dummy_review_texts)
+            self.assertEqual(cache.num_entries, len(dummy_review_texts))
+
+            # Reading recently accessed entries does not write anything.
+            num_changes = cache.connection.total_changes
+            cache.get_sentiments(dummy_review_texts)
+            self.assertEqual(cache.connection.total_changes, num_changes)
+            self.assertDictEqual(cache.pending_access_times, {})
+
+            # Access times which are too old are updated, once they have been buffered.
+            cache.connection.execute('UPDATE text_cache SET last_access = 0')
+            cache.connection.commit()
+
+            cache.get_sentiments(dummy_review_texts[:2])
+            self.assertEqual(len(cache.pending_access_times), 2)
+
+            cache.write_access_times()
+            cache.connection.commit()
+            (num_accessed_entries,) = cache.connection.execute(
+                'SELECT COUNT(*) FROM text_cache WHERE last_access > 0',
+            ).fetchone()
+            self.assertEqual(num_accessed_entries, 2)
+
+    def test_get_languages(self):
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as temp_path:
+            cache = sentiment_cache.SentimentCache(
+                filename=temp_path + '/sentiment_cache.sqlite',
+            )
+            self.addCleanup(cache.close)
+
+            texts = ['Great game.', 'Très bon jeu.']
+
+            self.assertListEqual(cache.get_languages(texts), [None, None])
+
+            cache.set_languages(texts, ['en', 'fr'])
+            self.assertListEqual(cache.get_languages(texts), ['en', 'fr'])
+
+            # The sentiment is not known yet, even though the language is.
+            cache.get_sentiments(texts[:1])
+            self.assertListEqual(cache.get_languages(texts), ['en', 'fr'])
+
+
+class TestLanguageDetectionMethods(unittest.TestCase):
+    def test_pre_filter_language(self):
+        self.assertEqual(language_detection.pre_filter_language('10/10'), 'en')
+        self.assertEqual(
+            language_detection.pre_filter_language('I would buy it again.'),
+            'en',
+        )
+        self.assertEqual(language_detection.pre_filter_language('很好玩的游戏'), 'zh-cn')
+        self.assertEqual(language_detection.pre_filter_language('ゲームが好き'), 'ja')
+        self.assertEqual(
+            language_detection.pre_filter_language('Очень хорошая игра'), 'ru'
+        )
+        self.assertIsNone(language_detection.pre_filter_language('Das Spiel ist gut.'))
+
+        # Short texts in other languages, made of words which are also frequent in English, are left to 'langdetect'.
+        for text in [
+            'no me gusta',
+            'no me gusta nada',
+            'ik was in het spel en we',
+            'no no no',
+            'so so',
+            'é um jogo muito bom e eu gosto',
+        ]:
+            self.assertIsNone(language_detection.pre_filter_language(text), text)
+
+        self.assertEqual(
+            language_detection.pre_filter_language(
+                "This is the best game and it's fun"
+            ),
+            'en',
+        )
+
+    def test_detect_languages(self):
+        cache = use_temporary_sentiment_cache(self)
+
+        texts = [
+            '10/10',
+            'This game is absolutely wonderful, I loved every minute of it.',
+            'Ce jeu est vraiment génial, je le recommande.',
+            'Очень хорошая игра',
+        ]
+
+        languages = language_detection.detect_languages(texts)
+        self.assertListEqual(languages, ['en', 'en', 'fr', 'ru'])
+
+        # Cached results
+        self.assertListEqual(cache.get_languages(texts), languages)
+        self.assertListEqual(language_detection.detect_languages(texts), languages)
+
+
+class TestThresholdSweepMethods(unittest.TestCase):
+    def test_sweep_sentiment_thresholds(self):
+        import numpy as np
+
+        rng = np.random.default_rng(0)
+        num_reviews = 100
+
+        review_dict = {}
+        review_dict['reviews'] = identify_joke_reviews.build_review_table(
+            [str(review_count) for review_count in range(num_reviews)],
+            rng.random(num_reviews) < 0.7,
+            np.round(rng.uniform(-1, 1, num_reviews), 1),
+            np.round(rng.random(num_reviews), 1),
+        )
+
+        polarity_thresholds = [0.3, 0, 0.2]
+        subjectivity_thresholds = [0.5, 0.2, 0.36]
+
+        sweep_results = threshold_sweep.sweep_sentiment_thresholds(
+            review_dict,
+            polarity_thresholds,
+            subjectivity_thresholds,
+        )
+
+        for (i, polarity_threshold) in enumerate(sorted(polarity_thresholds)):
+            for (j, subjectivity_threshold) in enumerate(
+                sorted(subjectivity_thresholds),
+            ):
+                sentiment_threshold = {
+                    'polarity': [-polarity_threshold, polarity_threshold],
+                    'subjectivity': [subjectivity_threshold, 1],
+                }
+                (
+                    acceptable_reviews_dict,
+                    joke_reviews_dict,
+                ) = identify_joke_reviews.classify_reviews(
+                    review_dict,
+                    sentiment_threshold,
+                )
+
+                self.assertEqual(
+                    sweep_results['hype'][i, j],
+                    estimate_hype.get_hype(joke_reviews_dict, acceptable_reviews_dict),
+                )
+                self.assertAlmostEqual(
+                    sweep_results['wilson_score_deviation'][i, j],
+                    estimate_hype.get_wilson_score_deviation(
+                        review_dict,
+                        acceptable_reviews_dict,
+                    ),
+                )
+
+
+class TestEstimateHypeInBatchMethods(unittest.TestCase):
+    def test_estimate_hype_in_batch(self):
+        import tempfile
+
+        # Workers open the default sentiment cache on their own: they run in a temporary working directory, so that
+        # they do not write to the cache in the data folder.
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(temp_dir.name)
+
+        use_temporary_sentiment_cache(self)
+
+        app_id = 'dummy_hype_batch'
+        write_dummy_review_file(self, app_id, dummy_review_texts)
+
+        result_filename = estimate_hype_in_batch.get_hype_result_filename(app_id)
+        self.addCleanup(pathlib.Path(result_filename).unlink, missing_ok=True)
+
+        # The sentiment cache is already open in this process: workers must open their own connection.
+        hype_dict = estimate_hype_in_batch.estimate_hype_in_batch([app_id], workers=2)
+        self.assertListEqual(
+            list(hype_dict[app_id].keys()),
+            estimate_hype_in_batch.hype_result_keys,
+        )
+
+        # Games which are already processed are skipped.
+        hype_result = estimate_hype_in_batch.load_hype_result(app_id)
+        hype_result['hype'] = -2
+        estimate_hype_in_batch.save_hype_result(app_id, hype_result)
+        self.assertEqual(
+            estimate_hype_in_batch.estimate_hype_in_batch([app_id])[app_id]['hype'],
+            -2,
+        )
+
+        # Failed games are processed again.
+        estimate_hype_in_batch.save_hype_result(app_id, {'status': 'failed'})
+        self.assertDictEqual(
+            estimate_hype_in_batch.estimate_hype_in_batch([app_id]),
+            hype_dict,
+        )
+
+        # Missing games are reported as failures.
+        missing_app_id = 'dummy_hype_batch_missing'
+        self.addCleanup(
+            pathlib.Path(
+                estimate_hype_in_batch.get_hype_result_filename(missing_app_id),
+            ).unlink,
+            missing_ok=True,
+        )
+        self.assertDictEqual(
+            estimate_hype_in_batch.estimate_hype_in_batch([missing_app_id]),
+            {},
+        )
+        self.assertEqual(
+            estimate_hype_in_batch.load_hype_result(missing_app_id)['status'],
+            'failed',
+        )
+
+
+class TestSteamSpyCacheMethods(unittest.TestCase):
+    def test_load_steamspy_metadata(self):
+        import tempfile
+
+        steam_spy_data = {
+            '723090': {
+                'name': 'Meganoid',
+                'owners': '0 .. 20,000',
+                'positive': 18,
+                'negative': 2,
+            },
+            '573170': {
+                'name': 'Fatal Twelve',
+                'owners': '20,000 .. 50,000',
+                'positive': 700,
+                'negative': 20,
+            },
+        }
+
+        # The local copy of the user is left untouched.
+        with tempfile.TemporaryDirectory() as temp_path:
+            cache_filename = temp_path + '/steamspy_metadata.npz'
+
+            steamspy_cache.save_steamspy_metadata(
+                steamspy_cache.convert_steamspy_data(steam_spy_data),
+                cache_filename,
+            )
+
+            steamspy_metadata = steamspy_cache.load_steamspy_metadata(
+                offline=True,
+                cache_filename=cache_filename,
+            )
+
+        self.assertEqual(len(steamspy_metadata), 2)
+        self.assertEqual(steamspy_metadata.get_name('573170'), 'Fatal Twelve')
+        self.assertEqual(steamspy_metadata.get_name('0'), 'unknown')
+        self.assertEqual(steamspy_metadata.get_value(723090, 'positive'), 18)
+
+        # Use this metadata instead of the default one.
+        previous_metadata = steamspy_cache.default_steamspy_metadata
+        steamspy_cache.default_steamspy_metadata = steamspy_metadata
+        self.addCleanup(
+            setattr,
+            steamspy_cache,
+            'default_steamspy_metadata',
+            previous_metadata,
+        )
+
+        (num_owners_list, num_reviews_list) = check_correlation.get_x_y()
+        self.assertListEqual(num_owners_list, [10000, 35000])
+        self.assertListEqual(num_reviews_list, [20, 720])
+
+
+class TestNeighborGraphMethods(unittest.TestCase):
+    def test_get_radius_graph(self):
+        import numpy as np
+        from sklearn.neighbors import radius_neighbors_graph
+
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(300, 3))
+        # Duplicate reviews are at a distance of zero.
+        X[1] = X[0]
+
+        knn_graph = neighbor_graph.compute_knn_graph(X, num_neighbors=5)
+        self.assertEqual(knn_graph.nnz, 5 * len(X))
+
+        def get_edges(graph):
+            # Sorted edges between different reviews, including the ones with a distance of zero
+            graph = graph.tocoo()
+            is_edge = graph.row != graph.col
+            order = np.lexsort((graph.col[is_edge], graph.row[is_edge]))
+            return (
+                graph.row[is_edge][order],
+                graph.col[is_edge][order],
+                graph.data[is_edge][order],
+            )
+
+        for radius in [0.2, 0.5, 2.0]:
+            radius_graph = neighbor_graph.get_radius_graph(knn_graph, X, radius)
+            expected_graph = radius_neighbors_graph(X, radius, mode='distance')
+
+            (rows, columns, distances) = get_edges(radius_graph)
+            (expected_rows, expected_columns, expected_distances) = get_edges(
+                expected_graph,
+            )
+
+            np.testing.assert_array_equal(rows, expected_rows)
+            np.testing.assert_array_equal(columns, expected_columns)
+            np.testing.assert_allclose(distances, expected_distances)
+
+            # The duplicate reviews are neighbors.
+            self.assertIn(1, columns[rows == 0])
+
+    def test_get_knn_graph(self):
+        use_temporary_sentiment_cache(self)
+
+        app_id = 'dummy_neighbor_graph'
+        write_dummy_review_file(self, app_id, dummy_review_texts)
+
+        df = describe_reviews.aggregate_reviews_to_pandas(app_id, use_cache=False)
+
+        for filename in feature_matrix.get_feature_matrix_filenames(app_id).values():
+            self.addCleanup(pathlib.Path(filename).unlink, missing_ok=True)
+        for approximate in [False, True]:
+            self.addCleanup(
+                pathlib.Path(
+                    neighbor_graph.get_knn_graph_filename(app_id, 3, approximate),
+                ).unlink,
+                missing_ok=True,
+            )
+
+        X = feature_matrix.get_feature_matrix(app_id, df)
+
+        knn_graph = neighbor_graph.get_knn_graph(app_id, X, num_neighbors=3)
+        self.assertEqual(knn_graph.shape, (len(X), len(X)))
+        self.assertEqual(knn_graph.nnz, 3 * len(X))
+
+        # The graph is loaded from the disk.
+        knn_graph_filename = neighbor_graph.get_knn_graph_filename(app_id, 3)
+        modification_time = os.path.getmtime(knn_graph_filename)
+        cached_knn_graph = neighbor_graph.get_knn_graph(app_id, X, num_neighbors=3)
+        self.assertEqual(os.path.getmtime(knn_graph_filename), modification_time)
+        self.assertEqual(abs(cached_knn_graph - knn_graph).max(), 0)
+
+        connectivity = neighbor_graph.get_connectivity_graph(knn_graph)
+        self.assertListEqual(sorted(set(connectivity.data)), [1])
+
+        approximate_knn_graph = neighbor_graph.get_knn_graph(
+            app_id,
+            X,
+            num_neighbors=3,
+            approximate=True,
+        )
+        self.assertEqual(approximate_knn_graph.nnz, 3 * len(X))
+
+
+class TestOnlineRankingMethods(unittest.TestCase):
+    def test_add_review(self):
+        ranking = online_ranking.OnlineRanking('wilson_score')
+
+        for _ in range(20):
+            ranking.add_review(10, voted_up=True)
+        for _ in range(5):
+            ranking.add_review(20, voted_up=True)
+        ranking.add_review(30, voted_up=False)
+
+        self.assertListEqual(
+            [app_id for (app_id, _) in ranking.get_top(2)],
+            ['10', '20'],
+        )
+        self.assertAlmostEqual(
+            ranking.get_top(1)[0][1],
+            compute_wilson_score.compute_wilson_score(20, 0),
+        )
+
+        # Negative reviews move the first game down the ranking.
+        for _ in range(20):
+            ranking.add_review(10, voted_up=False)
+
+        top_games = ranking.get_top(10)
+        self.assertListEqual([app_id for (app_id, _) in top_games], ['20', '10', '30'])
+        self.assertListEqual(top_games, ranking.get_top(10))
+
+    def test_rebuild_heap(self):
+        ranking = online_ranking.OnlineRanking('hype')
+
+        for review_count in range(1000):
+            ranking.add_review(review_count % 3, True, is_joke=bool(review_count % 2))
+
+        # Stale entries are regularly removed from the heap.
+        self.assertLessEqual(len(ranking.heap), 2 * 3 + 64)
+        self.assertEqual(ranking.counters['0'], [334, 0, 167, 334])
+        self.assertListEqual(
+            [app_id for (app_id, _) in ranking.get_top(3)],
+            ['1', '0', '2'],
+        )
+
+    def test_save_and_load(self):
+        filename = 'data/test_online_ranking.json'
+        self.addCleanup(pathlib.Path(filename).unlink, missing_ok=True)
+
+        ranking = online_ranking.OnlineRanking(
+            'bayesian_rating',
+            bayes_prior={'score': 0.5, 'num_votes': 10},
+        )
+        ranking.add_review(10, voted_up=True)
+        ranking.add_review(20, voted_up=False)
+        ranking.save(filename)
+
+        restored_ranking = online_ranking.load_online_ranking(filename)
+        self.assertListEqual(restored_ranking.get_top(), ranking.get_top())
+        self.assertAlmostEqual(restored_ranking.get_top(1)[0][1], 6 / 11)
+
+        self.assertIsNone(online_ranking.load_online_ranking('data/missing.json'))
+
+    def test_hype_with_several_languages(self):
+        use_temporary_sentiment_cache(self)
+
+        app_id = 'dummy_online_ranking'
+        review_data = write_dummy_review_file(self, app_id, dummy_review_texts)
+
+        # Reviews in other languages are not checked for jokes, and do not count towards the hype.
+        for review_id in ['2', '3', '6']:
+            review_data['reviews'][review_id]['language'] = 'french'
+        with open(
+            describe_reviews.get_data_filename(app_id), 'w', encoding='utf8'
+        ) as f:
+            f.write(json.dumps(review_data) + '\n')
+
+        ranking = online_ranking.OnlineRanking('hype')
+        for review in review_data['reviews'].values():
+            ranking.add_steam_review(app_id, review)
+
+        review_dict = identify_joke_reviews.get_review_sentiment_dictionary(app_id)
+        (
+            acceptable_reviews_dict,
+            joke_reviews_dict,
+        ) = identify_joke_reviews.classify_reviews(review_dict)
+
+        self.assertEqual(ranking.counters[app_id][3], len(dummy_review_texts) - 3)
+        self.assertAlmostEqual(
+            ranking.get_top(1)[0][1],
+            estimate_hype.get_hype(joke_reviews_dict, acceptable_reviews_dict),
+        )
+
+
+class TestReviewLanguageCountsMethods(unittest.TestCase):
+    def test_get_review_language_counts(self):
+        import tempfile
+
+        review_language_dict = {
+            '10': {
+                'en': {'voted': 3, 'voted_up': 2, 'voted_down': 1},
+                'fr': {'voted': 1, 'voted_up': 1, 'voted_down': 0},
+            },
+            '20': {'de': {'voted': 5, 'voted_up': 0, 'voted_down': 5}},
+        }
+
+        with tempfile.TemporaryDirectory() as temp_path:
+            filename = temp_path + '/dict_review_languages.txt'
+            with open(filename, 'w', encoding='utf8') as f:
+                f.write(str(review_language_dict))
+
+            counts_path = temp_path + '/'
+
+            for _ in range(2):
+                (
+                    app_ids,
+                    languages,
+                    counts,
+                ) = review_language_counts.get_review_language_counts(
+                    filename,
+                    counts_path=counts_path,
+                )
+
+                self.assertListEqual(app_ids.tolist(), ['10', '20'])
+                self.assertListEqual(languages.tolist(), ['de', 'en', 'fr'])
+                self.assertEqual(counts.dtype, 'int32')
+                self.assertListEqual(
+                    counts.tolist(),
+                    [
+                        [[0, 0, 0], [3, 2, 1], [1, 1, 0]],
+                        [[5, 0, 5], [0, 0, 0], [0, 0, 0]],
+                    ],
+                )
+
+            del counts
+
+
+class TestGenerateRegionalRankingsMethods(unittest.TestCase):
+    def test_generate_regional_rankings(self):
+        import tempfile
+
+        import numpy as np
+
+        app_ids = np.array(['10', '20', '30'])
+        languages = np.array(['en', 'zh-cn'])
+        # Counts: voted, voted_up, voted_down
+        counts = np.array(
+            [
+                [[100, 90, 10], [0, 0, 0]],
+                [[50, 50, 0], [10, 9, 1]],
+                [[1000, 500, 500], [100, 99, 1]],
+            ],
+            dtype=np.int32,
+        )
+
+        # Use this metadata instead of the default one.
+        previous_metadata = steamspy_cache.default_steamspy_metadata
+        steamspy_cache.default_steamspy_metadata = steamspy_cache.convert_steamspy_data(
+            {'20': {'name': 'Game 20'}}
+        )
+        self.addCleanup(
+            setattr,
+            steamspy_cache,
+            'default_steamspy_metadata',
+            previous_metadata,
+        )
+
+        with tempfile.TemporaryDirectory() as temp_path:
+            output_path = temp_path + '/regional_rankings/'
+            hidden_gems_filename = temp_path + '/hidden_gems.md'
+
+            self.assertTrue(
+                generate_regional_rankings.generate_regional_rankings(
+                    num_top_games_per_language=2,
+                    output_path=output_path,
+                    hidden_gems_filename=hidden_gems_filename,
+                    counts_data=(app_ids, languages, counts),
+                ),
+            )
+
+            with open(output_path + 'hidden_gems_en.md', encoding='utf8') as f:
+                self.assertListEqual(
+                    f.read().splitlines(),
+                    [
+                        '00001.\t[Game 20](http://store.steampowered.com/app/20    )',
+                        '00002.\t[unknown](http://store.steampowered.com/app/10    )',
+                    ],
+                )
+
+            with open(output_path + 'hidden_gems_zh-cn.md', encoding='utf8') as f:
+                self.assertListEqual(
+                    f.read().splitlines(),
+                    [
+                        '00001.\t[unknown](http://store.steampowered.com/app/30    )',
+                        '00002.\t[Game 20](http://store.steampowered.com/app/20    )',
+                    ],
+                )
+
+            with open(output_path + 'README.md', encoding='utf8') as f:
+                self.assertIn('### Top 20 hidden gems for Chinese speakers', f.read())
+
+            with open(hidden_gems_filename, encoding='utf8') as f:
+                self.assertEqual(len(f.read().splitlines()), 3)
+
+        # By default, the archived rankings are left untouched.
+        with tempfile.TemporaryDirectory() as temp_path:
+            previous_path = os.getcwd()
+            os.chdir(temp_path)
+
+            try:
+                generate_regional_rankings.generate_regional_rankings(
+                    num_top_games_per_language=2,
+                    counts_data=(app_ids, languages, counts),
+                )
+            finally:
+                os.chdir(previous_path)
+
+            self.assertListEqual(os.listdir(temp_path), ['data'])
+            self.assertListEqual(
+                sorted(os.listdir(temp_path + '/data/regional_rankings')),
+                [
+                    'README.md',
+                    'hidden_gems.md',
+                    'hidden_gems_en.md',
+                    'hidden_gems_zh-cn.md',
+                ],
+            )
+
 
 if __name__ == '__main__':
     unittest.main()
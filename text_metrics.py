@@ -0,0 +1,133 @@
+# Objective: compute every readability metric of a review with a single tokenization of the text, instead of calling
+# textstat once per metric, each call tokenizing the same text again. Word-level results (syllables, difficult words)
+# are memoized, so that they are shared across reviews and across games.
+# The formulas follow textstat (English), so that the output matches the one obtained with textstat.
+
+import math
+import re
+from functools import lru_cache
+from importlib import resources
+
+from textstat.textstat import textstat
+
+# Reference: textstat.remove_punctuation(), with apostrophes removed as well
+punctuation_pattern = re.compile(r"[^\w\s]")
+
+# Reference: textstat.sentence_count()
+sentence_pattern = re.compile(r'\b[^.!?]+[.!?]*', re.UNICODE)
+
+# Reference: textstat.difficult_words_list()
+difficult_word_pattern = re.compile(r"[\w\='‘’]+")
+
+# Reference: textstat config for English
+flesch_reading_ease_config = {
+    "fre_base": 206.835,
+    "fre_sentence_length": 1.015,
+    "fre_syll_per_word": 84.6,
+}
+
+
+def legacy_round(number, points=0):
+    # Reference: textstat._legacy_round()
+    p = pow(10, points)
+    return float(math.floor((number * p) + math.copysign(0.5, number))) / p
+
+
+def load_easy_words():
+    easy_words_file = resources.files('textstat').joinpath(
+        'resources/en/easy_words.txt',
+    )
+    with easy_words_file.open(encoding='utf8') as f:
+        easy_words = {line.strip() for line in f}
+
+    return easy_words
+
+
+easy_word_set = load_easy_words()
+
+
+def remove_punctuation(text):
+    return punctuation_pattern.sub('', text)
+
+
+@lru_cache(maxsize=pow(2, 18))
+def count_word_syllables(word):
+    # NB: word is assumed to be lower-case and without punctuation.
+    return len(textstat.pyphen.positions(word)) + 1
+
+
+@lru_cache(maxsize=pow(2, 18))
+def is_difficult_word(word, syllable_threshold=2):
+    # NB: word is assumed to be lower-case.
+    if word in easy_word_set:
+        return False
+
+    num_syllables = sum(
+        count_word_syllables(w) for w in remove_punctuation(word).split()
+    )
+
+    return bool(num_syllables >= syllable_threshold)
+
+
+def compute_text_metrics(text):
+    # Return a dictionary with the readability metrics of the text, as used by compute_review_text_stats_in_batch().
+
+    # Tokenization, once per text
+    words = remove_punctuation(text).split()
+    sentences = sentence_pattern.findall(text)
+    candidate_difficult_words = set(difficult_word_pattern.findall(text.lower()))
+
+    lexicon_count = len(words)
+    syllable_count = sum(count_word_syllables(word.lower()) for word in words)
+
+    # Sentences with at most 2 words are ignored.
+    num_ignored_sentences = sum(
+        len(remove_punctuation(sentence).split()) <= 2 for sentence in sentences
+    )
+    sentence_count = max(1, len(sentences) - num_ignored_sentences)
+
+    difficult_words_count = sum(
+        is_difficult_word(word, 2) for word in candidate_difficult_words
+    )
+    # With a syllable threshold equal to 0, a word is difficult iff it is not in the list of easy words.
+    num_words_not_easy = sum(
+        word not in easy_word_set for word in candidate_difficult_words
+    )
+
+    avg_sentence_length = legacy_round(lexicon_count / sentence_count, 1)
+
+    if lexicon_count > 0:
+        avg_syllables_per_word = legacy_round(syllable_count / lexicon_count, 1)
+    else:
+        avg_syllables_per_word = 0.0
+
+    flesch_reading_ease = legacy_round(
+        flesch_reading_ease_config["fre_base"]
+        - flesch_reading_ease_config["fre_sentence_length"] * avg_sentence_length
+        - flesch_reading_ease_config["fre_syll_per_word"] * avg_syllables_per_word,
+        2,
+    )
+
+    if lexicon_count > 0:
+        per_easy_words = (lexicon_count - num_words_not_easy) / lexicon_count * 100
+        per_difficult_words = 100 - per_easy_words
+
+        dale_chall_readability_score = (0.1579 * per_difficult_words) + (
+            0.0496 * avg_sentence_length
+        )
+        if per_difficult_words > 5:
+            dale_chall_readability_score += 3.6365
+        dale_chall_readability_score = legacy_round(dale_chall_readability_score, 2)
+    else:
+        dale_chall_readability_score = 0.0
+
+    text_metrics = {}
+    text_metrics['character_count'] = len(text)
+    text_metrics['syllable_count'] = syllable_count
+    text_metrics['lexicon_count'] = lexicon_count
+    text_metrics['sentence_count'] = sentence_count
+    text_metrics['difficult_words_count'] = difficult_words_count
+    text_metrics['flesch_reading_ease'] = flesch_reading_ease
+    text_metrics['dale_chall_readability_score'] = dale_chall_readability_score
+
+    return text_metrics
@@ -0,0 +1,117 @@
+# Objective: compute the hype and the Wilson score deviation for a whole 2D grid of sentiment thresholds at once, in
+# order to calibrate the criterion used by classify_reviews() to distinguish between acceptable and joke reviews.
+#
+# The grid is parametrized as follows, cf. identify_joke_reviews.get_joke_review_mask():
+# - a polarity threshold a corresponds to the polarity interval [-a, a],
+# - a subjectivity threshold s corresponds to the subjectivity interval [s, max_subjectivity].
+# A review is a joke review iff |polarity| <= a AND (subjectivity < s OR subjectivity > max_subjectivity).
+
+import numpy as np
+
+from compute_wilson_score import compute_wilson_score_array
+
+
+def count_joke_reviews(
+    polarities,
+    subjectivities,
+    polarity_thresholds,
+    subjectivity_thresholds,
+    max_subjectivity=1,
+):
+    # Return a 2D array with the number of joke reviews for every pair of (sorted) thresholds.
+    # The reviews are sorted into the cells of the grid once, then cumulative sums give the counts for every pair.
+    num_polarity_thresholds = len(polarity_thresholds)
+    num_subjectivity_thresholds = len(subjectivity_thresholds)
+
+    # Index of the smallest polarity threshold a such that |polarity| <= a
+    polarity_indices = np.searchsorted(
+        polarity_thresholds,
+        np.abs(polarities),
+        side='left',
+    )
+
+    # Index of the smallest subjectivity threshold s such that subjectivity < s
+    subjectivity_indices = np.searchsorted(
+        subjectivity_thresholds,
+        subjectivities,
+        side='right',
+    )
+    # Reviews above the subjectivity interval are outside of it, whatever its lower bound.
+    subjectivity_indices[subjectivities > max_subjectivity] = 0
+
+    histogram = np.bincount(
+        polarity_indices * (num_subjectivity_thresholds + 1) + subjectivity_indices,
+        minlength=(num_polarity_thresholds + 1) * (num_subjectivity_thresholds + 1),
+    ).reshape(num_polarity_thresholds + 1, num_subjectivity_thresholds + 1)
+
+    num_joke_reviews = histogram.cumsum(axis=0).cumsum(axis=1)
+
+    # The last row and column gather reviews which are never joke reviews on the grid.
+    return num_joke_reviews[:num_polarity_thresholds, :num_subjectivity_thresholds]
+
+
+def sweep_sentiment_thresholds(
+    review_dict,
+    polarity_thresholds,
+    subjectivity_thresholds,
+    max_subjectivity=1,
+    confidence=0.95,
+):
+    # Return a dictionary of 2D arrays, indexed by [polarity threshold, subjectivity threshold], with thresholds sorted
+    # in increasing order. Values are equal to the ones obtained with classify_reviews(), get_hype() and
+    # get_wilson_score_deviation() for every pair of thresholds.
+    from identify_joke_reviews import get_review_table
+
+    review_table = get_review_table(review_dict)
+
+    polarity_thresholds = np.sort(np.asarray(polarity_thresholds, dtype=float))
+    subjectivity_thresholds = np.sort(np.asarray(subjectivity_thresholds, dtype=float))
+
+    num_joke_reviews = {}
+    num_reviews = {}
+    for (keyword, is_keyword) in [
+        ('positive', review_table['voted_up']),
+        ('negative', ~review_table['voted_up']),
+    ]:
+        num_joke_reviews[keyword] = count_joke_reviews(
+            review_table['polarity'][is_keyword],
+            review_table['subjectivity'][is_keyword],
+            polarity_thresholds,
+            subjectivity_thresholds,
+            max_subjectivity,
+        )
+        num_reviews[keyword] = int(np.sum(is_keyword))
+
+    num_all_joke_reviews = num_joke_reviews['positive'] + num_joke_reviews['negative']
+    num_all_reviews = num_reviews['positive'] + num_reviews['negative']
+
+    # Hype is the percentage of joke reviews among all reviews, cf. estimate_hype.get_hype()
+    if num_all_reviews > 0:
+        hype = num_all_joke_reviews / num_all_reviews
+    else:
+        hype = np.full(num_all_joke_reviews.shape, -1.0)
+
+    # Wilson score deviation, cf. estimate_hype.get_wilson_score_deviation()
+    wilson_score_raw = compute_wilson_score_array(
+        num_reviews['positive'],
+        num_reviews['negative'],
+        confidence,
+    )
+    wilson_score_acceptable_only = compute_wilson_score_array(
+        num_reviews['positive'] - num_joke_reviews['positive'],
+        num_reviews['negative'] - num_joke_reviews['negative'],
+        confidence,
+    )
+
+    wilson_score_deviation = wilson_score_raw - wilson_score_acceptable_only
+    # The Wilson score is undefined without any review.
+    wilson_score_deviation[np.isnan(wilson_score_deviation)] = -1
+
+    sweep_results = {}
+    sweep_results['polarity_thresholds'] = polarity_thresholds
+    sweep_results['subjectivity_thresholds'] = subjectivity_thresholds
+    sweep_results['num_joke_reviews'] = num_all_joke_reviews
+    sweep_results['hype'] = hype
+    sweep_results['wilson_score_deviation'] = wilson_score_deviation
+
+    return sweep_results